@@ -22,6 +22,12 @@ until python manage.py shell --settings=core.settings_ttms -c "import django; dj
 done
 echo -e "${GREEN}✓ Database is ready${NC}"
 
+# Start with an empty metrics directory so totals from a previous run are dropped
+if [ -n "$METRICS_MULTIPROCESS_DIR" ]; then
+    rm -rf "$METRICS_MULTIPROCESS_DIR"
+    mkdir -p "$METRICS_MULTIPROCESS_DIR"
+fi
+
 # Run migrations
 echo -e "${YELLOW}Running database migrations...${NC}"
 python manage.py migrate --settings=core.settings_ttms --noinput
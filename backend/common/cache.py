@@ -0,0 +1,57 @@
+"""
+Per-action response caching for DRF viewsets.
+
+Cached entries are keyed by the view's ETag (see common.conditional), which
+covers the request path, query string and the generation counters of every
+model the view depends on. A post_save/post_delete on any of those models
+bumps its generation, so the next request looks up a new key and stale
+entries simply age out; nothing has to be deleted explicitly.
+
+That only holds when every process bumps and reads the same counters, so
+caching is skipped unless settings.SHARED_CACHE is set (file or redis backend).
+"""
+
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .constants import CACHE_TIMEOUTS
+
+
+def cache_is_shared():
+    """True when the default cache is shared by every process of the deployment."""
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def cache_response(timeout='SHORT'):
+    """
+    Cache the serialized data of a GET action.
+
+    The viewset must use ConditionalGetMixin. Only 200 responses are stored;
+    the cached data is rendered again per request, so content negotiation
+    still applies. Without a shared cache the action always runs.
+
+    Args:
+        timeout: CACHE_TIMEOUTS name or seconds
+    """
+    seconds = CACHE_TIMEOUTS[timeout] if isinstance(timeout, str) else timeout
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not cache_is_shared():
+                return func(self, request, *args, **kwargs)
+            etag = getattr(self, 'etag', None) or self.compute_etag(request)
+            key = 'response:' + etag.removeprefix('W/').strip('"')
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = func(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, seconds)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+"""
+Conditional GET (ETag / If-None-Match) support for DRF viewsets.
+
+Each model has a generation counter kept in the Django cache. The owning app
+bumps it from post_save/post_delete receivers (and explicitly after bulk
+``.update()`` calls). A viewset's ETag is derived from the request path and
+the generations of the models its responses depend on, so an unchanged
+collection is answered with 304 Not Modified before any queryset is
+evaluated or serializer runs.
+
+Generations are only meaningful when the cache is shared by every process
+that writes (web workers and management command workers alike). Without a
+shared cache no ETag is sent, and get_generations() returns values that
+never repeat, so nothing keyed on them is reused.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .cache import cache_is_shared
+
+
+def _generation_key(model):
+    return f'generation:{model._meta.label_lower}'
+
+
+def get_generations(models):
+    """
+    Get current generation counters for a list of models.
+
+    Missing counters (cold or evicted cache) are seeded from the clock so they
+    never repeat a value that a client may still hold in an ETag.
+    """
+    if not cache_is_shared():
+        return [time.time_ns()] * len(models)
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_generation(model):
+    """Invalidate ETags of every response depending on this model."""
+    if not cache_is_shared():
+        return
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_generation_receiver(sender, **kwargs):
+    """
+    Signal receiver form of bump_generation for post_save/post_delete.
+
+    Deferred until commit so a concurrent reader cannot pair the new ETag with
+    data from before the write.
+    """
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = 'Not modified.'
+    default_code = 'not_modified'
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin answering GET/HEAD with 304 when If-None-Match matches.
+
+    Set ``etag_models`` to every model whose changes alter the responses of
+    the viewset (defaults to the queryset model). Override ``get_etag_parts``
+    for actions that depend on other state. Inactive without a shared cache.
+    """
+    etag_models = ()
+
+    def get_etag_models(self):
+        return self.etag_models or (self.get_queryset().model,)
+
+    def get_etag_parts(self, request):
+        return get_generations(self.get_etag_models())
+
+    def compute_etag(self, request):
+        source = '|'.join([request.get_full_path()] + [str(part) for part in self.get_etag_parts(request)])
+        return 'W/"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD') and cache_is_shared():
+            self.etag = self.compute_etag(request)
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match:
+                # Weak comparison: ignore the W/ prefix on both sides.
+                client_tags = parse_etags(if_none_match)
+                if '*' in client_tags or self.etag.removeprefix('W/') in [
+                    tag.removeprefix('W/') for tag in client_tags
+                ]:
+                    raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
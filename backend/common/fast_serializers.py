@@ -0,0 +1,231 @@
+"""
+Precompiled read-only serialization for hot list endpoints.
+
+compile_serializer() inspects a DRF serializer class once and builds a plain
+function per readable field: model attributes are read with precomputed
+getters (foreign keys through their ``<name>_id`` column, forward relation
+chains such as ``vehicle.reg_no`` walked directly) and converted with the
+field's own to_representation, so the output matches ``Serializer(many=True)
+.data`` exactly. Fields the compiler does not recognise fall back to DRF's
+get_attribute/to_representation for that field only.
+"""
+
+import functools
+import threading
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField, empty
+from rest_framework.relations import PKOnlyObject
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+# Current timezone resolved once per serialize() call instead of per value
+_state = threading.local()
+
+
+def _model_chain(model, attrs):
+    """
+    Resolve a source path over forward relations to a concrete field.
+
+    Returns the list of Django fields along the path, or None when the path
+    leaves plain columns and forward foreign keys/one-to-ones.
+    """
+    path = []
+    for position, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        path.append(field)
+        if position < len(attrs) - 1:
+            if not (field.many_to_one or field.one_to_one):
+                return None
+            model = field.related_model
+    return path
+
+
+def _missing(field):
+    """What DRF's Field.get_attribute does when the source path breaks."""
+    if field.default is not empty:
+        return lambda: field.get_default()
+    if field.allow_null:
+        return lambda: None
+    if not field.required:
+        return None
+
+    def fail():
+        raise AttributeError(f'Broken source for required field {field.field_name}')
+    return fail
+
+
+def _generic(field):
+    def read(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return read
+
+
+def _datetime_converter(field):
+    """DateTimeField.to_representation for aware datetimes and ISO 8601 output."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if hasattr(field, 'timezone') or output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        field_timezone = getattr(_state, 'timezone', None)
+        if field_timezone is None or value.utcoffset() is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _converter(field):
+    """Value conversion for a non-null attribute; None means pass through."""
+    field_type = type(field)
+    if field_type is serializers.DateTimeField:
+        return _datetime_converter(field)
+    if field_type is serializers.IntegerField:
+        return int
+    if field_type is serializers.CharField:
+        return str
+    if field_type is serializers.ChoiceField and all(isinstance(key, str) for key in field.choices):
+        return None
+    return field.to_representation
+
+
+def _compile_field(field, model):
+    attrs = field.source_attrs
+    if model is None or field.source == '*' or not attrs:
+        return _generic(field)
+
+    if isinstance(field, serializers.ListSerializer):
+        if len(attrs) == 1:
+            try:
+                relation = model._meta.get_field(attrs[0])
+            except FieldDoesNotExist:
+                relation = None
+            if relation is not None and (relation.one_to_many or relation.many_to_many):
+                row = compile_row(type(field.child), field.child)
+                name = attrs[0]
+                return lambda instance: [row(item) for item in getattr(instance, name).all()]
+        return _generic(field)
+
+    path = _model_chain(model, attrs)
+    if path is None:
+        return _generic(field)
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None or not path[-1].is_relation:
+            return _generic(field)
+        # Same as DRF's pk-only optimisation: read the FK column, not the object
+        columns = [f.name for f in path[:-1]] + [path[-1].attname]
+        convert = None
+    elif isinstance(field, serializers.BaseSerializer):
+        if len(path) != 1 or not path[-1].is_relation:
+            return _generic(field)
+        row = compile_row(type(field), field)
+        name = attrs[0]
+        return lambda instance: None if (value := getattr(instance, name)) is None else row(value)
+    elif path[-1].is_relation:
+        return _generic(field)
+    else:
+        columns = attrs
+        convert = _converter(field)
+
+    if len(columns) == 1:
+        name = columns[0]
+        if convert is None:
+            return lambda instance: getattr(instance, name)
+        return lambda instance: None if (value := getattr(instance, name)) is None else convert(value)
+
+    on_missing = _missing(field)
+
+    def read(instance):
+        value = instance
+        for name in columns:
+            if value is None:
+                if on_missing is None:
+                    raise SkipField()
+                return on_missing()
+            try:
+                value = getattr(value, name)
+            except ObjectDoesNotExist:
+                return None
+        if value is None or convert is None:
+            return value
+        return convert(value)
+    return read
+
+
+def compile_row(serializer_class, serializer=None):
+    """
+    Build ``row(instance) -> dict`` equivalent to ``serializer_class(instance).data``.
+
+    Args:
+        serializer_class: ModelSerializer (or Serializer) class
+        serializer: Already-bound instance to take fields from (nested use)
+    """
+    serializer = serializer if serializer is not None else serializer_class()
+    meta = getattr(serializer_class, 'Meta', None)
+    model = getattr(meta, 'model', None)
+    readers = [
+        (name, _compile_field(field, model))
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    ]
+
+    def row(instance):
+        data = {}
+        for name, read in readers:
+            try:
+                data[name] = read(instance)
+            except SkipField:
+                continue
+        return data
+    return row
+
+
+@functools.lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """
+    Build ``serialize(instances) -> list`` matching ``serializer_class(instances, many=True).data``.
+
+    Only for reading; the caller remains responsible for select_related /
+    prefetch_related just as with the DRF serializer. Compiled once per class.
+    """
+    row = compile_row(serializer_class)
+
+    def serialize(instances):
+        previous = getattr(_state, 'timezone', None)
+        _state.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        try:
+            return [row(instance) for instance in instances]
+        finally:
+            _state.timezone = previous
+    return serialize
+
+
+class FastListMixin:
+    """
+    ViewSet mixin serving the list action through compile_serializer.
+
+    Set ``fast_serializer_class`` to the read serializer the list would
+    otherwise use; filtering and pagination are unchanged.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serialize = compile_serializer(self.fast_serializer_class)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(queryset))
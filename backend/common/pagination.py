@@ -2,7 +2,16 @@
 Standard pagination classes for TTMS and PTMS APIs.
 """
 
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardPagination(PageNumberPagination):
@@ -34,3 +43,114 @@ class LargePagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     page_size_query_description = 'Number of results to return per page.'
     max_page_size = 5000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on a (timestamp, id) key.
+
+    The view declares ``keyset_ordering``, e.g. ('-gate_entry_time', '-id').
+    Each page filters on the key of the last row of the previous page instead
+    of using OFFSET, so deep pages cost the same as the first one and rows
+    inserted while paging do not shift page boundaries. Cursors are opaque
+    base64-encoded keys.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def encode_cursor(self, values):
+        raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            time_value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            timestamp = parse_datetime(time_value)
+            if timestamp is None:
+                raise ValueError(time_value)
+            return timestamp, int(pk)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        time_order, pk_order = view.keyset_ordering
+        time_field = time_order.lstrip('-')
+        pk_field = pk_order.lstrip('-')
+        descending = time_order.startswith('-')
+        lookup = 'lt' if descending else 'gt'
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(time_order, pk_order)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            timestamp, pk = cursor
+            # The redundant inclusive bound gives the planner an index range to
+            # start from; the OR alone would scan every earlier entry
+            queryset = queryset.filter(
+                Q(**{f'{time_field}__{lookup}e': timestamp}),
+                Q(**{f'{time_field}__{lookup}': timestamp}) |
+                Q(**{time_field: timestamp, f'{pk_field}__{lookup}': pk})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor([getattr(last, time_field), getattr(last, pk_field)])
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class TimeSeriesPagination(StandardPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Requests carrying ``?pagination=keyset`` or a ``cursor`` parameter are
+    paginated with KeysetPagination; everything else keeps the standard
+    page-number behaviour.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'keyset'
+                or self.keyset_class.cursor_query_param in request.query_params):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
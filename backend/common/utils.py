@@ -5,6 +5,9 @@ These are lightweight helpers - NO business logic, NO models.
 
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .constants import TimeRange
 
 
 def get_time_range(days: int = 30) -> tuple:
@@ -68,6 +71,72 @@ def get_date_range_today() -> tuple:
     return start, end
 
 
+def _parse_bound(value: str, end: bool = False):
+    """Parse an ISO date or datetime; a bare end date covers the whole day."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(day, datetime.min.time())
+        if end:
+            parsed += timedelta(days=1) - timedelta(microseconds=1)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def get_date_range_from_params(params, default_days: int = 30) -> tuple:
+    """
+    Resolve a date range from request query parameters.
+    
+    Accepts ``range`` (a TimeRange value; ``custom`` requires ``start`` and
+    ``end`` as ISO dates or datetimes) or ``days`` (last N days). Defaults to
+    the last ``default_days`` days.
+    
+    Args:
+        params: Query parameter mapping (e.g. request.query_params)
+        default_days: Days covered when no range is given
+    
+    Returns:
+        Tuple of (start_datetime, end_datetime)
+    
+    Raises:
+        ValueError: On an unknown range or malformed dates
+    """
+    time_range = params.get('range')
+    if time_range:
+        try:
+            time_range = TimeRange(time_range)
+        except ValueError:
+            raise ValueError(f"Invalid range: {time_range}")
+        if time_range == TimeRange.TODAY:
+            return get_date_range_today()
+        if time_range == TimeRange.WEEKLY:
+            return get_time_range(7)
+        if time_range == TimeRange.MONTHLY:
+            return get_date_range_month()
+        if time_range == TimeRange.YEARLY:
+            return get_date_range_year()
+        if not params.get('start') or not params.get('end'):
+            raise ValueError("start and end required for a custom range")
+        start, end = _parse_bound(params['start']), _parse_bound(params['end'], end=True)
+        if start > end:
+            raise ValueError("start must not be after end")
+        return start, end
+    
+    days = params.get('days')
+    if days:
+        try:
+            days = int(days)
+        except ValueError:
+            raise ValueError(f"Invalid days: {days}")
+        if days <= 0:
+            raise ValueError("days must be positive")
+        return get_time_range(days)
+    return get_time_range(default_days)
+
+
 def format_duration_minutes(minutes: int) -> str:
     """
     Format minutes into human-readable duration string.
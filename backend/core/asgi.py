@@ -0,0 +1,31 @@
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+application = get_asgi_application()
+
+
+def use_request_scoped_connections():
+    """
+    Close database connections at the end of every ASGI request.
+
+    Django runs each ASGI request's sync code in a thread of its own, so a
+    connection kept for CONN_MAX_AGE would stay open in a thread that never
+    serves another request. The pooled backend (DB_POOL=True) already runs with
+    CONN_MAX_AGE=0 and hands connections back to its pool instead.
+    """
+    for settings_dict in settings.DATABASES.values():
+        settings_dict['CONN_MAX_AGE'] = 0
+
+
+use_request_scoped_connections()
+
+
+# Let apps fill in-process caches before the first request
+for app_config in apps.get_app_configs():
+    if hasattr(app_config, 'warm_up'):
+        app_config.warm_up()
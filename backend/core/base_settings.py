@@ -34,6 +34,7 @@ COMMON_INSTALLED_APPS = [
 INSTALLED_APPS = COMMON_INSTALLED_APPS
 
 MIDDLEWARE = [
+    'core.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,10 +62,29 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 # Database will be set in app-specific settings
 DATABASES = {}
 
+# Connection reuse merged into each app's DATABASES['default']
+# DB_CONN_MAX_AGE: seconds a worker thread keeps its connection (0 = reconnect per request);
+#   applies to WSGI (gunicorn) only, core.asgi forces 0 since every ASGI request runs in a
+#   new thread - use DB_POOL=True to reuse connections there
+# DB_CONN_HEALTH_CHECKS: verify a reused connection before the first query of a request
+# DB_POOL=True: return connections to a per-worker pool after each request instead
+#   (core.db.postgresql_pool), at most DB_POOL_MAX_SIZE open per worker; a request
+#   waits up to DB_POOL_TIMEOUT seconds for a free connection
+DB_POOL_ENABLED = os.getenv('DB_POOL', 'False') == 'True'
+DATABASE_CONNECTION = {
+    'CONN_MAX_AGE': 0 if DB_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    'POOL': {
+        'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -90,7 +110,41 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache (ETag generations, cached responses, KPI/metrics aggregates)
+# CACHE_BACKEND: locmem (default, per process), file or redis. Use file or
+# redis when running several workers so invalidation reaches all of them.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'default'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', _CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', ''),
+        'TIMEOUT': 300,
+    }
+}
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000'))}
+
+# ETag generations (common.conditional) must be bumped in the cache every process
+# reads, including management command workers. With locmem each process has its
+# own, so conditional GET and cached responses are off (in-process buffers fall back to a TTL).
+SHARED_CACHE = CACHE_BACKEND in ('file', 'redis')
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'common.pagination.StandardPagination',
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -111,6 +165,26 @@ AUTHENTICATION_BACKENDS = [
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
 
+# Request instrumentation (core/middleware.py, core/instrumentation.py)
+# SAMPLE_RATE: fraction of requests measured (0.0 - 1.0)
+# SLOW_REQUEST_SECONDS: requests at least this slow are logged at WARNING
+INSTRUMENTATION = {
+    'ENABLED': os.getenv('INSTRUMENTATION_ENABLED', 'True') == 'True',
+    'SAMPLE_RATE': float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '1.0')),
+    'SLOW_REQUEST_SECONDS': float(os.getenv('SLOW_REQUEST_SECONDS', '1.0')),
+}
+
+# Prometheus exposition (core/metrics.py)
+# TOKEN: Bearer token required by /metrics (empty = no token check)
+# COLLECTORS: dotted paths of callables adding app-specific metric families
+# MULTIPROCESS_DIR: writable directory shared by all workers of one server; their
+# request metrics are summed from it (empty = per process, labelled with pid)
+METRICS = {
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+    'COLLECTORS': [],
+    'MULTIPROCESS_DIR': os.getenv('METRICS_MULTIPROCESS_DIR', ''),
+}
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,123 @@
+"""
+PostgreSQL backend with a per-worker connection pool.
+
+Selected with DB_POOL=True (see DATABASE_CONNECTION in core/base_settings.py).
+Django still "closes" its connection at the end of every request
+(CONN_MAX_AGE=0), but closing hands the psycopg2 connection back to a
+process-wide pool instead of disconnecting, and the next request in any
+thread checks it out again. At most POOL['MAX_SIZE'] connections per alias
+are open in a worker; a thread that finds the pool exhausted waits up to
+POOL['TIMEOUT'] seconds before failing with OperationalError.
+"""
+
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """Idle connections of one alias plus a semaphore capping checkouts."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = []
+        self._lock = threading.Lock()
+        # Physical connections opened; Django's connection_created fires on every checkout
+        self.opened = 0
+
+    def checkout(self, connect, health_check):
+        """Return an idle healthy connection, or a new one from ``connect()``."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise base.Database.OperationalError(
+                f'Connection pool exhausted ({self.max_size} in use for {self.timeout}s)'
+            )
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    connection = connect()
+                    with self._lock:
+                        self.opened += 1
+                    return connection
+                if self._usable(connection, health_check):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, connection):
+        """Take a connection back, rolling back any open transaction."""
+        try:
+            if not connection.closed:
+                status = connection.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    self._discard(connection)
+                    return
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                with self._lock:
+                    self._idle.append(connection)
+        except base.Database.Error:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _usable(connection, health_check):
+        if connection.closed:
+            return False
+        if not health_check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except base.Database.Error:
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except base.Database.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            config = settings_dict.get('POOL', {})
+            pool = _pools[alias] = ConnectionPool(config.get('MAX_SIZE', 10), config.get('TIMEOUT', 5))
+        return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+        connection = pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            self.settings_dict['CONN_HEALTH_CHECKS'],
+        )
+        # The parent sets this while connecting; reused connections keep the
+        # level they were opened with, so mirror it on the wrapper.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            base.IsolationLevel(isolation_level) if isolation_level is not None
+            else base.IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                get_pool(self.alias, self.settings_dict).checkin(self.connection)
@@ -0,0 +1,258 @@
+"""
+In-memory request instrumentation shared by TTMS and PTMS.
+
+RequestInstrumentationMiddleware records wall time, DB query count, DB time
+and response size for each request, keyed by method and resolved route name.
+The aggregates live in a per-process registry of fixed-bucket histograms and
+are exposed to admins through InstrumentationView and, in Prometheus text
+format, through core.metrics.
+
+With METRICS['MULTIPROCESS_DIR'] set, every process also writes its
+aggregates to <dir>/<pid>.json (at most once per FLUSH_SECONDS while serving
+requests), and merged_snapshot() sums the files of all processes, past and
+present, so totals seen by a scraper never go backwards whichever worker
+answers. The directory must be emptied when the server starts.
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Minimum seconds between two writes of a process's aggregates file
+FLUSH_SECONDS = 1.0
+
+
+def instrumentation_settings():
+    config = getattr(settings, 'INSTRUMENTATION', {})
+    return {
+        'ENABLED': config.get('ENABLED', True),
+        'SAMPLE_RATE': config.get('SAMPLE_RATE', 1.0),
+        'SLOW_REQUEST_SECONDS': config.get('SLOW_REQUEST_SECONDS', 1.0),
+    }
+
+
+def multiprocess_dir():
+    """Directory shared by all worker processes for their aggregates, or ''."""
+    return getattr(settings, 'METRICS', {}).get('MULTIPROCESS_DIR', '')
+
+
+class RouteStats:
+    """Aggregates for one (method, route) pair"""
+
+    __slots__ = ('count', 'buckets', 'total_time', 'max_time', 'total_queries',
+                 'max_queries', 'total_db_time', 'total_bytes', 'status_counts')
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_queries = 0
+        self.max_queries = 0
+        self.total_db_time = 0.0
+        self.total_bytes = 0
+        self.status_counts = {}
+
+    def observe(self, duration, queries, db_time, size, status_code):
+        self.count += 1
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.total_queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.total_db_time += db_time
+        self.total_bytes += size
+        self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+
+    def merge(self, other):
+        """Add the observations of another RouteStats to this one."""
+        self.count += other.count
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+        self.total_queries += other.total_queries
+        self.max_queries = max(self.max_queries, other.max_queries)
+        self.total_db_time += other.total_db_time
+        self.total_bytes += other.total_bytes
+        for code, count in other.status_counts.items():
+            self.status_counts[code] = self.status_counts.get(code, 0) + count
+
+    def to_json(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        for slot in cls.__slots__:
+            setattr(stats, slot, data[slot])
+        stats.status_counts = {int(code): count for code, count in data['status_counts'].items()}
+        return stats
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, self.max_time)
+        return self.max_time
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_time * 1000 / count, 2),
+            'p50_ms': round(self.quantile(0.5) * 1000, 2),
+            'p95_ms': round(self.quantile(0.95) * 1000, 2),
+            'p99_ms': round(self.quantile(0.99) * 1000, 2),
+            'max_ms': round(self.max_time * 1000, 2),
+            'avg_queries': round(self.total_queries / count, 2),
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.total_db_time * 1000 / count, 2),
+            'avg_bytes': round(self.total_bytes / count),
+            'status': {str(code): n for code, n in sorted(self.status_counts.items())},
+        }
+
+
+class InstrumentationRegistry:
+    """Thread-safe map of (method, route) to RouteStats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._connections = {}
+        self._flushed_at = 0.0
+
+    def observe(self, method, route, duration, queries, db_time, size, status_code):
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = RouteStats()
+            stats.observe(duration, queries, db_time, size, status_code)
+        if time.monotonic() - self._flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Write this process's aggregates to the multiprocess directory, if any."""
+        directory = multiprocess_dir()
+        if not directory:
+            return
+        self._flushed_at = time.monotonic()
+        data = {
+            'routes': [[method, route, stats.to_json()] for (method, route), stats in self.snapshot().items()],
+            'connections': self.connection_counts(),
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        # Write then rename, so a concurrent scrape never reads a partial file
+        with open(f'{path}.tmp', 'w') as handle:
+            json.dump(data, handle)
+        os.replace(f'{path}.tmp', path)
+
+    def snapshot(self):
+        """Copy of the current aggregates as {(method, route): RouteStats}"""
+        with self._lock:
+            copies = {}
+            for key, stats in self._routes.items():
+                copy = RouteStats()
+                for slot in RouteStats.__slots__:
+                    value = getattr(stats, slot)
+                    setattr(copy, slot, value.copy() if isinstance(value, (list, dict)) else value)
+                copies[key] = copy
+            return copies
+
+    def connection_opened(self, alias):
+        with self._lock:
+            self._connections[alias] = self._connections.get(alias, 0) + 1
+
+    def connection_counts(self):
+        """Database connections opened by this process, per alias"""
+        with self._lock:
+            return dict(self._connections)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._connections.clear()
+
+
+registry = InstrumentationRegistry()
+
+
+def merged_snapshot():
+    """
+    Aggregates of every process as ({(method, route): RouteStats}, connections).
+
+    Falls back to this process's registry when no multiprocess directory is
+    configured.
+    """
+    directory = multiprocess_dir()
+    if not directory:
+        return registry.snapshot(), registry.connection_counts()
+
+    registry.flush()
+    routes, connections = {}, {}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for method, route, values in data['routes']:
+            stats = routes.setdefault((method, route), RouteStats())
+            stats.merge(RouteStats.from_json(values))
+        for alias, count in data['connections'].items():
+            connections[alias] = connections.get(alias, 0) + count
+    return routes, connections
+
+
+def on_connection_created(sender, connection, **kwargs):
+    registry.connection_opened(connection.alias)
+
+
+connection_created.connect(on_connection_created, dispatch_uid='instrumentation_connection_created')
+
+
+class InstrumentationView(APIView):
+    """
+    Admin-only view of per-route request timings.
+
+    GET    - Aggregates per route, slowest average first (all workers when
+             METRICS['MULTIPROCESS_DIR'] is set)
+    DELETE - Reset the aggregates of the worker handling the request
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        snapshot, connections = merged_snapshot()
+        routes = [
+            {'method': method, 'route': route, **stats.as_dict()}
+            for (method, route), stats in snapshot.items()
+        ]
+        routes.sort(key=lambda item: item['avg_ms'], reverse=True)
+        return Response({
+            'settings': instrumentation_settings(),
+            'routes': routes,
+            'connections_opened': connections,
+        })
+
+    def delete(self, request):
+        registry.reset()
+        registry.flush()
+        return Response(status=204)
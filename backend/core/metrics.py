@@ -0,0 +1,117 @@
+"""
+Prometheus text-format exposition for TTMS and PTMS.
+
+Request metrics come from the instrumentation registry
+(core.instrumentation): summed over all worker processes when
+METRICS['MULTIPROCESS_DIR'] is set, otherwise this process's only, with a
+``pid`` label so each worker is a separate series. Applications contribute further metric families
+through callables listed in METRICS['COLLECTORS']; each returns a list of
+(name, type, help, samples) tuples where samples are (labels, value) pairs.
+"""
+
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_GET
+
+from core.instrumentation import LATENCY_BUCKETS, merged_snapshot, multiprocess_dir
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_settings():
+    config = getattr(settings, 'METRICS', {})
+    return {
+        'TOKEN': config.get('TOKEN', ''),
+        'COLLECTORS': config.get('COLLECTORS', []),
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_families(families):
+    """Render (name, type, help, samples) tuples in the text exposition format."""
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in samples:
+            # Histogram samples carry their _bucket/_sum/_count name in __name__
+            sample_name = labels.pop('__name__', name)
+            lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def request_families():
+    """Latency histograms and DB counters per method and route."""
+    snapshot, connection_counts = merged_snapshot()
+    # Per-process values must stay separate series, or counters would jump
+    # between workers from one scrape to the next
+    process = {} if multiprocess_dir() else {'pid': os.getpid()}
+    duration, requests, queries, db_time, size = [], [], [], [], []
+    for (method, route), stats in sorted(snapshot.items()):
+        labels = {'method': method, 'route': route, **process}
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), stats.buckets):
+            cumulative += bucket_count
+            duration.append((
+                {'__name__': 'http_request_duration_seconds_bucket', **labels, 'le': _format_value(bound)},
+                cumulative,
+            ))
+        duration.append(({'__name__': 'http_request_duration_seconds_sum', **labels},
+                         round(stats.total_time, 6)))
+        duration.append(({'__name__': 'http_request_duration_seconds_count', **labels}, stats.count))
+        for code, count in sorted(stats.status_counts.items()):
+            requests.append(({**labels, 'status': code}, count))
+        queries.append((dict(labels), stats.total_queries))
+        db_time.append((dict(labels), round(stats.total_db_time, 6)))
+        size.append((dict(labels), stats.total_bytes))
+
+    connections = [({'alias': alias, **process}, count) for alias, count in sorted(connection_counts.items())]
+    return [
+        ('http_request_duration_seconds', 'histogram', 'Request wall time in seconds.', duration),
+        ('http_requests_total', 'counter', 'Requests by response status.', requests),
+        ('http_request_db_queries_total', 'counter', 'Database queries executed while serving requests.', queries),
+        ('http_request_db_seconds_total', 'counter', 'Time spent in database queries while serving requests.', db_time),
+        ('http_response_bytes_total', 'counter', 'Response body bytes (streaming responses excluded).', size),
+        ('db_connections_opened_total', 'counter', 'Database connections opened.', connections),
+    ]
+
+
+@require_GET
+def metrics_view(request):
+    """
+    GET /metrics
+
+    Prometheus scrape endpoint. When METRICS['TOKEN'] is set the scraper must
+    send it as a Bearer token; otherwise restrict access at the network level.
+    Request values cover all workers when METRICS['MULTIPROCESS_DIR'] is set.
+    """
+    config = metrics_settings()
+    if config['TOKEN']:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied.encode(), config['TOKEN'].encode()):
+            return HttpResponse('Unauthorized\n', status=401, content_type=CONTENT_TYPE)
+
+    families = request_families()
+    for path in config['COLLECTORS']:
+        families.extend(import_string(path)())
+    return HttpResponse(render_families(families), content_type=CONTENT_TYPE)
@@ -1,20 +1,69 @@
 import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 
+from core.instrumentation import registry, instrumentation_settings
+
 
 logger = logging.getLogger(__name__)
 
 
-class RequestLoggingMiddleware(MiddlewareMixin):
+class QueryCounter:
+    """Database execute wrapper counting queries and their total time"""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestInstrumentationMiddleware:
     """
-    Middleware to log all incoming requests
+    Middleware recording wall time, DB query count, DB time and response size
+    per resolved route into core.instrumentation.registry.
+    
+    Requests are sampled with INSTRUMENTATION['SAMPLE_RATE']; requests slower
+    than INSTRUMENTATION['SLOW_REQUEST_SECONDS'] are logged at WARNING.
     """
-    def process_request(self, request):
-        logger.info(f"{request.method} {request.path}")
-        return None
+    def __init__(self, get_response):
+        self.get_response = get_response
     
-    def process_response(self, request, response):
-        logger.info(f"{request.method} {request.path} - {response.status_code}")
+    def __call__(self, request):
+        config = instrumentation_settings()
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+        
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        
+        match = request.resolver_match
+        route = (match.view_name if match else None) or 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(request.method, route, duration, counter.count, counter.duration,
+                         size, response.status_code)
+        
+        if duration >= config['SLOW_REQUEST_SECONDS']:
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms DB, %d bytes",
+                request.method, request.path, route, duration * 1000,
+                counter.count, counter.duration * 1000, size
+            )
         return response
 
 
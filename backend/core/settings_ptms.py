@@ -26,8 +26,11 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        **DATABASE_CONNECTION,
     }
 }
+if DB_POOL_ENABLED and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['ENGINE'] = 'core.db.postgresql_pool'
 
 # PTMS URL configuration
 ROOT_URLCONF = 'core.urls_ptms'
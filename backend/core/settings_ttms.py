@@ -7,8 +7,9 @@ import os
 from datetime import timedelta
 from core.base_settings import *
 
-# Add TTMS app to installed apps
-INSTALLED_APPS = COMMON_INSTALLED_APPS + [
+# Add TTMS app to installed apps; daphne first so `runserver` serves ASGI and
+# the /api/ttms/stream/ event channel is not buffered in development
+INSTALLED_APPS = ['daphne'] + COMMON_INSTALLED_APPS + [
     'ttms.auth.apps.TTMSAuthConfig',
     'ttms',
 ]
@@ -25,8 +26,82 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        **DATABASE_CONNECTION,
     }
 }
+if DB_POOL_ENABLED and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['ENGINE'] = 'core.db.postgresql_pool'
+
+# KPI snapshot engine (ttms/kpi.py)
+# MIN_INTERVAL: debounce between recomputes triggered by writes (seconds)
+# MAX_AGE: recompute unconditionally once the snapshot is this old (seconds)
+KPI_SNAPSHOT = {
+    'MIN_INTERVAL': int(os.getenv('KPI_SNAPSHOT_MIN_INTERVAL', '5')),
+    'MAX_AGE': int(os.getenv('KPI_SNAPSHOT_MAX_AGE', '60')),
+}
+
+# Hourly/daily rollups (ttms/rollups.py), maintained by `manage.py rollup_metrics`
+ROLLUPS = {
+    'LOOKBACK_HOURS': int(os.getenv('ROLLUP_LOOKBACK_HOURS', '2')),
+    'KPI_FROM_ROLLUPS': os.getenv('ROLLUP_KPIS', 'True') == 'True',
+}
+
+# Monthly partitions of alerts, entries and sparkline points (ttms/partitions.py),
+# maintained by `manage.py maintain_partitions`; 0 retention months keeps everything
+PARTITIONS = {
+    'MONTHS_AHEAD': int(os.getenv('PARTITION_MONTHS_AHEAD', '3')),
+    'RETENTION_MONTHS': int(os.getenv('PARTITION_RETENTION_MONTHS', '0')),
+    'ARCHIVE_DIR': os.getenv('PARTITION_ARCHIVE_DIR', ''),
+}
+
+# Loading gate allocation (ttms/gates.py); entries older than QUEUE_HOURS leave the queue
+GATE_ALLOCATION = {
+    'QUEUE_HOURS': int(os.getenv('GATE_QUEUE_HOURS', '24')),
+}
+
+# Alert rule engine (ttms/alerts.py), run by `manage.py evaluate_alert_rules`
+# SLA_FACTOR: an active stage alerts once it exceeds standard_time x SLA_FACTOR
+# WEIGHBRIDGE_MINUTES / GATE_IDLE_MINUTES: thresholds of the other two rules
+ALERT_RULES = {
+    'ENABLED': [rule for rule in os.getenv('ALERT_RULES_ENABLED', 'over_sla,stuck_weighbridge,gate_idle').split(',') if rule],
+    'SLA_FACTOR': float(os.getenv('ALERT_SLA_FACTOR', '1.0')),
+    'SLA_LEVEL': os.getenv('ALERT_SLA_LEVEL', 'warning'),
+    'WEIGHBRIDGE_MINUTES': int(os.getenv('ALERT_WEIGHBRIDGE_MINUTES', '20')),
+    'GATE_IDLE_MINUTES': int(os.getenv('ALERT_GATE_IDLE_MINUTES', '10')),
+    'AUTO_RESOLVE': os.getenv('ALERT_AUTO_RESOLVE', 'True') == 'True',
+}
+
+# Vehicle ETA model (ttms/eta.py): days of completed stages learned from, seconds
+# before the cached model is re-learned, pseudo-samples shrinking sparse cells
+ETA = {
+    'TRAINING_DAYS': int(os.getenv('ETA_TRAINING_DAYS', '30')),
+    'REFRESH_SECONDS': int(os.getenv('ETA_REFRESH_SECONDS', '900')),
+    'MIN_SAMPLES': int(os.getenv('ETA_MIN_SAMPLES', '20')),
+}
+
+# Number of turnaround points kept in the in-process sparkline buffer (ttms/sparkline.py)
+SPARKLINE_BUFFER_SIZE = int(os.getenv('SPARKLINE_BUFFER_SIZE', '20'))
+# Seconds before a worker reloads it when no shared cache carries invalidations
+SPARKLINE_BUFFER_TTL = int(os.getenv('SPARKLINE_BUFFER_TTL', '30'))
+
+# Server-Sent Events stream (ttms/stream.py), served through core.asgi by daphne;
+# on PostgreSQL events from every process reach it through LISTEN/NOTIFY
+# KEEPALIVE: seconds between keepalive comments on an idle stream
+# MAX_DURATION: seconds before the server closes a stream (clients reconnect)
+# QUEUE_SIZE: events buffered per client before the oldest are dropped
+SSE_STREAM = {
+    'KEEPALIVE': int(os.getenv('SSE_KEEPALIVE', '15')),
+    'MAX_DURATION': int(os.getenv('SSE_MAX_DURATION', '300')),
+    'QUEUE_SIZE': int(os.getenv('SSE_QUEUE_SIZE', '100')),
+}
+
+# Domain gauges exported on /metrics (ttms/metrics.py)
+METRICS = {
+    **METRICS,
+    'COLLECTORS': ['ttms.metrics.collect_metrics'],
+}
+# Seconds the gauges are cached between scrapes
+METRICS_GAUGE_TTL = int(os.getenv('METRICS_GAUGE_TTL', '15'))
 
 # TTMS URL configuration
 ROOT_URLCONF = 'core.urls_ttms'
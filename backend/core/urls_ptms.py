@@ -8,6 +8,8 @@ Routes:
 - /admin/ - Django admin interface
 - /api/ptms/ - PTMS data endpoints (projects, tasks, etc.)
 - /api/ptms/auth/ - PTMS authentication endpoints
+- /api/ptms/instrumentation/ - Per-route request timings (admin only)
+- /metrics - Prometheus scrape endpoint
 """
 
 from django.contrib import admin
@@ -15,6 +17,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenVerifyView
 
+from core.instrumentation import InstrumentationView
+from core.metrics import metrics_view
+
 # Import PTMS auth views and viewsets
 from ptms.auth.views import (
     PTMSTokenObtainPairView,
@@ -42,6 +47,12 @@ urlpatterns = [
     # Admin interface
     path('admin/', admin.site.urls),
     
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='ptms-metrics'),
+    
+    # Request timing aggregates (admin only)
+    path('api/ptms/instrumentation/', InstrumentationView.as_view(), name='ptms-instrumentation'),
+    
     # API endpoints with PTMS router
     path('api/ptms/', include(router.urls)),
     
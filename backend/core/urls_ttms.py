@@ -8,6 +8,9 @@ Routes:
 - /admin/ - Django admin interface
 - /api/ttms/ - TTMS data endpoints (KPI, vehicles, parking, etc.)
 - /api/ttms/auth/ - TTMS authentication endpoints
+- /api/ttms/instrumentation/ - Per-route request timings (admin only)
+- /metrics - Prometheus scrape endpoint
+- /api/ttms/stream/ - Server-Sent Events push channel (ASGI only)
 """
 
 from django.contrib import admin
@@ -15,6 +18,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenVerifyView
 
+from core.instrumentation import InstrumentationView
+from core.metrics import metrics_view
+
 # Import TTMS auth views and viewsets
 from ttms.auth.views import (
     TTMSTokenObtainPairView,
@@ -32,7 +38,10 @@ from ttms.views import (
     SystemAlertViewSet,
     TurnaroundTimeSparklineViewSet,
     LoadingGateViewSet,
+    StageEventViewSet,
+    RollupViewSet,
 )
+from ttms.stream import event_stream
 
 # Create router for TTMS endpoints
 router = DefaultRouter()
@@ -49,11 +58,22 @@ router.register(r'vehicle-entries', VehicleEntryViewSet, basename='ttms-vehicle-
 router.register(r'alerts', SystemAlertViewSet, basename='ttms-alert')
 router.register(r'sparkline', TurnaroundTimeSparklineViewSet, basename='ttms-sparkline')
 router.register(r'loading-gates', LoadingGateViewSet, basename='ttms-loading-gate')
+router.register(r'stage-events', StageEventViewSet, basename='ttms-stage-event')
+router.register(r'rollups', RollupViewSet, basename='ttms-rollup')
 
 urlpatterns = [
     # Admin interface
     path('admin/', admin.site.urls),
     
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='ttms-metrics'),
+    
+    # Request timing aggregates (admin only)
+    path('api/ttms/instrumentation/', InstrumentationView.as_view(), name='ttms-instrumentation'),
+    
+    # Live change events (Server-Sent Events)
+    path('api/ttms/stream/', event_stream, name='ttms-stream'),
+    
     # API endpoints with TTMS router
     path('api/ttms/', include(router.urls)),
     
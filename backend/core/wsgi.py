@@ -1,7 +1,14 @@
 import os
 
+from django.apps import apps
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+
+# Let apps fill in-process caches before the first request
+for app_config in apps.get_app_configs():
+    if hasattr(app_config, 'warm_up'):
+        app_config.warm_up()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     KPIMetrics, Vehicle, VehicleStage, ParkingCell,
-    VehicleEntry, SystemAlert, TurnaroundTimeSparkline
+    VehicleEntry, SystemAlert, TurnaroundTimeSparkline, StageEvent
 )
 
 
@@ -15,10 +15,10 @@ class KPIMetricsAdmin(admin.ModelAdmin):
 
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
-    list_display = ('reg_no', 'rfid_no', 'progress', 'turnaround_time', 'timestamp')
-    list_filter = ('timestamp', 'created_at')
+    list_display = ('reg_no', 'rfid_no', 'current_stage', 'current_state', 'progress', 'turnaround_time', 'timestamp')
+    list_filter = ('current_state', 'timestamp', 'created_at')
     search_fields = ('reg_no', 'rfid_no')
-    readonly_fields = ('created_at', 'updated_at', 'timestamp')
+    readonly_fields = ('created_at', 'updated_at', 'timestamp', 'current_stage', 'current_state', 'completed_at')
     ordering = ('-timestamp',)
 
 
@@ -31,6 +31,15 @@ class VehicleStageAdmin(admin.ModelAdmin):
     ordering = ('vehicle', 'stage')
 
 
+@admin.register(StageEvent)
+class StageEventAdmin(admin.ModelAdmin):
+    list_display = ('vehicle', 'stage', 'state', 'occurred_at', 'source', 'recorded_at')
+    list_filter = ('stage', 'state', 'source', 'occurred_at')
+    search_fields = ('vehicle__reg_no', 'idempotency_key', 'source')
+    readonly_fields = ('idempotency_key', 'vehicle', 'stage', 'state', 'occurred_at', 'source', 'recorded_at')
+    ordering = ('-occurred_at',)
+
+
 @admin.register(ParkingCell)
 class ParkingCellAdmin(admin.ModelAdmin):
     list_display = ('area', 'label', 'status', 'vehicle', 'updated_at')
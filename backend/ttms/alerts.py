@@ -0,0 +1,276 @@
+"""
+Bulk operations on system alerts and the rule engine that raises them.
+
+Every alert raised through raise_alert() carries a fingerprint: the
+caller's (rules use the rule plus the stage or gate concerned) or a hash of
+level, normalized message and vehicle. At most one unresolved alert exists
+per fingerprint (ttms_alert_open_fp_uniq); a repeat increments that alert's
+occurrences and last_seen_at instead of inserting a row, so a misbehaving
+reader produces one active alert with a counter rather than thousands of
+rows. On PostgreSQL, where the partitioned alert table cannot hold a unique
+index without created_at, the upsert is serialized per fingerprint with a
+transaction-level advisory lock instead.
+
+evaluate_rules() reads every active stage in one query (and the idle gates
+with a non-empty queue in another), evaluates the enabled rules against
+them and writes the outcome in bulk: conditions that already have an open
+alert count a repeat on it with one UPDATE, new ones are inserted with one
+bulk_create, and open rule alerts whose condition has cleared are resolved
+with one UPDATE. A truck stuck for an hour therefore yields one alert, not
+one per evaluation. Run it periodically with
+``manage.py evaluate_alert_rules --interval 60`` from a single worker.
+"""
+
+import hashlib
+import itertools
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, TextField, Value, When
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from .gates import waiting_entries
+from .models import LoadingGate, SystemAlert, VehicleStage
+
+
+RESOLVE_BATCH_SIZE = 1000
+
+RULES = ('over_sla', 'stuck_weighbridge', 'gate_idle')
+
+WEIGHBRIDGE_STAGES = ('tareWeighing', 'postLoadingWeighing')
+
+STAGE_LABELS = dict(VehicleStage.STAGE_CHOICES)
+
+# Timestamps and clock times vary between repeats of the same problem
+VOLATILE_PATTERN = re.compile(
+    r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?|\b\d{1,2}:\d{2}(:\d{2})?\b'
+)
+
+ActiveStage = namedtuple('ActiveStage', 'id vehicle_id reg_no stage started_at standard_time time_taken')
+
+
+def rule_settings():
+    config = getattr(settings, 'ALERT_RULES', {})
+    return {
+        'ENABLED': config.get('ENABLED', RULES),
+        'SLA_FACTOR': config.get('SLA_FACTOR', 1.0),
+        'SLA_LEVEL': config.get('SLA_LEVEL', 'warning'),
+        'WEIGHBRIDGE_MINUTES': config.get('WEIGHBRIDGE_MINUTES', 20),
+        'GATE_IDLE_MINUTES': config.get('GATE_IDLE_MINUTES', 10),
+        'AUTO_RESOLVE': config.get('AUTO_RESOLVE', True),
+    }
+
+
+def normalize_message(message):
+    """Case-fold, mask timestamps and collapse whitespace."""
+    return ' '.join(VOLATILE_PATTERN.sub('<time>', message).casefold().split())
+
+
+def alert_fingerprint(level, message, vehicle_id=None):
+    source = f'{level}|{normalize_message(message)}|{vehicle_id or ""}'
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def _lock_fingerprint(fingerprint):
+    # Held until the transaction ends; stands in for the unique index that
+    # the partitioned table cannot have
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', ['ttms_alert:' + fingerprint])
+
+
+def _bump_open(fingerprints, now, messages=None):
+    """
+    Count a repeat on the open alerts with these fingerprints.
+
+    messages maps fingerprints to a new message text, so alerts that report a
+    changing figure (minutes elapsed) show the latest one.
+    """
+    changes = {'occurrences': F('occurrences') + 1, 'last_seen_at': now}
+    if messages:
+        changes['message'] = Case(
+            *[When(fingerprint=fingerprint, then=Value(message)) for fingerprint, message in messages.items()],
+            default=F('message'),
+            output_field=TextField(),
+        )
+    return SystemAlert.objects.filter(is_resolved=False, fingerprint__in=fingerprints).update(**changes)
+
+
+def raise_alert(level, message, vehicle_id=None, fingerprint='', now=None):
+    """
+    Insert an alert, or count a repeat on the open alert with the same fingerprint.
+
+    Returns:
+        (alert, created)
+    """
+    from . import stream
+
+    now = now or timezone.now()
+    fingerprint = fingerprint or alert_fingerprint(level, message, vehicle_id)
+    open_alerts = SystemAlert.objects.filter(fingerprint=fingerprint, is_resolved=False)
+    with transaction.atomic():
+        _lock_fingerprint(fingerprint)
+        if not _bump_open([fingerprint], now):
+            try:
+                with transaction.atomic():
+                    alert = SystemAlert.objects.create(
+                        level=level, message=message, vehicle_id=vehicle_id,
+                        fingerprint=fingerprint, last_seen_at=now,
+                    )
+                return alert, True
+            except IntegrityError:
+                # Inserted concurrently (backends without the advisory lock)
+                _bump_open([fingerprint], now)
+        # The repeat is a queryset update, which sends no post_save
+        alert = open_alerts.select_related('vehicle').get()
+        stream.on_alert_saved(SystemAlert, alert)
+        transaction.on_commit(lambda: bump_generation(SystemAlert))
+        return alert, False
+
+
+def resolve_open_alerts(batch_size=RESOLVE_BATCH_SIZE):
+    """
+    Resolve every unresolved alert raised up to now, newest first, in batches.
+
+    Each batch is a short UPDATE of at most batch_size rows, bounded on
+    created_at so it only touches the partitions holding them; alerts raised
+    while this runs are left open.
+
+    Returns:
+        Number of alerts resolved
+    """
+    now = timezone.now()
+    open_alerts = SystemAlert.objects.filter(is_resolved=False, created_at__lte=now).order_by('-created_at', '-id')
+    resolved = 0
+    while True:
+        batch = list(open_alerts.values_list('id', 'created_at')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            resolved += SystemAlert.objects.filter(
+                id__in=[alert_id for alert_id, _ in batch],
+                created_at__gte=batch[-1][1],
+                created_at__lte=batch[0][1],
+                is_resolved=False,
+            ).update(is_resolved=True, resolved_at=now)
+    if resolved:
+        bump_generation(SystemAlert)
+    return resolved
+
+
+def _elapsed(stage, now):
+    """Minutes spent in an active stage so far."""
+    return max(stage.time_taken, int((now - stage.started_at).total_seconds() // 60))
+
+
+def _active_stages():
+    return [
+        ActiveStage(*row) for row in VehicleStage.objects.filter(state='active', started_at__isnull=False).values_list(
+            'id', 'vehicle_id', 'vehicle__reg_no', 'stage', 'started_at', 'standard_time', 'time_taken'
+        )
+    ]
+
+
+def over_sla(stages, now, config):
+    """Active stages running longer than SLA_FACTOR x their standard time."""
+    for stage in stages:
+        elapsed = _elapsed(stage, now)
+        if stage.standard_time > 0 and elapsed > stage.standard_time * config['SLA_FACTOR']:
+            yield SystemAlert(
+                fingerprint=f'over_sla:{stage.id}',
+                level=config['SLA_LEVEL'],
+                message=(
+                    f'{stage.reg_no} over SLA at {STAGE_LABELS.get(stage.stage, stage.stage)}: '
+                    f'{elapsed} min (standard {stage.standard_time} min)'
+                ),
+                vehicle_id=stage.vehicle_id,
+            )
+
+
+def stuck_weighbridge(stages, now, config):
+    """Vehicles on a weighbridge for longer than WEIGHBRIDGE_MINUTES."""
+    for stage in stages:
+        elapsed = _elapsed(stage, now)
+        if stage.stage in WEIGHBRIDGE_STAGES and elapsed > config['WEIGHBRIDGE_MINUTES']:
+            yield SystemAlert(
+                fingerprint=f'stuck_weighbridge:{stage.id}',
+                level='critical',
+                message=(
+                    f'{stage.reg_no} stuck at {STAGE_LABELS.get(stage.stage, stage.stage)} for {elapsed} min'
+                ),
+                vehicle_id=stage.vehicle_id,
+            )
+
+
+def gate_idle(stages, now, config):
+    """Gates available for GATE_IDLE_MINUTES while entries wait in their area."""
+    queued = waiting_entries(now=now).filter(area=OuterRef('area'))
+    idle = LoadingGate.objects.filter(
+        status='available', updated_at__lte=now - timedelta(minutes=config['GATE_IDLE_MINUTES'])
+    ).filter(Exists(queued)).order_by('area', 'name')
+    for gate in idle:
+        yield SystemAlert(
+            fingerprint=f'gate_idle:{gate.id}',
+            level='warning',
+            message=f'Gate {gate.name} ({gate.area}) idle while vehicles are queued',
+        )
+
+
+RULE_FUNCTIONS = {'over_sla': over_sla, 'stuck_weighbridge': stuck_weighbridge, 'gate_idle': gate_idle}
+
+
+def evaluate_rules(now=None):
+    """
+    Evaluate the enabled alert rules once and write the result in bulk.
+
+    Returns:
+        Dict with the number of alerts created, already open and resolved
+    """
+    from . import stream
+
+    now = now or timezone.now()
+    config = rule_settings()
+    enabled = [rule for rule in config['ENABLED'] if rule in RULE_FUNCTIONS]
+    stages = _active_stages() if {'over_sla', 'stuck_weighbridge'} & set(enabled) else []
+
+    firing = {}
+    for rule in enabled:
+        for alert in RULE_FUNCTIONS[rule](stages, now, config):
+            firing[alert.fingerprint] = alert
+
+    with transaction.atomic():
+        already_open = set(
+            SystemAlert.objects.filter(is_resolved=False, fingerprint__in=list(firing))
+            .values_list('fingerprint', flat=True)
+        )
+        if already_open:
+            _bump_open(
+                list(already_open), now,
+                messages={fingerprint: firing[fingerprint].message for fingerprint in already_open},
+            )
+        for alert in firing.values():
+            alert.last_seen_at = now
+        created = SystemAlert.objects.bulk_create(
+            [alert for fingerprint, alert in firing.items() if fingerprint not in already_open],
+            batch_size=500,
+        )
+        resolved = 0
+        if config['AUTO_RESOLVE'] and enabled:
+            from_rules = Q()
+            for rule in enabled:
+                from_rules |= Q(fingerprint__startswith=f'{rule}:')
+            resolved = SystemAlert.objects.filter(from_rules, is_resolved=False).exclude(
+                fingerprint__in=list(firing)
+            ).update(is_resolved=True, resolved_at=now)
+        if created or resolved or already_open:
+            transaction.on_commit(lambda: bump_generation(SystemAlert))
+        repeated = SystemAlert.objects.filter(
+            is_resolved=False, fingerprint__in=list(already_open)
+        ).select_related('vehicle') if already_open else []
+        for alert in itertools.chain(created, repeated):
+            stream.on_alert_saved(SystemAlert, alert)
+    return {'created': len(created), 'open': len(already_open), 'resolved': resolved}
@@ -0,0 +1,108 @@
+"""
+Stage time analytics for the reports page.
+
+Stage durations (``time_taken``, whole minutes) are reduced in the database
+to two result sets per breakdown: a GROUP BY summary (count, mean, SLA
+breaches against ``standard_time``) and the cumulative distribution of
+distinct durations, computed with COUNT() and CUME_DIST() window functions.
+Percentiles and histograms are read off that distribution, so the work
+outside the database is proportional to the number of distinct minute
+values, not to the number of stages.
+"""
+
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import CumeDist, ExtractHour
+
+from .models import VehicleStage, VehicleEntry
+
+
+PERCENTILES = (50, 90, 99)
+
+# Histogram upper bounds in minutes; the last bucket is open-ended
+HISTOGRAM_BOUNDS = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240)
+
+BREAKDOWNS = {
+    'stage': ('stage',),
+    'area': ('stage', 'area'),
+    'hour': ('stage', 'hour'),
+}
+
+
+def _stage_queryset(start, end):
+    # Area of the gate entry that preceded the stage, i.e. the visit it belongs to
+    entry_area = (
+        VehicleEntry.objects.filter(vehicle_id=OuterRef('vehicle_id'), gate_entry_time__lte=OuterRef('started_at'))
+        .order_by('-gate_entry_time', '-id')
+        .values('area')[:1]
+    )
+    return VehicleStage.objects.filter(
+        state='completed', started_at__gte=start, started_at__lte=end
+    ).annotate(area=Subquery(entry_area), hour=ExtractHour('started_at')).order_by()
+
+
+def _percentile(distribution, percentile):
+    """Nearest-rank percentile over sorted (value, count, cume_dist) rows."""
+    for value, _, cume_dist in distribution:
+        if cume_dist >= percentile / 100:
+            return value
+    return distribution[-1][0]
+
+
+def _histogram(distribution):
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value, count, _ in distribution:
+        index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS) if value <= bound), len(HISTOGRAM_BOUNDS))
+        counts[index] += count
+    return [
+        {'le': bound, 'count': count}
+        for bound, count in zip(list(HISTOGRAM_BOUNDS) + [None], counts)
+    ]
+
+
+def _breakdown(queryset, keys):
+    summaries = queryset.values(*keys).annotate(
+        count=Count('id'),
+        mean=Avg('time_taken'),
+        breaches=Count('id', filter=Q(time_taken__gt=F('standard_time'))),
+    )
+    partition = [F(key) for key in keys]
+    rows = queryset.annotate(
+        n=Window(Count('id'), partition_by=partition + [F('time_taken')]),
+        cume_dist=Window(CumeDist(), partition_by=partition, order_by=F('time_taken').asc()),
+    ).values_list(*keys, 'time_taken', 'n', 'cume_dist').distinct()
+    distributions = {}
+    for row in sorted(rows, key=lambda row: row[len(keys)]):
+        distributions.setdefault(row[:len(keys)], []).append(row[len(keys):])
+
+    results = []
+    for row in summaries:
+        group = tuple(row[key] for key in keys)
+        distribution = distributions.get(group, [])
+        total = row['count']
+        results.append({
+            **{key: row[key] for key in keys},
+            'count': total,
+            'mean': round(row['mean'] or 0, 2),
+            **{f'p{p}': _percentile(distribution, p) if distribution else None for p in PERCENTILES},
+            'sla_breach_rate': round(row['breaches'] / total, 4) if total else 0.0,
+            'histogram': _histogram(distribution),
+        })
+    results.sort(key=lambda item: tuple((item[key] is None, item[key] or 0) for key in keys))
+    return results
+
+
+def stage_time_report(start, end):
+    """
+    Per-stage duration statistics for completed stages started in [start, end].
+
+    Returns:
+        Dict with the range and one list per breakdown (stage, stage x area,
+        stage x hour of start)
+    """
+    queryset = _stage_queryset(start, end)
+    return {
+        'start': start,
+        'end': end,
+        'histogram_bounds': list(HISTOGRAM_BOUNDS),
+        **{name: _breakdown(queryset, keys) for name, keys in BREAKDOWNS.items()},
+    }
@@ -1,7 +1,27 @@
+import logging
+
 from django.apps import AppConfig
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
 
 
 class TtmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ttms'
     verbose_name = 'Truck Turnaround Time Monitoring System'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
+
+    def warm_up(self):
+        """Fill in-process caches before the first request (called by core.wsgi and core.asgi)."""
+        from .sparkline import buffer
+        try:
+            buffer.values()
+        except DatabaseError:
+            # Not migrated yet; the buffer fills on first read instead
+            logger.warning('Could not warm the sparkline buffer', exc_info=True)
+        finally:
+            connection.close()
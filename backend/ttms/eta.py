@@ -0,0 +1,218 @@
+"""
+Predicted exit times for the vehicles in the plant.
+
+The model is a table of stage duration means and variances indexed by
+(stage, area, hour of stage start), learned from the completed stages of the
+last TRAINING_DAYS with one grouped query. Sparse cells are shrunk towards
+their (stage, area) and then stage-wide figures (MIN_SAMPLES pseudo-counts),
+and stages with no history fall back to the standard time. The fitted arrays
+are cached for REFRESH_SECONDS, so the model is re-learned periodically by
+whichever request finds it expired.
+
+predict() then computes the remaining time of every active vehicle at once:
+the rest of the current stage plus each later stage, looked up at the hour
+the vehicle is expected to reach it. It loops over the five stages, never
+over vehicles, so 500 trucks cost a handful of NumPy operations.
+"""
+
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .analytics import _stage_queryset
+from .models import STAGE_CHOICES, Vehicle, VehicleEntry, VehicleStage
+
+
+CACHE_KEY = 'ttms:eta:model'
+
+STAGES = [value for value, _ in STAGE_CHOICES]
+
+# One-sided z-score of the 90th percentile, for the pessimistic estimate
+Z_P90 = 1.2816
+
+
+def eta_settings():
+    config = getattr(settings, 'ETA', {})
+    return {
+        'TRAINING_DAYS': config.get('TRAINING_DAYS', 30),
+        'REFRESH_SECONDS': config.get('REFRESH_SECONDS', 900),
+        'MIN_SAMPLES': config.get('MIN_SAMPLES', 20),
+    }
+
+
+def _shrink(total, total_sq, count, prior_mean, prior_sq, weight):
+    """Posterior mean and second moment with ``weight`` pseudo-samples of the prior."""
+    mean = (total + weight * prior_mean) / (count + weight)
+    second = (total_sq + weight * prior_sq) / (count + weight)
+    return mean, second
+
+
+def train(now=None):
+    """Learn the duration table from completed stages of the last TRAINING_DAYS."""
+    now = now or timezone.now()
+    config = eta_settings()
+    rows = list(
+        _stage_queryset(now - timedelta(days=config['TRAINING_DAYS']), now)
+        .values('stage', 'area', 'hour')
+        .annotate(n=Count('id'), mean=Avg('time_taken'), mean_sq=Avg(F('time_taken') * F('time_taken')))
+    )
+    standard = dict(
+        VehicleStage.objects.values_list('stage').annotate(standard=Avg('standard_time')).order_by()
+    )
+
+    areas = sorted({row['area'] for row in rows if row['area'] is not None})
+    area_index = {area: index for index, area in enumerate(areas)}
+    # The last area slot holds stages without an area and serves unknown areas
+    shape = (len(STAGES), len(areas) + 1, 24)
+    count, total, total_sq = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    stage_index = {stage: index for index, stage in enumerate(STAGES)}
+    for row in rows:
+        if row['stage'] not in stage_index or row['hour'] is None:
+            continue
+        cell = (stage_index[row['stage']], area_index.get(row['area'], len(areas)), row['hour'])
+        count[cell] = row['n']
+        total[cell] = row['mean'] * row['n']
+        total_sq[cell] = row['mean_sq'] * row['n']
+
+    # Stage-wide prior: observed figures, else the standard time with a 50% spread
+    default = VehicleStage._meta.get_field('standard_time').default
+    stage_count = count.sum(axis=(1, 2))
+    fallback = np.array([standard.get(stage) or default for stage in STAGES], dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stage_mean = np.where(stage_count > 0, total.sum(axis=(1, 2)) / stage_count, fallback)
+        stage_sq = np.where(
+            stage_count > 0, total_sq.sum(axis=(1, 2)) / stage_count, fallback ** 2 * 1.25
+        )
+
+    weight = config['MIN_SAMPLES']
+    area_mean, area_sq = _shrink(
+        total.sum(axis=2), total_sq.sum(axis=2), count.sum(axis=2),
+        stage_mean[:, None], stage_sq[:, None], weight,
+    )
+    mean, second = _shrink(total, total_sq, count, area_mean[:, :, None], area_sq[:, :, None], weight)
+    return {
+        'areas': areas,
+        'mean': mean,
+        'var': np.maximum(second - mean ** 2, 0.0),
+        'samples': int(count.sum()),
+        'trained_at': now,
+    }
+
+
+def get_model():
+    """The cached model, re-learned once it is older than REFRESH_SECONDS."""
+    model = cache.get(CACHE_KEY)
+    if model is None:
+        model = train()
+        cache.set(CACHE_KEY, model, eta_settings()['REFRESH_SECONDS'])
+    return model
+
+
+def _hour(seconds, utc_offset):
+    return ((seconds + utc_offset) // 3600 % 24).astype(np.intp)
+
+
+def predict(model, stage_index, area_index, elapsed, now_ts, utc_offset=0):
+    """
+    Remaining minutes until exit for many vehicles at once.
+
+    Args:
+        model: Result of train()
+        stage_index: Index into STAGES of each vehicle's current stage
+        area_index: Index into the model areas (len(areas) when unknown)
+        elapsed: Minutes already spent in the current stage
+        now_ts: Current POSIX timestamp
+        utc_offset: Seconds east of UTC of the local time used for hours
+
+    Returns:
+        (mean, variance) arrays of the remaining minutes
+    """
+    mean, var = model['mean'], model['var']
+    stage_index = np.asarray(stage_index, dtype=np.intp)
+    area_index = np.asarray(area_index, dtype=np.intp)
+    elapsed = np.asarray(elapsed, dtype=float)
+
+    started = _hour(now_ts - elapsed * 60, utc_offset)
+    remaining = np.maximum(mean[stage_index, area_index, started] - elapsed, 0.0)
+    variance = var[stage_index, area_index, started]
+    for stage in range(1, mean.shape[0]):
+        upcoming = stage > stage_index
+        hour = _hour(now_ts + remaining * 60, utc_offset)
+        remaining += np.where(upcoming, mean[stage, area_index, hour], 0.0)
+        variance += np.where(upcoming, var[stage, area_index, hour], 0.0)
+    return remaining, variance
+
+
+def _active_vehicles():
+    latest_entry = VehicleEntry.objects.filter(vehicle_id=OuterRef('pk')).order_by('-gate_entry_time', '-id')
+    current_stage = VehicleStage.objects.filter(vehicle_id=OuterRef('pk'), stage=OuterRef('current_stage'))
+    return list(
+        Vehicle.objects.filter(current_state__in=['active', 'pending'], current_stage__in=STAGES)
+        .annotate(
+            area=Subquery(latest_entry.values('area')[:1]),
+            entered_at=Subquery(latest_entry.values('gate_entry_time')[:1]),
+            stage_started_at=Subquery(current_stage.values('started_at')[:1]),
+        )
+        .order_by('id')
+        .values_list('id', 'reg_no', 'current_stage', 'current_state', 'area', 'entered_at', 'stage_started_at')
+    )
+
+
+def predict_active(now=None):
+    """
+    Predicted exit of every vehicle in progress.
+
+    Returns:
+        Dict with the model metadata and one prediction per vehicle
+    """
+    now = now or timezone.now()
+    model = get_model()
+    vehicles = _active_vehicles()
+    area_index = {area: index for index, area in enumerate(model['areas'])}
+    stage_index = {stage: index for index, stage in enumerate(STAGES)}
+
+    elapsed = [
+        max((now - started).total_seconds() / 60, 0.0) if state == 'active' and started else 0.0
+        for _, _, _, state, _, _, started in vehicles
+    ]
+    remaining, variance = predict(
+        model,
+        [stage_index[stage] for _, _, stage, *_ in vehicles],
+        [area_index.get(area, len(model['areas'])) for _, _, _, _, area, _, _ in vehicles],
+        elapsed,
+        now.timestamp(),
+        timezone.localtime(now).utcoffset().total_seconds(),
+    )
+    p90 = remaining + Z_P90 * np.sqrt(variance)
+
+    predictions = []
+    for (vehicle_id, reg_no, stage, state, area, entered_at, _), minutes, pessimistic in zip(
+        vehicles, remaining.tolist(), p90.tolist()
+    ):
+        exit_at = now + timedelta(minutes=minutes)
+        inside = (now - entered_at).total_seconds() / 60 if entered_at else None
+        predictions.append({
+            'vehicle': vehicle_id,
+            'reg_no': reg_no,
+            'current_stage': stage,
+            'current_state': state,
+            'area': area,
+            'remaining_minutes': round(minutes, 1),
+            'predicted_exit': exit_at,
+            'predicted_exit_p90': now + timedelta(minutes=pessimistic),
+            'predicted_turnaround': round(inside + minutes) if inside is not None else None,
+            'progress': (
+                min(100, math.floor(100 * inside / (inside + minutes))) if inside and inside + minutes > 0 else 0
+            ),
+        })
+    return {
+        'generated_at': now,
+        'model_trained_at': model['trained_at'],
+        'model_samples': model['samples'],
+        'vehicles': predictions,
+    }
@@ -0,0 +1,303 @@
+"""
+Stage event log ingestion and projection.
+
+Every stage state change is appended to StageEvent: reader batches with
+their idempotency keys (a single INSERT; retries with a known key are
+skipped), the batch stage_events endpoint and API edits of a stage's state
+with generated keys. Only the newly appended events are then applied, in
+(occurred_at, arrival) order, to the vehicle's current VehicleStage rows, so
+a write costs the same however long the vehicle's history is. An event older
+than the times already recorded on its stage cannot be applied on top, and
+triggers a full replay of that vehicle instead. The same replay backs the
+replay_stage_events management command.
+"""
+
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from .models import Vehicle, VehicleStage, StageEvent
+from .stages import apply_stage_transition, notify_bulk_stage_write, sync_current_stages
+
+
+PROJECTED_STAGE_FIELDS = ['state', 'started_at', 'finished_at', 'time_taken', 'updated_at']
+
+TURNAROUND_STAGES = ('gateEntry', 'gateExit')
+
+
+def _append(rows):
+    """
+    Insert event rows and return the ones this transaction inserted.
+
+    A concurrent retry can insert the same idempotency key between the
+    lookup and the insert; the batch is then retried row by row and the
+    rows that lost the race are left out.
+    """
+    try:
+        with transaction.atomic():
+            return StageEvent.objects.bulk_create(rows)
+    except IntegrityError:
+        inserted = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    StageEvent.objects.bulk_create([row])
+                inserted.append(row)
+            except IntegrityError:
+                pass
+        return inserted
+
+
+def ingest_stage_events(events):
+    """
+    Append validated events to the log and project them.
+
+    Args:
+        events: List of dicts with idempotency_key, rfid_no or reg_no, stage,
+            state and optional timestamp and source
+
+    Returns:
+        List of per-event results in input order
+    """
+    rfids = {event['rfid_no'] for event in events if event.get('rfid_no')}
+    reg_nos = {event['reg_no'] for event in events if event.get('reg_no')}
+    by_rfid, by_reg_no = {}, {}
+    for vehicle_id, reg_no, rfid_no in Vehicle.objects.filter(
+        Q(rfid_no__in=rfids) | Q(reg_no__in=reg_nos)
+    ).values_list('id', 'reg_no', 'rfid_no'):
+        by_reg_no[reg_no] = vehicle_id
+        if rfid_no:
+            by_rfid[rfid_no] = vehicle_id
+
+    keys = [event['idempotency_key'] for event in events]
+    seen = set(
+        StageEvent.objects.filter(idempotency_key__in=keys).order_by().values_list('idempotency_key', flat=True)
+    )
+
+    now = timezone.now()
+    results = []
+    rows = {}
+    for index, event in enumerate(events):
+        key = event['idempotency_key']
+        vehicle_id = by_rfid.get(event.get('rfid_no')) or by_reg_no.get(event.get('reg_no'))
+        if key in seen:
+            results.append({'index': index, 'status': 'duplicate', 'idempotency_key': key})
+            continue
+        if vehicle_id is None:
+            results.append({'index': index, 'status': 'error', 'error': 'Vehicle not found'})
+            continue
+        seen.add(key)
+        rows[index] = StageEvent(
+            idempotency_key=key,
+            vehicle_id=vehicle_id,
+            stage=event['stage'],
+            state=event['state'],
+            occurred_at=event.get('timestamp') or now,
+            source=event.get('source', ''),
+        )
+        results.append({'index': index, 'status': 'recorded', 'idempotency_key': key, 'vehicle': vehicle_id})
+
+    with transaction.atomic():
+        inserted = _append(list(rows.values()))
+        if len(inserted) < len(rows):
+            kept = {id(row) for row in inserted}
+            for index, row in rows.items():
+                if id(row) not in kept:
+                    results[index] = {'index': index, 'status': 'duplicate', 'idempotency_key': row.idempotency_key}
+        project_events(inserted)
+    return results
+
+
+def apply_stage_events(events):
+    """
+    Log and project stage transitions that carry no idempotency key.
+
+    Backs the batch stage_events endpoint: each event gets a generated key,
+    so it is recorded in the log like any reader event.
+
+    Returns:
+        List of per-event results in input order
+    """
+    results = ingest_stage_events([
+        {**event, 'idempotency_key': event.get('idempotency_key') or uuid.uuid4().hex} for event in events
+    ])
+    for result, event in zip(results, events):
+        if result['status'] == 'recorded':
+            result.pop('idempotency_key')
+            result.update(status='applied', stage=event['stage'], state=event['state'])
+    return results
+
+
+def record_stage_change(vehicle_id, stage, state, timestamp=None, source='api'):
+    """Log and project a single stage state change made through the API."""
+    with transaction.atomic():
+        project_events(_append([StageEvent(
+            idempotency_key=uuid.uuid4().hex,
+            vehicle_id=vehicle_id,
+            stage=stage,
+            state=state,
+            occurred_at=timestamp or timezone.now(),
+            source=source,
+        )]))
+
+
+def save_stage(serializer, source='api'):
+    """
+    Save a VehicleStage serializer, routing a state change through the log.
+
+    The state and the timing it implies come from projecting the logged
+    event; the other validated fields are saved as given.
+    """
+    state = serializer.validated_data.pop('state', None)
+    with transaction.atomic():
+        stage = serializer.save()
+        if state is not None:
+            record_stage_change(stage.vehicle_id, stage.stage, state, source=source)
+            stage.refresh_from_db()
+    return stage
+
+
+def _turnaround_minutes(stages):
+    entry = stages.get('gateEntry')
+    exit_ = stages.get('gateExit')
+    if entry is None or exit_ is None or not entry.started_at or not exit_.finished_at:
+        return None
+    return max(0, int((exit_.finished_at - entry.started_at).total_seconds() // 60))
+
+
+def _last_recorded(stage):
+    times = [value for value in (stage.started_at, stage.finished_at) if value]
+    return max(times) if times else None
+
+
+def project_events(events):
+    """
+    Apply newly appended events to the current stage rows of their vehicles.
+
+    Vehicles receiving an event older than the last time recorded on its
+    stage are replayed in full with project_vehicles() instead.
+
+    Args:
+        events: StageEvent instances just inserted, in arrival order
+
+    Returns:
+        Number of stage rows written
+    """
+    if not events:
+        return 0
+    vehicle_ids = {event.vehicle_id for event in events}
+    now = timezone.now()
+    with transaction.atomic():
+        transaction.on_commit(lambda: bump_generation(StageEvent))
+        stages = {}
+        for stage in VehicleStage.objects.select_for_update().filter(vehicle_id__in=vehicle_ids).order_by('pk'):
+            stages.setdefault(stage.vehicle_id, {})[stage.stage] = stage
+
+        late = set()
+        for event in events:
+            stage = stages.get(event.vehicle_id, {}).get(event.stage)
+            recorded = _last_recorded(stage) if stage is not None else None
+            if recorded is not None and event.occurred_at < recorded:
+                late.add(event.vehicle_id)
+
+        created, updated, turnaround_ids = {}, {}, set()
+        ordered = sorted(enumerate(events), key=lambda item: (item[1].occurred_at, item[0]))
+        for _, event in ordered:
+            if event.vehicle_id in late:
+                continue
+            vehicle_stages = stages.setdefault(event.vehicle_id, {})
+            key = (event.vehicle_id, event.stage)
+            stage = vehicle_stages.get(event.stage)
+            if stage is None:
+                stage = vehicle_stages[event.stage] = created[key] = VehicleStage(
+                    vehicle_id=event.vehicle_id, stage=event.stage
+                )
+            elif key not in created:
+                updated[key] = stage
+            apply_stage_transition(stage, event.state, event.occurred_at)
+            stage.updated_at = now
+            if event.stage in TURNAROUND_STAGES:
+                turnaround_ids.add(event.vehicle_id)
+
+        turnaround = []
+        for vehicle_id in turnaround_ids:
+            minutes = _turnaround_minutes(stages[vehicle_id])
+            if minutes is not None:
+                turnaround.append(Vehicle(pk=vehicle_id, turnaround_time=minutes, updated_at=now))
+
+        VehicleStage.objects.bulk_create(created.values())
+        VehicleStage.objects.bulk_update(updated.values(), PROJECTED_STAGE_FIELDS, batch_size=500)
+        if turnaround:
+            Vehicle.objects.bulk_update(turnaround, ['turnaround_time', 'updated_at'], batch_size=500)
+            transaction.on_commit(lambda: bump_generation(Vehicle))
+        sync_current_stages(vehicle_ids - late)
+        notify_bulk_stage_write(list(created.values()) + list(updated.values()))
+        written = len(created) + len(updated)
+        if late:
+            written += project_vehicles(late)
+    return written
+
+
+def project_vehicles(vehicle_ids):
+    """
+    Rebuild VehicleStage timing/state and Vehicle.turnaround_time from the log.
+
+    Replays each vehicle's whole history; used for late events and by the
+    replay_stage_events command. Stages with at least one event are reset and replayed from scratch; stages
+    without events and fields the log does not carry (wait_time,
+    standard_time) are left untouched.
+
+    Args:
+        vehicle_ids: Iterable of Vehicle primary keys
+
+    Returns:
+        Number of stage rows written
+    """
+    vehicle_ids = set(vehicle_ids)
+    if not vehicle_ids:
+        return 0
+
+    events = {}
+    for event in StageEvent.objects.filter(vehicle_id__in=vehicle_ids).order_by('occurred_at', 'id'):
+        events.setdefault(event.vehicle_id, []).append(event)
+
+    now = timezone.now()
+    with transaction.atomic():
+        stages = {}
+        for stage in VehicleStage.objects.select_for_update().filter(vehicle_id__in=vehicle_ids):
+            stages.setdefault(stage.vehicle_id, {})[stage.stage] = stage
+
+        created, updated, turnaround = [], [], []
+        for vehicle_id, vehicle_events in events.items():
+            vehicle_stages = stages.setdefault(vehicle_id, {})
+            replayed = set()
+            for event in vehicle_events:
+                stage = vehicle_stages.get(event.stage)
+                if stage is None:
+                    stage = VehicleStage(vehicle_id=vehicle_id, stage=event.stage)
+                    vehicle_stages[event.stage] = stage
+                    created.append(stage)
+                elif event.stage not in replayed and stage.pk:
+                    updated.append(stage)
+                if event.stage not in replayed:
+                    stage.started_at = stage.finished_at = None
+                    stage.time_taken = 0
+                    replayed.add(event.stage)
+                apply_stage_transition(stage, event.state, event.occurred_at)
+                stage.updated_at = now
+
+            minutes = _turnaround_minutes(vehicle_stages)
+            if minutes is not None:
+                turnaround.append(Vehicle(pk=vehicle_id, turnaround_time=minutes, updated_at=now))
+
+        VehicleStage.objects.bulk_create(created)
+        VehicleStage.objects.bulk_update(updated, PROJECTED_STAGE_FIELDS, batch_size=500)
+        if turnaround:
+            Vehicle.objects.bulk_update(turnaround, ['turnaround_time', 'updated_at'], batch_size=500)
+            transaction.on_commit(lambda: bump_generation(Vehicle))
+        sync_current_stages(vehicle_ids)
+        notify_bulk_stage_write(created + updated)
+    return len(created) + len(updated)
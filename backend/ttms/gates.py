@@ -0,0 +1,175 @@
+"""
+Loading gate allocation.
+
+Entries waiting for a gate form a priority queue per area, read straight from
+VehicleEntry: entries without a loading gate whose vehicle has not got past
+loading, vehicles already at the loading stage first, then by gate entry time.
+Only entries from the last QUEUE_HOURS are considered, which keeps the queue
+scan on the recent partitions and lets abandoned entries age out.
+
+Allocation locks the chosen gate and entry rows with SELECT ... FOR UPDATE
+SKIP LOCKED, so concurrent allocators (API workers, the rebalancer) each pick
+a different gate/entry pair instead of blocking on or double-booking the same
+one. Writes go through save() so ETag generations and the event stream follow.
+On backends without row locks (SQLite) the locking clauses are no-ops and
+writes are serialized by the database instead.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import LoadingGate, VehicleEntry
+
+
+# Stage a vehicle is in while its entry can still be given a gate, by priority
+QUEUE_STAGES = ('loading', 'tareWeighing', 'gateEntry')
+
+# Stages after which the vehicle no longer needs its loading gate
+RELEASE_STAGES = ('postLoadingWeighing', 'gateExit')
+
+
+def allocation_settings():
+    config = getattr(settings, 'GATE_ALLOCATION', {})
+    return {
+        'QUEUE_HOURS': config.get('QUEUE_HOURS', 24),
+    }
+
+
+def waiting_entries(area=None, now=None):
+    """Entries waiting for a gate, highest priority first."""
+    now = now or timezone.now()
+    queryset = VehicleEntry.objects.filter(
+        loading_gate='',
+        gate_entry_time__gte=now - timedelta(hours=allocation_settings()['QUEUE_HOURS']),
+        gate_entry_time__lte=now,
+        vehicle__current_stage__in=QUEUE_STAGES,
+    ).exclude(vehicle__current_state='completed')
+    if area is not None:
+        queryset = queryset.filter(area=area)
+    return queryset.annotate(
+        priority=Case(
+            *[When(vehicle__current_stage=stage, then=Value(rank)) for rank, stage in enumerate(QUEUE_STAGES)],
+            output_field=IntegerField(),
+        )
+    ).order_by('priority', 'gate_entry_time', 'id')
+
+
+def available_gates(area=None):
+    queryset = LoadingGate.objects.filter(status='available')
+    if area is not None:
+        queryset = queryset.filter(area=area)
+    return queryset.order_by('area', 'name')
+
+
+def _occupy(gate, entry):
+    gate.current_entry = entry
+    gate.status = 'occupied'
+    gate.save(update_fields=['current_entry', 'status', 'updated_at'])
+    entry.loading_gate = gate.name
+    entry.save(update_fields=['loading_gate', 'updated_at'])
+
+
+def _free(gate):
+    gate.current_entry = None
+    gate.status = 'available'
+    gate.save(update_fields=['current_entry', 'status', 'updated_at'])
+
+
+def assign(gate_id, entry):
+    """
+    Assign a gate to an entry, waiting for concurrent writers on the gate and
+    entry rows.
+
+    Raises:
+        ValueError: The gate is occupied or under maintenance, or the entry
+            already has a gate
+    """
+    with transaction.atomic():
+        gate = LoadingGate.objects.select_for_update().get(pk=gate_id)
+        if gate.status != 'available':
+            raise ValueError(f'Gate {gate.name} is {gate.status}')
+        # Re-read under lock: an allocator may have given it a gate meanwhile
+        locked = VehicleEntry.objects.select_for_update().get(pk=entry.pk)
+        if locked.loading_gate:
+            raise ValueError(f'Entry {entry.pk} already has gate {locked.loading_gate}')
+        _occupy(gate, entry)
+    return gate
+
+
+def release(gate_id):
+    with transaction.atomic():
+        gate = LoadingGate.objects.select_for_update().get(pk=gate_id)
+        _free(gate)
+    return gate
+
+
+def allocate_next(area=None, now=None):
+    """
+    Assign the highest-priority waiting entry to a free gate in its area.
+
+    Returns:
+        (gate, entry), or None when no waiting entry has an unlocked free gate
+    """
+    with transaction.atomic():
+        entry = (
+            waiting_entries(area, now)
+            .filter(area__in=available_gates(area).values('area'))
+            .select_for_update(skip_locked=True, of=('self',))
+            .first()
+        )
+        if entry is None:
+            return None
+        gate = available_gates(entry.area).select_for_update(skip_locked=True).first()
+        if gate is None:
+            return None
+        _occupy(gate, entry)
+    return gate, entry
+
+
+def release_finished(area=None):
+    """Free occupied gates whose vehicle has moved past loading (or that have no entry)."""
+    queryset = LoadingGate.objects.filter(status='occupied')
+    if area is not None:
+        queryset = queryset.filter(area=area)
+    stale = queryset.filter(current_entry__isnull=True) | queryset.filter(
+        current_entry__vehicle__current_stage__in=RELEASE_STAGES
+    )
+    freed = []
+    with transaction.atomic():
+        for gate in stale.select_for_update(skip_locked=True, of=('self',)).order_by('area', 'name'):
+            _free(gate)
+            freed.append(gate)
+    return freed
+
+
+def rebalance(area=None, now=None):
+    """
+    Fill every free gate from the waiting queue of its area.
+
+    Gates held by vehicles that have finished loading are released first, then
+    each area's free gates are paired with its top waiting entries, so every
+    gate that can be used is used.
+
+    Returns:
+        (released gates, [(gate, entry), ...] assignments)
+    """
+    freed = release_finished(area)
+    assignments = []
+    areas = available_gates(area).order_by('area').values_list('area', flat=True).distinct()
+    for gate_area in list(areas):
+        with transaction.atomic():
+            gates = list(available_gates(gate_area).select_for_update(skip_locked=True))
+            if not gates:
+                continue
+            entries = list(
+                waiting_entries(gate_area, now).select_related('vehicle')
+                .select_for_update(skip_locked=True, of=('self',))[:len(gates)]
+            )
+            for gate, entry in zip(gates, entries):
+                _occupy(gate, entry)
+                assignments.append((gate, entry))
+    return freed, assignments
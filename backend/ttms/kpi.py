@@ -0,0 +1,219 @@
+"""
+KPI snapshot engine for TTMS.
+
+Derives the dashboard KPIs from Vehicle, VehicleStage and VehicleEntry with a
+few grouped aggregate queries (closed days from the ttms.rollups tables) and
+materializes the result into the latest KPIMetrics row. Reads are served from
+that row; recomputation happens when model writes mark the snapshot dirty
+(debounced) or when the snapshot is older than the configured maximum age.
+"""
+
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from common.utils import get_date_range_today, get_date_range_month, get_date_range_year
+from .models import KPIMetrics, Vehicle, VehicleStage, VehicleEntry
+from . import rollups
+
+
+# Fields owned by the engine. Everything else on KPIMetrics (targets, plant
+# capacity, performance colour) stays under control of create_or_update.
+COMPUTED_FIELDS = [
+    'capacity_utilization', 'trucks_inside',
+    'turnaround_avg_day', 'turnaround_avg_cum', 'turnaround_last_year',
+    'turnaround_trend_direction', 'turnaround_trend_percentage',
+    'vehicles_in_day', 'vehicles_out_day', 'vehicles_in_cum', 'vehicles_out_cum',
+    'vehicles_trend_direction', 'vehicles_trend_percentage',
+    'dispatch_today', 'dispatch_cum_month',
+    'dispatch_trend_direction', 'dispatch_trend_percentage',
+]
+
+_lock = threading.Lock()
+_state = {'dirty': True}
+
+
+def _snapshot_settings():
+    config = getattr(settings, 'KPI_SNAPSHOT', {})
+    return (
+        config.get('MIN_INTERVAL', 5),
+        config.get('MAX_AGE', 60),
+    )
+
+
+def _trend(current, previous):
+    """Return (direction, percentage) comparing current against previous."""
+    if not previous:
+        return ('up' if current else 'down'), 0.0
+    change = (current - previous) * 100.0 / previous
+    return ('up' if change >= 0 else 'down'), round(change, 1)
+
+
+def count_trucks_inside():
+    """
+    Count vehicles that have passed gate entry but not completed gate exit.
+
+    Reads the current stage columns (ttms.stages.sync_current_stages) through
+    ttms_vehicle_state_idx: a vehicle is inside while its current stage is
+    open, except when that stage is a gate entry still pending.
+    """
+    return (
+        Vehicle.objects.filter(current_state__in=['active', 'pending'])
+        .exclude(current_stage='gateEntry', current_state='pending')
+        .count()
+    )
+
+
+def _period_totals(periods):
+    """
+    Entry, exit and turnaround totals per half-open period from the source tables.
+
+    Args:
+        periods: Dict of name to (start, end)
+
+    Returns:
+        Dict of name to {vehicles_in, vehicles_out, turnaround_sum, turnaround_count}
+    """
+    since = min(start for start, _ in periods.values())
+    with_turnaround = Q(vehicle__turnaround_time__gt=0)
+    entry_aggregates, exit_aggregates = {}, {}
+    for name, (start, end) in periods.items():
+        entry_aggregates[f'{name}__vehicles_in'] = Count(
+            'id', filter=Q(gate_entry_time__gte=start, gate_entry_time__lt=end)
+        )
+        in_period = Q(finished_at__gte=start, finished_at__lt=end)
+        exit_aggregates[f'{name}__vehicles_out'] = Count('id', filter=in_period)
+        exit_aggregates[f'{name}__turnaround_sum'] = Coalesce(
+            Sum('vehicle__turnaround_time', filter=in_period & with_turnaround), 0
+        )
+        exit_aggregates[f'{name}__turnaround_count'] = Count('id', filter=in_period & with_turnaround)
+
+    values = {
+        **VehicleEntry.objects.filter(gate_entry_time__gte=since).aggregate(**entry_aggregates),
+        **VehicleStage.objects.filter(
+            stage='gateExit', state='completed', finished_at__gte=since
+        ).aggregate(**exit_aggregates),
+    }
+    return {
+        name: {field: values[f'{name}__{field}'] for field in rollups.THROUGHPUT_FIELDS}
+        for name in periods
+    }
+
+
+def _average_turnaround(totals):
+    count = totals['turnaround_count']
+    return round(totals['turnaround_sum'] / count) if count else 0
+
+
+def compute_kpis(plant_capacity=120):
+    """
+    Compute the engine-owned KPI fields.
+
+    Today's figures always come from the source tables. Closed days (previous
+    day, month to date, last year) come from the daily rollups when they are
+    enabled and up to date, and from the source tables otherwise.
+
+    Args:
+        plant_capacity: Capacity used for the utilization percentage
+
+    Returns:
+        Dict keyed by KPIMetrics field name
+    """
+    day_start, _ = get_date_range_today()
+    month_start, _ = get_date_range_month()
+    year_start, _ = get_date_range_year()
+    prev_day_start = day_start - timedelta(days=1)
+    last_year_start = year_start.replace(year=year_start.year - 1)
+
+    today = {'day': (day_start, day_start + timedelta(days=1))}
+    history = {
+        'prev_day': (prev_day_start, day_start),
+        'month': (month_start, day_start),
+        'last_year': (last_year_start, year_start),
+    }
+    if rollups.rollup_settings()['KPI_FROM_ROLLUPS'] and rollups.is_current(day_start):
+        totals = {**_period_totals(today), **rollups.period_totals(history)}
+    else:
+        totals = _period_totals({**today, **history})
+    day, prev_day = totals['day'], totals['prev_day']
+    month = {field: totals['month'][field] + value for field, value in day.items()}
+
+    trucks_inside = count_trucks_inside()
+    utilization = min(100, round(trucks_inside * 100 / plant_capacity)) if plant_capacity else 0
+
+    tat_day = _average_turnaround(day)
+    vehicles_trend = _trend(day['vehicles_in'], prev_day['vehicles_in'])
+    dispatch_trend = _trend(day['vehicles_out'], prev_day['vehicles_out'])
+    turnaround_trend = _trend(tat_day, _average_turnaround(prev_day))
+
+    return {
+        'capacity_utilization': utilization,
+        'trucks_inside': trucks_inside,
+        'turnaround_avg_day': tat_day,
+        'turnaround_avg_cum': _average_turnaround(month),
+        'turnaround_last_year': _average_turnaround(totals['last_year']),
+        'turnaround_trend_direction': turnaround_trend[0],
+        'turnaround_trend_percentage': turnaround_trend[1],
+        'vehicles_in_day': day['vehicles_in'],
+        'vehicles_out_day': day['vehicles_out'],
+        'vehicles_in_cum': month['vehicles_in'],
+        'vehicles_out_cum': month['vehicles_out'],
+        'vehicles_trend_direction': vehicles_trend[0],
+        'vehicles_trend_percentage': vehicles_trend[1],
+        'dispatch_today': day['vehicles_out'],
+        'dispatch_cum_month': month['vehicles_out'],
+        'dispatch_trend_direction': dispatch_trend[0],
+        'dispatch_trend_percentage': dispatch_trend[1],
+    }
+
+
+def refresh_snapshot(snapshot=None):
+    """
+    Recompute KPIs and write them into the latest KPIMetrics row.
+
+    Args:
+        snapshot: KPIMetrics row to update (defaults to the latest one)
+
+    Returns:
+        The updated (or newly created) KPIMetrics instance
+    """
+    with _lock:
+        # Clear the flag before computing so writes that land mid-refresh
+        # schedule another pass instead of being lost.
+        _state['dirty'] = False
+        if snapshot is None:
+            snapshot = KPIMetrics.objects.order_by('-updated_at').first() or KPIMetrics()
+        for field, value in compute_kpis(snapshot.plant_capacity).items():
+            setattr(snapshot, field, value)
+        if snapshot.pk:
+            snapshot.save(update_fields=COMPUTED_FIELDS + ['updated_at'])
+        else:
+            snapshot.save()
+        return snapshot
+
+
+def mark_dirty(**kwargs):
+    """Signal receiver: flag the snapshot for recomputation on next read."""
+    _state['dirty'] = True
+
+
+def get_latest_snapshot():
+    """
+    Return the current KPI snapshot, recomputing it only when needed.
+
+    The snapshot is recomputed when it is dirty and at least MIN_INTERVAL
+    seconds old, or when it is older than MAX_AGE (which covers writes made by
+    other workers). Otherwise this is a single row fetch.
+    """
+    min_interval, max_age = _snapshot_settings()
+    snapshot = KPIMetrics.objects.order_by('-updated_at').first()
+    if snapshot is None:
+        return refresh_snapshot()
+    age = (timezone.now() - snapshot.updated_at).total_seconds()
+    if (_state['dirty'] and age >= min_interval) or age >= max_age:
+        return refresh_snapshot(snapshot)
+    return snapshot
@@ -0,0 +1,86 @@
+import math
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ttms.eta import STAGES, predict, predict_active, train
+
+
+def _predict_loop(model, stage_index, area_index, elapsed, now_ts, utc_offset=0):
+    """Per-vehicle reference implementation of ttms.eta.predict."""
+    mean, var = model['mean'], model['var']
+    results = []
+    for stage, area, spent in zip(stage_index, area_index, elapsed):
+        hour = int((now_ts - spent * 60 + utc_offset) // 3600 % 24)
+        remaining = max(float(mean[stage, area, hour]) - spent, 0.0)
+        variance = float(var[stage, area, hour])
+        for later in range(stage + 1, len(STAGES)):
+            hour = int((now_ts + remaining * 60 + utc_offset) // 3600 % 24)
+            remaining += float(mean[later, area, hour])
+            variance += float(var[later, area, hour])
+        results.append((remaining, variance))
+    return results
+
+
+def _timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return result, samples[len(samples) // 2] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Time the vectorized ETA prediction against a per-vehicle loop and the full /vehicles/eta/ path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trucks', type=int, default=500, help='Synthetic vehicles in progress')
+        parser.add_argument('--areas', type=int, default=4, help='Synthetic areas')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per measurement (median reported)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        shape = (len(STAGES), options['areas'] + 1, 24)
+        generator = np.random.default_rng(options['seed'])
+        model = {
+            'areas': [f'AREA-{i + 1}' for i in range(options['areas'])],
+            'mean': generator.uniform(5, 60, shape),
+            'var': generator.uniform(1, 100, shape),
+        }
+        trucks = options['trucks']
+        stage_index = [rng.randrange(len(STAGES)) for _ in range(trucks)]
+        area_index = [rng.randrange(options['areas'] + 1) for _ in range(trucks)]
+        elapsed = [rng.uniform(0, 45) for _ in range(trucks)]
+        now_ts = time.time()
+
+        (remaining, variance), vector_ms = _timed(
+            lambda: predict(model, stage_index, area_index, elapsed, now_ts), options['repeat']
+        )
+        reference, loop_ms = _timed(
+            lambda: _predict_loop(model, stage_index, area_index, elapsed, now_ts), options['repeat']
+        )
+        mismatches = sum(
+            1 for (ref_mean, ref_var), mean, var in zip(reference, remaining.tolist(), variance.tolist())
+            if not (math.isclose(ref_mean, mean, rel_tol=1e-9) and math.isclose(ref_var, var, rel_tol=1e-9))
+        )
+
+        self.stdout.write(f'{trucks} vehicles, {len(STAGES)} stages, {options["areas"]} areas x 24 hours')
+        self.stdout.write(f'{"numpy predict":<24}{vector_ms:>10.3f} ms')
+        self.stdout.write(f'{"per-vehicle loop":<24}{loop_ms:>10.3f} ms  ({loop_ms / max(vector_ms, 1e-9):.0f}x)')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} predictions differ from the reference loop'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Vectorized predictions match the reference loop'))
+
+        _, train_ms = _timed(train, 1)
+        result, endpoint_ms = _timed(lambda: predict_active(timezone.now()), max(1, options['repeat'] // 10))
+        self.stdout.write(f'{"train (database)":<24}{train_ms:>10.3f} ms')
+        self.stdout.write(
+            f'{"predict_active":<24}{endpoint_ms:>10.3f} ms  ({len(result["vehicles"])} vehicles in progress)'
+        )
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from common.renderers import FastJSONRenderer, orjson
+from ttms.models import Vehicle
+from ttms.serializers import VehicleSerializer
+
+
+def _best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Compare render time and size of the stdlib and fast JSON renderers on vehicle payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Payload row counts')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        vehicles = list(Vehicle.objects.prefetch_related('stages')[:50])
+        if not vehicles:
+            raise CommandError('No vehicles in the database; load sample data first.')
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer falls back to stdlib.'))
+
+        # Serializer output (strings only) and raw .values() rows (datetimes
+        # left for the encoder's default hook)
+        templates = {
+            'serialized': list(VehicleSerializer(vehicles, many=True).data),
+            'values': list(Vehicle.objects.values()[:50]),
+        }
+        renderers = (('stdlib', JSONRenderer()), ('fast', FastJSONRenderer()))
+
+        self.stdout.write(f"{'payload':<12}{'rows':>8}{'renderer':>10}{'ms':>10}{'bytes':>12}{'speedup':>10}")
+        for name, template in templates.items():
+            for size in options['sizes']:
+                payload = [template[i % len(template)] for i in range(size)]
+                baseline = None
+                outputs = []
+                for label, renderer in renderers:
+                    elapsed, output = _best_of(lambda: renderer.render(payload), options['repeat'])
+                    outputs.append(output)
+                    baseline = baseline or elapsed
+                    self.stdout.write(
+                        f'{name:<12}{size:>8}{label:>10}{elapsed * 1000:>10.2f}{len(output):>12}'
+                        f'{baseline / elapsed:>9.1f}x'
+                    )
+                if outputs[0] != outputs[1]:
+                    self.stdout.write(self.style.ERROR(f'  output differs for {name} x {size}'))
@@ -0,0 +1,159 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ttms.models import Vehicle, VehicleStage, VehicleEntry, LoadingGate, STAGE_CHOICES
+from ttms.serializers import (
+    VehicleSerializer, VehicleEntrySerializer, LoadingGateSerializer,
+    serialize_vehicles, serialize_vehicle_entries, serialize_loading_gates
+)
+
+# Fixture rows per model; the benchmark sizes repeat them
+FIXTURE_ROWS = 24
+
+# Offsets the fixture datetimes are written in, so stored values are normalised
+UTC_OFFSETS = [datetime.timezone.utc, datetime.timezone(datetime.timedelta(hours=5, minutes=30)),
+               datetime.timezone(datetime.timedelta(hours=-7))]
+
+# Awkward floats for the gate coordinates (x, y)
+COORDINATES = [(None, None), (0.0, -0.0), (0.1 + 0.2, 1e-7), (123456.789, None), (-3.5, 2.0 ** 53)]
+
+
+class Rollback(Exception):
+    pass
+
+
+def _fixture():
+    """
+    Deterministic rows covering the edge cases of the compiled serializers:
+    null and dangling foreign keys, null and empty strings, datetimes written in
+    several UTC offsets, microseconds, null datetimes and awkward floats.
+    Returns (name, instances, DRF serializer class, fast serializer) per case,
+    loaded back from the database the way the list views load them.
+    """
+    base = datetime.datetime(2024, 3, 31, 1, 59, 59, 999999, tzinfo=datetime.timezone.utc)
+    vehicles, entries, gates = [], [], []
+    for i in range(FIXTURE_ROWS):
+        moment = (base + datetime.timedelta(hours=7 * i, seconds=i)).astimezone(UTC_OFFSETS[i % 3])
+        vehicle = Vehicle.objects.create(
+            reg_no=f'PARITY-{i:03d}',
+            # null, empty (unique, so once) and set
+            rfid_no=None if i % 3 == 0 else ('' if i == 1 else f'PARITY-RFID-{i}'),
+            tare_weight=0 if i % 4 == 0 else 10000 + i,
+            weight_after_loading=-1 if i == 2 else 20000 * i,
+            progress=min(i * 5, 100),
+            turnaround_time=i,
+            current_stage='' if i % 5 == 0 else STAGE_CHOICES[i % len(STAGE_CHOICES)][0],
+            current_state='' if i % 5 == 0 else 'active',
+            completed_at=None if i % 2 else moment,
+        )
+        vehicles.append(vehicle)
+        # Some vehicles without stages, others with a mix of open and finished ones
+        for index, (stage, _) in enumerate(STAGE_CHOICES[:i % (len(STAGE_CHOICES) + 1)]):
+            VehicleStage.objects.create(
+                vehicle=vehicle, stage=stage, state=['completed', 'active', 'pending'][index % 3],
+                wait_time=index, standard_time=0 if index == 0 else 30,
+                started_at=None if index % 3 == 2 else moment,
+                finished_at=moment + datetime.timedelta(minutes=index) if index % 3 == 0 else None,
+                time_taken=index,
+            )
+        entry = VehicleEntry.objects.create(
+            vehicle=vehicle, gate_entry_time=moment, area=f'AREA-{i % 2 + 1}',
+            position='' if i % 2 else f'Bay {i}', loading_gate='' if i % 3 else f'G-{i}',
+        )
+        entries.append(entry)
+        x, y = COORDINATES[i % len(COORDINATES)]
+        gate = LoadingGate.objects.create(
+            name=f'PARITY-GATE-{i:03d}', area=f'AREA-{i % 2 + 1}',
+            status=['available', 'occupied', 'maintenance'][i % 3], x=x, y=y,
+            current_entry=None if i % 3 == 0 else entry,
+        )
+        gates.append(gate)
+    # current_entry has no database constraint, so it can point at a deleted entry
+    gates[-1].current_entry_id = max(entry.pk for entry in entries) + 1000
+    gates[-1].save(update_fields=['current_entry'])
+
+    return [
+        (
+            'vehicles', list(Vehicle.objects.filter(pk__in=[v.pk for v in vehicles]).prefetch_related('stages')),
+            VehicleSerializer, serialize_vehicles,
+        ),
+        (
+            'entries', list(VehicleEntry.objects.filter(pk__in=[e.pk for e in entries]).select_related('vehicle')),
+            VehicleEntrySerializer, serialize_vehicle_entries,
+        ),
+        (
+            'gates',
+            list(LoadingGate.objects.filter(pk__in=[g.pk for g in gates]).select_related('current_entry__vehicle')),
+            LoadingGateSerializer, serialize_loading_gates,
+        ),
+    ]
+
+
+def _best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Check fast read serializers against DRF output and compare their throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='Row counts (fixture rows repeated)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+        parser.add_argument('--parity-only', action='store_true', help='Only run the parity check')
+
+    def handle(self, *args, **options):
+        # The fixture is written and read inside a transaction that is always
+        # rolled back, so live data is neither read nor changed
+        try:
+            with transaction.atomic():
+                self._check(_fixture(), options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _check(self, cases, options):
+        render = JSONRenderer().render
+
+        failures = []
+        for name, instances, serializer_class, fast in cases:
+            # Both serializers convert datetimes to the current timezone
+            for zone in ('UTC', 'Asia/Kolkata'):
+                with timezone.override(zone):
+                    # Row by row so a mismatch names the offending instance
+                    for instance in instances:
+                        expected = render(serializer_class(instance).data)
+                        actual = render(fast([instance])[0])
+                        if expected != actual:
+                            failures.append(name)
+                            self.stdout.write(self.style.ERROR(
+                                f'{name} id={instance.pk} ({zone}):\n  drf  {expected}\n  fast {actual}'
+                            ))
+                    if render(serializer_class(instances, many=True).data) != render(fast(instances)):
+                        failures.append(name)
+            self.stdout.write(f'{name}: {len(instances)} fixture rows checked')
+        if failures:
+            raise CommandError(f"Parity check failed for: {', '.join(sorted(set(failures)))}")
+        self.stdout.write(self.style.SUCCESS('Parity OK: fast output is identical to DRF'))
+        if options['parity_only']:
+            return
+
+        self.stdout.write(f"\n{'serializer':<12}{'rows':>8}{'drf rows/s':>14}{'fast rows/s':>14}{'speedup':>10}")
+        for name, instances, serializer_class, fast in cases:
+            for size in options['sizes']:
+                rows = [instances[i % len(instances)] for i in range(size)]
+                drf = _best_of(lambda: serializer_class(rows, many=True).data, options['repeat'])
+                compiled = _best_of(lambda: fast(rows), options['repeat'])
+                self.stdout.write(
+                    f'{name:<12}{size:>8}{size / drf:>14,.0f}{size / compiled:>14,.0f}{drf / compiled:>9.1f}x'
+                )
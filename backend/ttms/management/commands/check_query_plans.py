@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ttms.models import (
+    KPIMetrics, VehicleStage, VehicleEntry, SystemAlert,
+    ParkingCell, LoadingGate, TurnaroundTimeSparkline
+)
+from ttms.partitions import PARTITIONED_MODELS, is_partitioned, list_partitions, month_start
+
+
+def hot_queries():
+    """(description, queryset, expected index) for every hot filter/order path."""
+    now = timezone.now()
+    return [
+        ('Latest KPI snapshot', KPIMetrics.objects.order_by('-updated_at')[:1], 'ttms_kpi_updated_idx'),
+        ('Open stages', VehicleStage.objects.filter(state__in=['active', 'pending']), 'ttms_stage_open_idx'),
+        ('Stages by state', VehicleStage.objects.filter(state='completed'), 'ttms_stage_state_idx'),
+        (
+            'Completed exits by finish time',
+            VehicleStage.objects.filter(stage='gateExit', state='completed', finished_at__gte=now - timedelta(days=1)),
+            'ttms_stage_done_idx',
+        ),
+        (
+            'Entries today',
+            VehicleEntry.objects.filter(gate_entry_time__gte=now - timedelta(days=1), gate_entry_time__lt=now),
+            'ttms_entry_time_idx',
+        ),
+        ('Unresolved alerts', SystemAlert.objects.filter(is_resolved=False).order_by('-created_at'), 'ttms_alert_open_idx'),
+        ('Alerts newest first', SystemAlert.objects.order_by('-created_at', '-id')[:100], 'ttms_alert_created_idx'),
+        (
+            'Available parking cells',
+            ParkingCell.objects.filter(status='available').order_by('area', 'label'),
+            'ttms_cell_free_idx',
+        ),
+        (
+            'First free parking cell in an area',
+            ParkingCell.objects.filter(status='available', area='AREA-1').order_by('label')[:1],
+            'ttms_cell_free_idx',
+        ),
+        ('Gates by area and status', LoadingGate.objects.filter(area='AREA-1', status='available'), 'ttms_gate_area_status_idx'),
+        ('Recent sparkline', TurnaroundTimeSparkline.objects.order_by('-timestamp', '-id')[:20], 'ttms_spark_ts_idx'),
+    ]
+
+
+def index_names(index_name):
+    """The index itself plus, when it is a partitioned index, its per-partition indexes."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)',
+            [index_name]
+        )
+        return [index_name] + [row[0] for row in cursor.fetchall()]
+
+
+def pruned_partitions(model, field):
+    """
+    Monthly partitions besides the current one that a query on recent rows scans.
+
+    Returns None when the current month's partition is missing from the plan.
+    """
+    now = timezone.now()
+    current_month = month_start(now)
+    since = max(now - timedelta(hours=1), now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    plan = model.objects.filter(**{f'{field}__gte': since, f'{field}__lte': now}).explain()
+    partitions = list_partitions(model._meta.db_table)
+    current = partitions.get(current_month)
+    if current is None or current not in plan:
+        return None
+    return [name for month, name in partitions.items() if month != current_month and name in plan]
+
+
+class Command(BaseCommand):
+    help = 'Verify that hot TTMS queries are planned with their indexes (PostgreSQL only)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f'Query plan checks require PostgreSQL (current backend: {connection.vendor}); skipping.'
+            ))
+            return
+
+        failures = []
+        for description, queryset, index_name in hot_queries():
+            with transaction.atomic():
+                # Tables may be tiny in CI; disable sequential scans so the
+                # check asserts the index is usable rather than merely cheaper.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+            if any(name in plan for name in index_names(index_name)):
+                self.stdout.write(self.style.SUCCESS(f'✓ {description}: {index_name}'))
+            else:
+                failures.append(description)
+                self.stdout.write(self.style.ERROR(f'✗ {description}: expected {index_name}'))
+                self.stdout.write(plan)
+
+        for model, field in PARTITIONED_MODELS.items():
+            table = model._meta.db_table
+            if not is_partitioned(table):
+                continue
+            extra = pruned_partitions(model, field)
+            if extra == []:
+                self.stdout.write(self.style.SUCCESS(f'✓ {table}: recent rows read from the current partition only'))
+            else:
+                failures.append(f'{table} pruning')
+                self.stdout.write(self.style.ERROR(f'✗ {table}: recent rows not pruned to the current partition'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot query plan(s) not using their index')
@@ -0,0 +1,178 @@
+import asyncio
+import io
+import math
+import threading
+import time
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.http import HttpResponse
+
+from core.instrumentation import registry
+
+# Plain backend used by the reconnect baseline when the pool is configured
+POOL_ENGINE = 'core.db.postgresql_pool'
+PLAIN_ENGINE = 'django.db.backends.postgresql'
+
+
+def _percentile(samples, q):
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def _connections_opened(alias):
+    """Physical connections opened so far (pool counter when pooled)."""
+    engine = connections.settings[alias]['ENGINE']
+    pool = getattr(import_module(f'{engine}.base'), '_pools', {}).get(alias)
+    return pool.opened if pool else registry.connection_counts().get(alias, 0)
+
+
+class QueryMixin:
+    """
+    Request handler whose view runs one query.
+
+    Everything around the view is the real handler: middleware, the
+    request_started/request_finished signals that open and close connections,
+    and for ASGI the per-request thread the sync code runs in.
+    """
+
+    def __init__(self, alias, query):
+        super().__init__()
+        self.alias = alias
+        self.query = query
+
+    def run_query(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(self.query)
+            cursor.fetchall()
+        return HttpResponse()
+
+
+class QueryASGIHandler(QueryMixin, ASGIHandler):
+    async def get_response_async(self, request):
+        return await sync_to_async(self.run_query, thread_sensitive=True)()
+
+
+class QueryWSGIHandler(QueryMixin, WSGIHandler):
+    def get_response(self, request):
+        return self.run_query()
+
+
+class Command(BaseCommand):
+    help = 'Drive requests through the ASGI or WSGI handler and report latency and connects per connection mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interface', choices=['asgi', 'wsgi'], default='asgi',
+                            help='asgi: concurrent requests as daphne serves them; wsgi: one thread per client '
+                                 'as gunicorn serves them')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=250, help='Requests per client')
+        parser.add_argument('--query', default='SELECT 1', help='SQL run once per request')
+        parser.add_argument('--database', default='default', help='Database alias')
+        parser.add_argument(
+            '--baseline', action='store_true',
+            help='Also run with CONN_MAX_AGE=0 and no pool (reconnect per request) for comparison'
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if options['interface'] == 'asgi':
+            # Same connection settings as the served ASGI application
+            from core.asgi import use_request_scoped_connections
+            use_request_scoped_connections()
+
+        settings_dict = connections.settings[alias]
+        configured = settings_dict['ENGINE'], settings_dict['CONN_MAX_AGE']
+        self.stdout.write(
+            f"{options['interface'].upper()}, engine {configured[0]}, CONN_MAX_AGE={configured[1]}, "
+            f"CONN_HEALTH_CHECKS={settings_dict['CONN_HEALTH_CHECKS']}, "
+            f"{options['threads']} clients x {options['requests']} requests\n"
+        )
+
+        phases = [('configured', configured)]
+        if options['baseline']:
+            engine = PLAIN_ENGINE if configured[0] == POOL_ENGINE else configured[0]
+            phases.insert(0, ('reconnect', (engine, 0)))
+
+        run = self._run_asgi if options['interface'] == 'asgi' else self._run_wsgi
+        self.stdout.write(f"{'mode':<12}{'requests':>10}{'connects':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        try:
+            for label, (engine, max_age) in phases:
+                # Connections are created per thread from settings, so new
+                # request threads pick up the phase's engine
+                settings_dict['ENGINE'], settings_dict['CONN_MAX_AGE'] = engine, max_age
+                connections.close_all()
+                opened = _connections_opened(alias)
+                samples = run(alias, options['threads'], options['requests'], options['query'])
+                connects = _connections_opened(alias) - opened
+                samples.sort()
+                self.stdout.write(
+                    f'{label:<12}{len(samples):>10}{connects:>10}'
+                    + ''.join(f'{value * 1000:>10.2f}' for value in (
+                        _percentile(samples, 0.5), _percentile(samples, 0.95),
+                        _percentile(samples, 0.99), samples[-1],
+                    ))
+                )
+        finally:
+            settings_dict['ENGINE'], settings_dict['CONN_MAX_AGE'] = configured
+
+    def _run_asgi(self, alias, client_count, request_count, query):
+        handler = QueryASGIHandler(alias, query)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/', 'raw_path': b'/', 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            pass
+
+        async def client(samples):
+            for _ in range(request_count):
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                samples.append(time.perf_counter() - start)
+
+        async def main():
+            samples = []
+            await asyncio.gather(*(client(samples) for _ in range(client_count)))
+            return samples
+
+        return asyncio.run(main())
+
+    def _run_wsgi(self, alias, client_count, request_count, query):
+        handler = QueryWSGIHandler(alias, query)
+        samples = []
+        lock = threading.Lock()
+
+        def client():
+            local = []
+            try:
+                for _ in range(request_count):
+                    environ = {
+                        'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                        'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+                    }
+                    start = time.perf_counter()
+                    response = handler(environ, lambda status, headers: None)
+                    # The WSGI server closes the response, which sends request_finished
+                    response.close()
+                    local.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+                with lock:
+                    samples.extend(local)
+
+        threads = [threading.Thread(target=client) for _ in range(client_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
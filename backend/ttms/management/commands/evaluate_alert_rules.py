@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ttms.alerts import evaluate_rules
+
+
+class Command(BaseCommand):
+    help = 'Evaluate the alert rules (over SLA, stuck at weighbridge, idle gate) and raise/resolve alerts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and evaluate every N seconds (0 = run once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            result = evaluate_rules()
+            self.stdout.write(self.style.SUCCESS(
+                f"Alert rules evaluated: {result['created']} created, {result['open']} still open, "
+                f"{result['resolved']} resolved"
+            ))
+            if interval <= 0:
+                break
+            time.sleep(interval)
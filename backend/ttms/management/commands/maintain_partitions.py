@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ttms.partitions import (
+    PARTITIONED_MODELS, apply_retention, ensure_partitions, is_partitioned, partition_settings
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions and detach/archive months past the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help='Partitions to keep ready past the current month')
+        parser.add_argument('--retention-months', type=int,
+                            help='Whole months kept before the current one (0 = keep everything)')
+        parser.add_argument('--archive-dir', help='Write old months here as gzipped CSV, then drop them')
+        parser.add_argument('--drop', action='store_true', help='Drop old months without archiving')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows deleted per batch outside monthly partitions')
+
+    def handle(self, *args, **options):
+        config = partition_settings()
+        months_ahead = options['months_ahead'] if options['months_ahead'] is not None else config['MONTHS_AHEAD']
+        retention = options['retention_months']
+        if retention is None:
+            retention = config['RETENTION_MONTHS']
+
+        for model, field in PARTITIONED_MODELS.items():
+            table = model._meta.db_table
+            if is_partitioned(table):
+                created = ensure_partitions(table, model._meta.get_field(field).column, months_ahead)
+                self.stdout.write(f'{table}: {len(created)} partition(s) created {", ".join(created)}'.rstrip())
+            elif connection.vendor == 'postgresql':
+                self.stdout.write(self.style.WARNING(f'{table}: not partitioned (run migrate)'))
+
+            for target, action in apply_retention(
+                model, retention, options['archive_dir'], options['drop'], options['batch_size']
+            ):
+                self.stdout.write(f'  {target}: {action}')
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance complete'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ttms.kpi import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Recompute the KPI snapshot from vehicle, stage and entry data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and refresh every N seconds (0 = refresh once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            snapshot = refresh_snapshot()
+            self.stdout.write(self.style.SUCCESS(
+                f'KPI snapshot refreshed: {snapshot.trucks_inside} trucks inside, '
+                f'{snapshot.vehicles_in_day} in / {snapshot.dispatch_today} dispatched today'
+            ))
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,47 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from common.utils import chunk_list
+from ttms.events import project_vehicles
+from ttms.models import StageEvent
+
+
+class Command(BaseCommand):
+    help = 'Rebuild vehicle stages and turnaround times by replaying the stage event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, action='append', default=[],
+                            help='Vehicle id to replay (repeatable)')
+        parser.add_argument('--since', help='Replay vehicles with events at or after this date/datetime')
+        parser.add_argument('--all', action='store_true', help='Replay every vehicle present in the log')
+        parser.add_argument('--batch-size', type=int, default=500, help='Vehicles projected per transaction')
+
+    def handle(self, *args, **options):
+        events = StageEvent.objects.all()
+        if options['vehicle']:
+            events = events.filter(vehicle_id__in=options['vehicle'])
+        elif options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                day = parse_date(options['since'])
+                if day is None:
+                    raise CommandError(f"Invalid --since value: {options['since']}")
+                since = datetime.combine(day, time.min)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            events = events.filter(occurred_at__gte=since)
+        elif not options['all']:
+            raise CommandError('Specify --vehicle, --since or --all')
+
+        vehicle_ids = list(events.order_by().values_list('vehicle_id', flat=True).distinct())
+        written = 0
+        for batch in chunk_list(vehicle_ids, options['batch_size']):
+            written += project_vehicles(batch)
+            self.stdout.write(f'  projected {len(batch)} vehicles')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed stage events for {len(vehicle_ids)} vehicles ({written} stage rows written)'
+        ))
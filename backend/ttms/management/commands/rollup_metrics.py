@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from ttms.rollups import refresh_rollups, floor_day
+
+
+def _parse(value, option):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid {option} value: {value}')
+        parsed = datetime.combine(day, datetime.min.time())
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class Command(BaseCommand):
+    help = 'Maintain the hourly and daily throughput/turnaround/stage rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Backfill from this date/datetime (rounded down to the day)')
+        parser.add_argument('--end', help='Backfill up to this date/datetime (default: now)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction when backfilling')
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and roll up new data every N seconds (0 = run once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        if options['start']:
+            if options['interval']:
+                raise CommandError('--interval cannot be combined with --start')
+            self.backfill(
+                _parse(options['start'], '--start'),
+                _parse(options['end'], '--end') if options['end'] else timezone.now(),
+                options['chunk_days'],
+            )
+            return
+
+        interval = options['interval']
+        while True:
+            hours, days = refresh_rollups()
+            self.stdout.write(self.style.SUCCESS(f'Rollups refreshed: {hours} hours, {days} days'))
+            if interval <= 0:
+                break
+            time.sleep(interval)
+
+    def backfill(self, start, end, chunk_days):
+        if start > end:
+            raise CommandError('--start must be before --end')
+        chunk_start = floor_day(start)
+        total_hours = 0
+        while chunk_start <= end:
+            # Whole days plus half a day, floored, stays aligned across DST changes
+            next_start = floor_day(chunk_start + timedelta(days=chunk_days, hours=12))
+            chunk_end = min(end, next_start - timedelta(microseconds=1))
+            hours, days = refresh_rollups(chunk_start, chunk_end)
+            total_hours += hours
+            self.stdout.write(f'  {chunk_start:%Y-%m-%d}..{chunk_end:%Y-%m-%d}: {hours} hours, {days} days')
+            chunk_start = next_start
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total_hours} hourly buckets'))
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ttms import gates
+from ttms.models import LoadingGate, Vehicle, VehicleEntry
+
+
+def _percentile(samples, q):
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate vehicle arrivals against the gate allocator and report queue wait times '
+        '(runs in a transaction that is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--areas', type=int, default=2, help='Simulated areas')
+        parser.add_argument('--gates', type=int, default=4, help='Gates per area')
+        parser.add_argument('--vehicles', type=int, default=200, help='Arrivals to simulate')
+        parser.add_argument('--arrivals-per-hour', type=float, default=20.0, help='Mean arrival rate over all areas')
+        parser.add_argument('--loading-minutes', type=float, default=20.0, help='Mean loading time')
+        parser.add_argument(
+            '--mode', choices=['next', 'rebalance', 'both'], default='both',
+            help='next: allocate_next on every arrival/departure; rebalance: periodic batch rebalance'
+        )
+        parser.add_argument('--interval', type=int, default=5, help='Rebalance period in simulated minutes')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['areas'] < 1 or options['gates'] < 1 or options['vehicles'] < 1:
+            raise CommandError('--areas, --gates and --vehicles must be positive')
+        modes = ['next', 'rebalance'] if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(
+            f"{options['areas']} areas x {options['gates']} gates, {options['vehicles']} vehicles, "
+            f"{options['arrivals_per_hour']}/h arrivals, {options['loading_minutes']} min mean loading\n"
+        )
+        self.stdout.write(
+            f"{'mode':<12}{'assigned':>10}{'p50 min':>10}{'p95 min':>10}{'max min':>10}"
+            f"{'util %':>10}{'db ms/op':>10}"
+        )
+        for mode in modes:
+            try:
+                with transaction.atomic():
+                    waits, utilization, db_ms = self._simulate(mode, options)
+                    raise Rollback
+            except Rollback:
+                pass
+            waits.sort()
+            self.stdout.write(
+                f'{mode:<12}{len(waits):>10}'
+                + ''.join(f'{value:>10.1f}' for value in (
+                    _percentile(waits, 0.5), _percentile(waits, 0.95), waits[-1],
+                ) if waits)
+                + f'{utilization * 100:>10.1f}{db_ms:>10.2f}'
+            )
+
+    def _simulate(self, mode, options):
+        rng = random.Random(options['seed'])
+        start = timezone.now() - timedelta(hours=1)
+        areas = [f'SIM-AREA-{i + 1}' for i in range(options['areas'])]
+        LoadingGate.objects.bulk_create([
+            LoadingGate(name=f'SIM-{area}-G{g + 1}', area=area)
+            for area in areas for g in range(options['gates'])
+        ])
+
+        # Pre-generate arrivals; entries only join the queue once their gate_entry_time has passed
+        arrivals, minute = [], 0.0
+        for _ in range(options['vehicles']):
+            minute += rng.expovariate(options['arrivals_per_hour'] / 60)
+            loading = max(5.0, rng.gauss(options['loading_minutes'], options['loading_minutes'] / 4))
+            arrivals.append((minute, rng.choice(areas), loading))
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(reg_no=f'SIM-{i}', current_stage='tareWeighing', current_state='active')
+            for i in range(len(arrivals))
+        ])
+        entries = VehicleEntry.objects.bulk_create([
+            VehicleEntry(vehicle=vehicle, gate_entry_time=start + timedelta(minutes=at), area=area)
+            for vehicle, (at, area, _) in zip(vehicles, arrivals)
+        ])
+        arrival_of = {entry.id: arrivals[i] for i, entry in enumerate(entries)}
+
+        # The sequence number breaks ties so payloads are never compared
+        sequence = itertools.count()
+        events = [(at, next(sequence), 'arrive', area) for at, area, _ in arrivals]
+        if mode == 'rebalance':
+            events.append((0.0, next(sequence), 'tick', None))
+        heapq.heapify(events)
+
+        waits, busy, finished_at, operations, db_seconds = [], 0.0, 0.0, 0, 0.0
+        pending = len(arrivals)
+        while events and pending:
+            now, _, kind, payload = heapq.heappop(events)
+            moment = start + timedelta(minutes=now)
+            began = time.perf_counter()
+            allocated = []
+            if kind == 'finish':
+                gate, entry = payload
+                Vehicle.objects.filter(pk=entry.vehicle_id).update(current_stage='postLoadingWeighing')
+                if mode == 'next':
+                    gates.release(gate.pk)
+            if mode == 'next' and kind in ('arrive', 'finish'):
+                area = payload if kind == 'arrive' else payload[0].area
+                while (allocation := gates.allocate_next(area=area, now=moment)) is not None:
+                    allocated.append(allocation)
+            elif kind == 'tick':
+                for area in areas:
+                    allocated += gates.rebalance(area=area, now=moment)[1]
+                if pending:
+                    heapq.heappush(events, (now + options['interval'], next(sequence), 'tick', None))
+            db_seconds += time.perf_counter() - began
+            operations += 1
+
+            for gate, entry in allocated:
+                arrived_at, _, loading = arrival_of[entry.id]
+                waits.append(now - arrived_at)
+                busy += loading
+                finished_at = max(finished_at, now + loading)
+                pending -= 1
+                heapq.heappush(events, (now + loading, next(sequence), 'finish', (gate, entry)))
+
+        capacity = len(areas) * options['gates'] * max(finished_at, 1.0)
+        return waits, min(1.0, busy / capacity), db_seconds * 1000 / max(operations, 1)
@@ -0,0 +1,138 @@
+import math
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+
+from ttms.models import LoadingGate, ParkingCell, Vehicle
+from ttms.parking import free_cells, reserve_cell
+
+
+AREA = 'STRESS'
+
+
+def _percentile(samples, q):
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def _naive_reserve(vehicle, area=None, gate=None):
+    """The read-then-save allocation reserve_cell replaces, for comparison."""
+    cell = free_cells(area, gate).first()
+    if cell is None:
+        return None
+    time.sleep(0)  # yield between the read and the write, as a busy server would
+    cell.vehicle = vehicle
+    cell.status = 'reserved'
+    cell.save()
+    return cell
+
+
+class Command(BaseCommand):
+    help = (
+        'Reserve parking cells from concurrent threads and verify no cell is handed out twice '
+        f'(creates and removes its own {AREA} area)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent worker threads')
+        parser.add_argument('--cells', type=int, default=200, help='Cells in the stress area')
+        parser.add_argument('--vehicles', type=int, default=300, help='Reservation attempts (one vehicle each)')
+        parser.add_argument('--nearest', action='store_true', help='Reserve nearest a gate instead of by label')
+        parser.add_argument('--naive', action='store_true', help='Also run the read-then-save allocation')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['cells'] < 1 or options['vehicles'] < 1:
+            raise CommandError('--threads, --cells and --vehicles must be positive')
+        if ParkingCell.objects.filter(area=AREA).exists():
+            raise CommandError(f'Area {AREA} already has parking cells; remove them first')
+
+        self.stdout.write(
+            f"{connection.vendor}, {options['threads']} threads, {options['cells']} cells, "
+            f"{options['vehicles']} reservations\n"
+        )
+        self.stdout.write(
+            f"{'mode':<10}{'granted':>9}{'refused':>9}{'errors':>8}{'double':>8}{'lost':>6}"
+            f"{'p50 ms':>9}{'p99 ms':>9}"
+        )
+        modes = [('atomic', reserve_cell)]
+        if options['naive']:
+            modes.append(('naive', _naive_reserve))
+
+        failures = []
+        for label, reserve in modes:
+            try:
+                result = self._run(reserve, options)
+            finally:
+                self._cleanup()
+            granted, refused, errors, double, lost, samples = result
+            self.stdout.write(
+                f'{label:<10}{granted:>9}{refused:>9}{errors:>8}{double:>8}{lost:>6}'
+                f'{_percentile(samples, 0.5) * 1000:>9.2f}{_percentile(samples, 0.99) * 1000:>9.2f}'
+            )
+            if reserve is reserve_cell and (double or lost or granted != min(options['cells'], options['vehicles'])):
+                failures.append(label)
+
+        if failures:
+            raise CommandError('Atomic reservation handed out a cell twice or lost a reservation')
+
+    def _run(self, reserve, options):
+        with transaction.atomic():
+            ParkingCell.objects.bulk_create([
+                ParkingCell(area=AREA, label=f'C{i:05d}', x=float(i % 20), y=float(i // 20))
+                for i in range(options['cells'])
+            ])
+            vehicles = Vehicle.objects.bulk_create([
+                Vehicle(reg_no=f'{AREA}-{i}') for i in range(options['vehicles'])
+            ])
+            gate = LoadingGate.objects.create(name=f'{AREA}-GATE', area=AREA, x=10.0, y=5.0)
+        kwargs = {'gate': gate} if options['nearest'] else {'area': AREA}
+
+        granted, refused, errors, samples = [], [0], [0], []
+        lock = threading.Lock()
+        start = threading.Barrier(options['threads'])
+
+        def worker(batch):
+            local = []
+            try:
+                start.wait()
+                for vehicle in batch:
+                    began = time.perf_counter()
+                    try:
+                        cell = reserve(vehicle, **kwargs)
+                    except DatabaseError:
+                        with lock:
+                            errors[0] += 1
+                        continue
+                    local.append(time.perf_counter() - began)
+                    with lock:
+                        if cell is None:
+                            refused[0] += 1
+                        else:
+                            granted.append((cell.pk, vehicle.pk))
+            finally:
+                with lock:
+                    samples.extend(local)
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(vehicles[i::options['threads']],))
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # A cell granted to several callers, and grants whose vehicle no longer holds the cell
+        double = sum(count - 1 for count in Counter(cell for cell, _ in granted).values() if count > 1)
+        holders = dict(ParkingCell.objects.filter(area=AREA).values_list('pk', 'vehicle_id'))
+        lost = sum(1 for cell, vehicle in granted if holders.get(cell) != vehicle)
+        samples.sort()
+        return len(granted), refused[0], errors[0], double, lost, samples or [0.0]
+
+    def _cleanup(self):
+        ParkingCell.objects.filter(area=AREA).delete()
+        LoadingGate.objects.filter(area=AREA).delete()
+        Vehicle.objects.filter(reg_no__startswith=f'{AREA}-').delete()
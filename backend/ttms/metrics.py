@@ -0,0 +1,61 @@
+"""
+TTMS domain gauges for the Prometheus endpoint (core.metrics).
+
+The gauges are a handful of grouped counts over small or indexed sets. The
+result is cached for METRICS_GAUGE_TTL seconds, with or without a shared
+cache, so scrapes more frequent than that do not touch the database.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .kpi import count_trucks_inside
+from .models import STAGE_CHOICES, VehicleStage, LoadingGate, ParkingCell, SystemAlert
+
+
+CACHE_KEY = 'ttms:metrics:gauges'
+
+
+def _counts(queryset, field, choices):
+    """Count rows per choice value, including choices with no rows."""
+    counts = dict.fromkeys((value for value, _ in choices), 0)
+    counts.update(queryset.values_list(field).annotate(n=Count('id')).order_by())
+    return counts
+
+
+def compute_gauges():
+    """Run the aggregate queries behind the domain gauges."""
+    return {
+        'trucks_inside': count_trucks_inside(),
+        'gates': _counts(LoadingGate.objects.all(), 'status', LoadingGate.STATUS_CHOICES),
+        'parking_cells': _counts(ParkingCell.objects.all(), 'status', ParkingCell.STATUS_CHOICES),
+        'open_alerts': _counts(SystemAlert.objects.filter(is_resolved=False), 'level', SystemAlert.LEVEL_CHOICES),
+        'active_stages': _counts(VehicleStage.objects.filter(state='active'), 'stage', STAGE_CHOICES),
+    }
+
+
+def get_gauges():
+    """Return the gauges, recomputing them at most once per METRICS_GAUGE_TTL seconds."""
+    gauges = cache.get(CACHE_KEY)
+    if gauges is None:
+        gauges = compute_gauges()
+        cache.set(CACHE_KEY, gauges, timeout=getattr(settings, 'METRICS_GAUGE_TTL', 15))
+    return gauges
+
+
+def collect_metrics():
+    """METRICS collector: TTMS gauges as (name, type, help, samples) families."""
+    gauges = get_gauges()
+    return [
+        ('ttms_trucks_inside', 'gauge', 'Vehicles past gate entry that have not exited.',
+         [({}, gauges['trucks_inside'])]),
+        ('ttms_loading_gates', 'gauge', 'Loading gates by status.',
+         [({'status': status}, count) for status, count in gauges['gates'].items()]),
+        ('ttms_parking_cells', 'gauge', 'Parking cells by status.',
+         [({'status': status}, count) for status, count in gauges['parking_cells'].items()]),
+        ('ttms_alerts_unresolved', 'gauge', 'Unresolved system alerts by level.',
+         [({'level': level}, count) for level, count in gauges['open_alerts'].items()]),
+        ('ttms_stage_active', 'gauge', 'Vehicle stages currently active, by stage.',
+         [({'stage': stage}, count) for stage, count in gauges['active_stages'].items()]),
+    ]
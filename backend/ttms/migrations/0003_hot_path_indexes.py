@@ -0,0 +1,57 @@
+# Generated by Django 4.2.8 on 2026-10-18 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0002_vehiclestage_finished_at_vehiclestage_started_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kpimetrics',
+            index=models.Index(fields=['-updated_at'], name='ttms_kpi_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loadinggate',
+            index=models.Index(fields=['area', 'status'], name='ttms_gate_area_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parkingcell',
+            index=models.Index(fields=['status', 'area', 'label'], name='ttms_cell_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemalert',
+            index=models.Index(fields=['is_resolved', '-created_at'], name='ttms_alert_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemalert',
+            index=models.Index(fields=['-created_at', '-id'], name='ttms_alert_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemalert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['-created_at'], name='ttms_alert_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turnaroundtimesparkline',
+            index=models.Index(fields=['-timestamp', '-id'], name='ttms_spark_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleentry',
+            index=models.Index(fields=['-gate_entry_time', '-id'], name='ttms_entry_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclestage',
+            index=models.Index(fields=['state', 'vehicle'], name='ttms_stage_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclestage',
+            index=models.Index(condition=models.Q(('state__in', ['active', 'pending'])), fields=['vehicle', 'stage'], name='ttms_stage_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclestage',
+            index=models.Index(condition=models.Q(('state', 'completed')), fields=['stage', 'finished_at'], name='ttms_stage_done_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.8 on 2026-10-18 00:28
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+STAGE_ORDER = ['gateEntry', 'tareWeighing', 'loading', 'postLoadingWeighing', 'gateExit']
+
+
+def backfill_current_stage(apps, schema_editor):
+    Vehicle = apps.get_model('ttms', 'Vehicle')
+    VehicleStage = apps.get_model('ttms', 'VehicleStage')
+
+    stages = {}
+    for vehicle_id, stage, state, finished_at in VehicleStage.objects.values_list(
+        'vehicle_id', 'stage', 'state', 'finished_at'
+    ).iterator():
+        stages.setdefault(vehicle_id, {})[stage] = (state, finished_at)
+
+    now = timezone.now()
+    batch = []
+    for vehicle in Vehicle.objects.only('id').iterator():
+        by_stage = stages.get(vehicle.pk)
+        if not by_stage:
+            continue
+        ordered = [stage for stage in STAGE_ORDER if stage in by_stage]
+        open_stages = [stage for stage in ordered if by_stage[stage][0] != 'completed']
+        if open_stages:
+            vehicle.current_stage = open_stages[0]
+            vehicle.current_state = by_stage[open_stages[0]][0]
+            vehicle.completed_at = None
+        else:
+            finished = [finished_at for _, finished_at in by_stage.values() if finished_at]
+            vehicle.current_stage = ordered[-1]
+            vehicle.current_state = 'completed'
+            vehicle.completed_at = max(finished) if finished else now
+        batch.append(vehicle)
+        if len(batch) >= 1000:
+            Vehicle.objects.bulk_update(batch, ['current_stage', 'current_state', 'completed_at'])
+            batch = []
+    if batch:
+        Vehicle.objects.bulk_update(batch, ['current_stage', 'current_state', 'completed_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='current_stage',
+            field=models.CharField(blank=True, choices=[('gateEntry', 'Gate Entry'), ('tareWeighing', 'Tare Weighing'), ('loading', 'Loading'), ('postLoadingWeighing', 'Post Loading Weighing'), ('gateExit', 'Gate Exit')], default='', help_text='First stage not yet completed (last stage once all are completed)', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='current_state',
+            field=models.CharField(blank=True, choices=[('completed', 'Completed'), ('active', 'Active'), ('pending', 'Pending')], default='', help_text='State of the current stage; completed once every stage is completed', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['current_state', '-timestamp'], name='ttms_vehicle_state_idx'),
+        ),
+        migrations.RunPython(backfill_current_stage, migrations.RunPython.noop),
+    ]
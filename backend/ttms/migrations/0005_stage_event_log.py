@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-18 00:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0004_vehicle_current_stage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(help_text='Reader-supplied key; retries with the same key are ignored', max_length=100, unique=True)),
+                ('stage', models.CharField(choices=[('gateEntry', 'Gate Entry'), ('tareWeighing', 'Tare Weighing'), ('loading', 'Loading'), ('postLoadingWeighing', 'Post Loading Weighing'), ('gateExit', 'Gate Exit')], max_length=50)),
+                ('state', models.CharField(choices=[('completed', 'Completed'), ('active', 'Active'), ('pending', 'Pending')], max_length=20)),
+                ('occurred_at', models.DateTimeField(help_text='Time the reader observed the transition')),
+                ('source', models.CharField(blank=True, help_text='Reader or device identifier', max_length=50)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_events', to='ttms.vehicle')),
+            ],
+            options={
+                'ordering': ['occurred_at', 'id'],
+                'indexes': [models.Index(fields=['vehicle', 'occurred_at', 'id'], name='ttms_event_vehicle_idx'), models.Index(fields=['-occurred_at', '-id'], name='ttms_event_time_idx')],
+            },
+        ),
+    ]
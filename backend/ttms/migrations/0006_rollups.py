@@ -0,0 +1,55 @@
+# Generated by Django 4.2.8 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0005_stage_event_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('stage', models.CharField(choices=[('gateEntry', 'Gate Entry'), ('tareWeighing', 'Tare Weighing'), ('loading', 'Loading'), ('postLoadingWeighing', 'Post Loading Weighing'), ('gateExit', 'Gate Exit')], max_length=50)),
+                ('completed', models.IntegerField(default=0, help_text='Stages finished in the bucket')),
+                ('time_taken_sum', models.BigIntegerField(default=0, help_text='Sum of time_taken in minutes')),
+                ('wait_time_sum', models.BigIntegerField(default=0, help_text='Sum of wait_time in minutes')),
+                ('standard_time_sum', models.BigIntegerField(default=0, help_text='Sum of standard_time in minutes')),
+            ],
+            options={
+                'ordering': ['grain', 'bucket_start', 'stage'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ThroughputRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('vehicles_in', models.IntegerField(default=0, help_text='Gate entries in the bucket')),
+                ('vehicles_out', models.IntegerField(default=0, help_text='Completed gate exits in the bucket')),
+                ('turnaround_sum', models.BigIntegerField(default=0, help_text='Sum of turnaround minutes of exited vehicles')),
+                ('turnaround_count', models.IntegerField(default=0, help_text='Exited vehicles with a turnaround time')),
+                ('turnaround_min', models.IntegerField(blank=True, null=True)),
+                ('turnaround_max', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['grain', 'bucket_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='throughputrollup',
+            constraint=models.UniqueConstraint(fields=('grain', 'bucket_start'), name='ttms_rollup_bucket_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='stagerollup',
+            constraint=models.UniqueConstraint(fields=('grain', 'bucket_start', 'stage'), name='ttms_stage_rollup_uniq'),
+        ),
+    ]
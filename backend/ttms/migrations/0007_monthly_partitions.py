@@ -0,0 +1,176 @@
+# Generated by Django 4.2.8 on 2026-10-18 00:55
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+# Frozen copy of the ttms.partitions table conversion as of this migration, so
+# later changes to that module cannot alter it
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(table, connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def _create_month(cursor, quote, table, month):
+    cursor.execute(
+        f'CREATE TABLE {quote(partition_name(table, month))} PARTITION OF {quote(table)} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [_bound(month), _bound(add_months(month, 1))]
+    )
+
+
+def _rebuild(connection, table, column, partitioned, months_ahead=3):
+    """
+    Recreate a table as partitioned (or plain again) and copy its rows over.
+
+    Secondary indexes and outgoing foreign keys are read from the catalog and
+    recreated under their original names.
+    """
+    quote = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table]
+        )
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+            [table, primary_key]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min({quote(column)}) FROM {quote(table)}')
+        first = cursor.fetchone()[0]
+
+        # Free the names before the new table takes them
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        cursor.execute(f'ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(primary_key)} TO {quote(old + "_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(name)}')
+
+        if partitioned:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+                f'PARTITION BY RANGE ({quote(column)})'
+            )
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(primary_key)} PRIMARY KEY (id, {quote(column)})'
+            )
+            cursor.execute(f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT')
+            current = month_start(timezone.now())
+            month = min(month_start(first), current) if first else current
+            while month <= add_months(current, months_ahead):
+                _create_month(cursor, quote, table, month)
+                month = add_months(month, 1)
+        else:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY)'
+            )
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(primary_key)} PRIMARY KEY (id)')
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+        # Identity columns get a fresh sequence; serial defaults keep the old one
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        if sequence:
+            cursor.execute(
+                f'SELECT setval(%s, COALESCE((SELECT max(id) FROM {quote(table)}), 0) + 1, false)', [sequence]
+            )
+        else:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [old])
+            sequence = cursor.fetchone()[0]
+            if sequence:
+                cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id')
+        cursor.execute(f'DROP TABLE {quote(old)}')
+
+
+def convert_to_partitioned(table, column, connection):
+    if is_partitioned(table, connection):
+        return
+    months_ahead = getattr(settings, 'PARTITIONS', {}).get('MONTHS_AHEAD', 3)
+    _rebuild(connection, table, column, partitioned=True, months_ahead=months_ahead)
+
+
+def convert_to_plain(table, column, connection):
+    if not is_partitioned(table, connection):
+        return
+    _rebuild(connection, table, column, partitioned=False)
+
+
+# (model, partition column)
+PARTITIONED = [
+    ('systemalert', 'created_at'),
+    ('vehicleentry', 'gate_entry_time'),
+    ('turnaroundtimesparkline', 'timestamp'),
+]
+
+
+def partition_tables(apps, schema_editor):
+    # PostgreSQL only; other backends keep plain tables
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, column in PARTITIONED:
+        table = apps.get_model('ttms', model_name)._meta.db_table
+        convert_to_partitioned(table, column, connection=schema_editor.connection)
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, column in PARTITIONED:
+        table = apps.get_model('ttms', model_name)._meta.db_table
+        convert_to_plain(table, column, connection=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0006_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loadinggate',
+            name='current_entry',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_gate', to='ttms.vehicleentry'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-18 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0007_monthly_partitions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='parkingcell',
+            name='ttms_cell_status_idx',
+        ),
+        migrations.AddField(
+            model_name='loadinggate',
+            name='x',
+            field=models.FloatField(blank=True, help_text='Yard map X coordinate in metres', null=True),
+        ),
+        migrations.AddField(
+            model_name='loadinggate',
+            name='y',
+            field=models.FloatField(blank=True, help_text='Yard map Y coordinate in metres', null=True),
+        ),
+        migrations.AddField(
+            model_name='parkingcell',
+            name='x',
+            field=models.FloatField(blank=True, help_text='Yard map X coordinate in metres', null=True),
+        ),
+        migrations.AddField(
+            model_name='parkingcell',
+            name='y',
+            field=models.FloatField(blank=True, help_text='Yard map Y coordinate in metres', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='parkingcell',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['area', 'label'], name='ttms_cell_free_idx'),
+        ),
+    ]
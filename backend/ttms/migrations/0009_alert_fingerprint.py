@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0008_parking_reserve'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemalert',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='Identifies the condition an alert reports, e.g. over_sla:<stage id>; used for dedupe', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='systemalert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['fingerprint'], name='ttms_alert_fp_idx'),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.8 on 2026-10-18 01:05
+
+import hashlib
+import re
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copies of ttms.alerts.alert_fingerprint and ttms.partitions.is_partitioned
+# as of this migration, so later changes to those modules cannot alter it
+
+VOLATILE_PATTERN = re.compile(
+    r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?|\b\d{1,2}:\d{2}(:\d{2})?\b'
+)
+
+
+def alert_fingerprint(level, message, vehicle_id=None):
+    normalized = ' '.join(VOLATILE_PATTERN.sub('<time>', message).casefold().split())
+    source = f'{level}|{normalized}|{vehicle_id or ""}'
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def is_partitioned(table, connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+OPEN_FINGERPRINT = models.UniqueConstraint(
+    condition=models.Q(('is_resolved', False), models.Q(('fingerprint', ''), _negated=True)),
+    fields=('fingerprint',),
+    name='ttms_alert_open_fp_uniq',
+)
+
+
+def coalesce_open_alerts(apps, schema_editor):
+    """Fingerprint open alerts and fold duplicates into the oldest one."""
+    SystemAlert = apps.get_model('ttms', 'SystemAlert')
+    now = timezone.now()
+    groups = {}
+    for alert_id, level, message, vehicle_id, fingerprint, created_at in (
+        SystemAlert.objects.filter(is_resolved=False).order_by('created_at', 'id')
+        .values_list('id', 'level', 'message', 'vehicle_id', 'fingerprint', 'created_at').iterator()
+    ):
+        fingerprint = fingerprint or alert_fingerprint(level, message, vehicle_id)
+        groups.setdefault(fingerprint, []).append((alert_id, created_at))
+    for fingerprint, alerts in groups.items():
+        (keep, first_seen), duplicates = alerts[0], alerts[1:]
+        if duplicates:
+            SystemAlert.objects.filter(id__in=[alert_id for alert_id, _ in duplicates]).update(
+                is_resolved=True, resolved_at=now
+            )
+        SystemAlert.objects.filter(id=keep).update(
+            fingerprint=fingerprint, occurrences=len(alerts), last_seen_at=alerts[-1][1]
+        )
+
+
+def _partitioned(apps, schema_editor):
+    model = apps.get_model('ttms', 'SystemAlert')
+    return model, is_partitioned(model._meta.db_table, connection=schema_editor.connection)
+
+
+def add_open_fingerprint_constraint(apps, schema_editor):
+    # A unique index on a partitioned table must include created_at; there the
+    # index stays plain and ttms.alerts serializes upserts with advisory locks
+    model, partitioned = _partitioned(apps, schema_editor)
+    if partitioned:
+        schema_editor.add_index(model, models.Index(
+            fields=['fingerprint'], condition=OPEN_FINGERPRINT.condition, name=OPEN_FINGERPRINT.name
+        ))
+    else:
+        schema_editor.add_constraint(model, OPEN_FINGERPRINT)
+
+
+def remove_open_fingerprint_constraint(apps, schema_editor):
+    model, partitioned = _partitioned(apps, schema_editor)
+    if partitioned:
+        schema_editor.remove_index(model, models.Index(
+            fields=['fingerprint'], condition=OPEN_FINGERPRINT.condition, name=OPEN_FINGERPRINT.name
+        ))
+    else:
+        schema_editor.remove_constraint(model, OPEN_FINGERPRINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0009_alert_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='systemalert',
+            name='ttms_alert_fp_idx',
+        ),
+        migrations.AddField(
+            model_name='systemalert',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemalert',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1, help_text='Times the alert was raised while open'),
+        ),
+        migrations.AlterField(
+            model_name='systemalert',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='Identifies the condition an alert reports; repeats of an open alert share it', max_length=64),
+        ),
+        migrations.RunPython(coalesce_open_alerts, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(model_name='systemalert', constraint=OPEN_FINGERPRINT),
+            ],
+            database_operations=[
+                migrations.RunPython(add_open_fingerprint_constraint, remove_open_fingerprint_constraint),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 01:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttms', '0010_alert_occurrences'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='systemalert',
+            name='ttms_alert_resolved_idx',
+        ),
+    ]
@@ -1,7 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
+STAGE_CHOICES = [
+    ('gateEntry', 'Gate Entry'),
+    ('tareWeighing', 'Tare Weighing'),
+    ('loading', 'Loading'),
+    ('postLoadingWeighing', 'Post Loading Weighing'),
+    ('gateExit', 'Gate Exit'),
+]
+
+STATE_CHOICES = [
+    ('completed', 'Completed'),
+    ('active', 'Active'),
+    ('pending', 'Pending'),
+]
+
+
 class KPIMetrics(models.Model):
     """Stores KPI metrics data"""
     created_at = models.DateTimeField(auto_now_add=True)
@@ -80,6 +96,9 @@ class KPIMetrics(models.Model):
     class Meta:
         verbose_name_plural = "KPI Metrics"
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['-updated_at'], name='ttms_kpi_updated_idx'),
+        ]
     
     def __str__(self):
         return f"KPI Metrics - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -114,8 +133,28 @@ class Vehicle(models.Model):
     )
     timestamp = models.DateTimeField(auto_now=True)
     
+    # Denormalized from VehicleStage, maintained by ttms.stages.sync_current_stages
+    current_stage = models.CharField(
+        max_length=50,
+        choices=STAGE_CHOICES,
+        blank=True,
+        default='',
+        help_text="First stage not yet completed (last stage once all are completed)"
+    )
+    current_state = models.CharField(
+        max_length=20,
+        choices=STATE_CHOICES,
+        blank=True,
+        default='',
+        help_text="State of the current stage; completed once every stage is completed"
+    )
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['current_state', '-timestamp'], name='ttms_vehicle_state_idx'),
+        ]
     
     def __str__(self):
         return f"Vehicle {self.reg_no}"
@@ -123,19 +162,8 @@ class Vehicle(models.Model):
 
 class VehicleStage(models.Model):
     """Represents a stage in the vehicle's journey"""
-    STAGE_CHOICES = [
-        ('gateEntry', 'Gate Entry'),
-        ('tareWeighing', 'Tare Weighing'),
-        ('loading', 'Loading'),
-        ('postLoadingWeighing', 'Post Loading Weighing'),
-        ('gateExit', 'Gate Exit'),
-    ]
-    
-    STATE_CHOICES = [
-        ('completed', 'Completed'),
-        ('active', 'Active'),
-        ('pending', 'Pending'),
-    ]
+    STAGE_CHOICES = STAGE_CHOICES
+    STATE_CHOICES = STATE_CHOICES
     
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='stages')
     stage = models.CharField(max_length=50, choices=STAGE_CHOICES)
@@ -161,9 +189,66 @@ class VehicleStage(models.Model):
     class Meta:
         unique_together = ('vehicle', 'stage')
         ordering = ['vehicle', 'stage']
+        indexes = [
+            models.Index(fields=['state', 'vehicle'], name='ttms_stage_state_idx'),
+            # Only stages still in progress; stays small as the fleet history grows
+            models.Index(
+                fields=['vehicle', 'stage'],
+                condition=Q(state__in=['active', 'pending']),
+                name='ttms_stage_open_idx',
+            ),
+            # Completed exits by finish time (dispatch counts, turnaround averages)
+            models.Index(
+                fields=['stage', 'finished_at'],
+                condition=Q(state='completed'),
+                name='ttms_stage_done_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.vehicle.reg_no} - {self.get_stage_display()}"
+    
+    def save(self, *args, **kwargs):
+        from .stages import sync_current_stages
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_current_stages([self.vehicle_id])
+    
+    def delete(self, *args, **kwargs):
+        from .stages import sync_current_stages
+        vehicle_id = self.vehicle_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            sync_current_stages([vehicle_id])
+        return result
+
+
+class StageEvent(models.Model):
+    """
+    Append-only log of stage transitions reported by gate, RFID and weighbridge readers.
+    VehicleStage rows and Vehicle.turnaround_time are projections of this log.
+    """
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Reader-supplied key; retries with the same key are ignored"
+    )
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='stage_events')
+    stage = models.CharField(max_length=50, choices=STAGE_CHOICES)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES)
+    occurred_at = models.DateTimeField(help_text="Time the reader observed the transition")
+    source = models.CharField(max_length=50, blank=True, help_text="Reader or device identifier")
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['occurred_at', 'id']
+        indexes = [
+            models.Index(fields=['vehicle', 'occurred_at', 'id'], name='ttms_event_vehicle_idx'),
+            models.Index(fields=['-occurred_at', '-id'], name='ttms_event_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.vehicle_id} {self.stage}={self.state} at {self.occurred_at}"
 
 
 class LoadingGate(models.Model):
@@ -177,18 +262,27 @@ class LoadingGate(models.Model):
     name = models.CharField(max_length=50, unique=True)
     area = models.CharField(max_length=20, default='AREA-1')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    # Not enforced in the database: VehicleEntry is partitioned on PostgreSQL
+    # and its (id, gate_entry_time) key cannot be referenced by id alone
     current_entry = models.ForeignKey(
         'VehicleEntry',
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='assigned_gate'
+        related_name='assigned_gate',
+        db_constraint=False
     )
+    # Yard map position, used to find the nearest free parking cell
+    x = models.FloatField(null=True, blank=True, help_text="Yard map X coordinate in metres")
+    y = models.FloatField(null=True, blank=True, help_text="Yard map Y coordinate in metres")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['area', 'name']
+        indexes = [
+            models.Index(fields=['area', 'status'], name='ttms_gate_area_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.area}) - {self.status}"
@@ -217,19 +311,28 @@ class ParkingCell(models.Model):
         blank=True,
         related_name='parking_assignments'
     )
+    x = models.FloatField(null=True, blank=True, help_text="Yard map X coordinate in metres")
+    y = models.FloatField(null=True, blank=True, help_text="Yard map Y coordinate in metres")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('area', 'label')
         ordering = ['area', 'label']
+        indexes = [
+            # Only free cells are searched when reserving (ttms/parking.py)
+            models.Index(fields=['area', 'label'], name='ttms_cell_free_idx', condition=Q(status='available')),
+        ]
     
     def __str__(self):
         return f"{self.area} - {self.label} ({self.status})"
 
 
 class VehicleEntry(models.Model):
-    """Represents a vehicle entry in the scheduling system"""
+    """
+    Represents a vehicle entry in the scheduling system.
+    Partitioned by month on gate_entry_time on PostgreSQL (ttms/partitions.py).
+    """
     vehicle = models.ForeignKey(
         Vehicle,
         on_delete=models.CASCADE,
@@ -244,13 +347,20 @@ class VehicleEntry(models.Model):
     
     class Meta:
         ordering = ['-gate_entry_time']
+        indexes = [
+            models.Index(fields=['-gate_entry_time', '-id'], name='ttms_entry_time_idx'),
+        ]
     
     def __str__(self):
         return f"Entry - {self.vehicle.reg_no} at {self.gate_entry_time}"
 
 
 class SystemAlert(models.Model):
-    """Represents system alerts"""
+    """
+    Represents system alerts.
+    Partitioned by month on created_at on PostgreSQL (ttms/partitions.py).
+    Repeats of an open alert are coalesced into it (ttms.alerts.raise_alert).
+    """
     LEVEL_CHOICES = [
         ('critical', 'Critical'),
         ('warning', 'Warning'),
@@ -270,21 +380,105 @@ class SystemAlert(models.Model):
     is_resolved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="Identifies the condition an alert reports; repeats of an open alert share it"
+    )
+    occurrences = models.PositiveIntegerField(default=1, help_text="Times the alert was raised while open")
+    last_seen_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='ttms_alert_created_idx'),
+            # Unresolved alerts only (active list, alarms poll)
+            models.Index(
+                fields=['-created_at'],
+                condition=Q(is_resolved=False),
+                name='ttms_alert_open_idx',
+            ),
+        ]
+        constraints = [
+            # One open alert per fingerprint; repeats are counted on it (ttms/alerts.py).
+            # A plain partial index on the partitioned PostgreSQL table (migration 0010)
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=Q(is_resolved=False) & ~Q(fingerprint=''),
+                name='ttms_alert_open_fp_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f"[{self.level.upper()}] {self.message}"
 
 
 class TurnaroundTimeSparkline(models.Model):
-    """Stores historical turnaround time data for sparkline charts"""
+    """
+    Stores historical turnaround time data for sparkline charts.
+    Partitioned by month on timestamp on PostgreSQL (ttms/partitions.py).
+    """
     timestamp = models.DateTimeField(auto_now_add=True)
     value = models.IntegerField(help_text="Turnaround time in minutes")
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='ttms_spark_ts_idx'),
+        ]
     
     def __str__(self):
         return f"Sparkline - {self.value} min at {self.timestamp}"
+
+
+ROLLUP_GRAIN_CHOICES = [
+    ('hour', 'Hour'),
+    ('day', 'Day'),
+]
+
+
+class ThroughputRollup(models.Model):
+    """
+    Vehicle throughput and turnaround per hour or day.
+    Maintained by the rollup_metrics command (ttms/rollups.py); every bucket
+    from the first recorded activity onwards has a row, including empty ones.
+    """
+    grain = models.CharField(max_length=4, choices=ROLLUP_GRAIN_CHOICES)
+    bucket_start = models.DateTimeField()
+    vehicles_in = models.IntegerField(default=0, help_text="Gate entries in the bucket")
+    vehicles_out = models.IntegerField(default=0, help_text="Completed gate exits in the bucket")
+    turnaround_sum = models.BigIntegerField(default=0, help_text="Sum of turnaround minutes of exited vehicles")
+    turnaround_count = models.IntegerField(default=0, help_text="Exited vehicles with a turnaround time")
+    turnaround_min = models.IntegerField(null=True, blank=True)
+    turnaround_max = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['grain', 'bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['grain', 'bucket_start'], name='ttms_rollup_bucket_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.grain} {self.bucket_start}: {self.vehicles_in} in / {self.vehicles_out} out"
+
+
+class StageRollup(models.Model):
+    """Completed stage counts and time sums per hour or day and stage, next to ThroughputRollup"""
+    grain = models.CharField(max_length=4, choices=ROLLUP_GRAIN_CHOICES)
+    bucket_start = models.DateTimeField()
+    stage = models.CharField(max_length=50, choices=STAGE_CHOICES)
+    completed = models.IntegerField(default=0, help_text="Stages finished in the bucket")
+    time_taken_sum = models.BigIntegerField(default=0, help_text="Sum of time_taken in minutes")
+    wait_time_sum = models.BigIntegerField(default=0, help_text="Sum of wait_time in minutes")
+    standard_time_sum = models.BigIntegerField(default=0, help_text="Sum of standard_time in minutes")
+    
+    class Meta:
+        ordering = ['grain', 'bucket_start', 'stage']
+        constraints = [
+            models.UniqueConstraint(fields=['grain', 'bucket_start', 'stage'], name='ttms_stage_rollup_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.grain} {self.bucket_start} {self.stage}: {self.completed}"
@@ -0,0 +1,77 @@
+"""
+Compact yard occupancy snapshot for the parking map.
+
+Each area's cells, in label order, are reduced to a packed status array
+(2 bits per cell, four cells per byte, least significant bits first,
+base64-encoded) plus a sparse map of cell index to the reg_no of the vehicle
+holding it. The map redraw then costs one query with a single join and a
+response of roughly a quarter byte per cell plus the held cells, whatever
+the yard size. Cell labels, which only change with the yard layout, are
+sent on request.
+"""
+
+import base64
+
+from common.conditional import get_generations
+from .models import ParkingCell, Vehicle
+
+
+STATUS_CODES = {value: code for code, (value, _) in enumerate(ParkingCell.STATUS_CHOICES)}
+
+BITS_PER_CELL = 2
+
+
+def snapshot_version():
+    """Changes whenever a cell or a vehicle reg_no may have changed."""
+    return '-'.join(str(generation) for generation in get_generations((ParkingCell, Vehicle)))
+
+
+def _pack(codes):
+    per_byte = 8 // BITS_PER_CELL
+    packed = bytearray((len(codes) + per_byte - 1) // per_byte)
+    for index, code in enumerate(codes):
+        packed[index // per_byte] |= code << (BITS_PER_CELL * (index % per_byte))
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def occupancy_snapshot(area=None, layout=False):
+    """
+    Occupancy of every cell, grouped by area.
+
+    Args:
+        area: Restrict to one area
+        layout: Include the cell labels in index order
+
+    Returns:
+        Dict with the version, the status encoding and one entry per area
+    """
+    # Read before querying, so a write landing mid-query leaves the older version
+    version = snapshot_version()
+    cells = ParkingCell.objects.order_by('area', 'label')
+    if area is not None:
+        cells = cells.filter(area=area)
+
+    areas = {}
+    for cell_area, label, cell_status, reg_no in cells.values_list('area', 'label', 'status', 'vehicle__reg_no'):
+        group = areas.setdefault(cell_area, {'codes': [], 'labels': [], 'held': {}})
+        if reg_no is not None:
+            group['held'][str(len(group['codes']))] = reg_no
+        group['codes'].append(STATUS_CODES.get(cell_status, 0))
+        group['labels'].append(label)
+
+    result = {}
+    for cell_area, group in areas.items():
+        result[cell_area] = {
+            'cells': len(group['codes']),
+            'counts': {value: group['codes'].count(code) for value, code in STATUS_CODES.items()},
+            'status': _pack(group['codes']),
+            'vehicles': group['held'],
+        }
+        if layout:
+            result[cell_area]['labels'] = group['labels']
+
+    return {
+        'version': version,
+        'encoding': {'bits': BITS_PER_CELL, 'codes': list(STATUS_CODES)},
+        'areas': result,
+    }
@@ -0,0 +1,89 @@
+"""
+Parking cell reservation.
+
+A reservation is one UPDATE whose WHERE clause picks the cell with a
+subquery: the first free cell of an area by label, or the free cell closest
+to a loading gate on the yard map. The subquery reads the partial index on
+available cells (ttms_cell_free_idx) and locks its row with FOR UPDATE SKIP
+LOCKED, and the UPDATE re-checks ``status = 'available'``, so concurrent
+reservations each get a different cell and never overwrite one another.
+On backends without row locks (SQLite) the statement is serialized by the
+database instead.
+
+The UPDATE bypasses model signals, so the ParkingCell ETag generation is
+bumped explicitly after commit.
+"""
+
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Value
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from .models import ParkingCell
+
+
+def free_cells(area=None, gate=None):
+    """
+    Available cells in reservation order.
+
+    Args:
+        area: Restrict to this area
+        gate: LoadingGate to get close to; restricts to the gate's area and
+            orders by distance when the gate has yard coordinates
+    """
+    queryset = ParkingCell.objects.filter(status='available')
+    if gate is not None:
+        area = area or gate.area
+    if area is not None:
+        queryset = queryset.filter(area=area)
+    if gate is not None and gate.x is not None and gate.y is not None:
+        dx = F('x') - Value(gate.x, output_field=FloatField())
+        dy = F('y') - Value(gate.y, output_field=FloatField())
+        return queryset.alias(distance=dx * dx + dy * dy).order_by(
+            F('distance').asc(nulls_last=True), 'area', 'label'
+        )
+    return queryset.order_by('area', 'label')
+
+
+def _claim(candidates, vehicle, new_status):
+    """Set the first row of ``candidates`` to new_status for vehicle; return its id or None."""
+    candidate_sql, candidate_params = candidates.values('pk')[:1].query.sql_with_params()
+    table = connection.ops.quote_name(ParkingCell._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET status = %s, vehicle_id = %s, updated_at = %s '
+            f'WHERE id = ({candidate_sql}) AND status = %s RETURNING id',
+            [new_status, vehicle.pk, timezone.now(), *candidate_params, 'available']
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def reserve_cell(vehicle, area=None, gate=None, new_status='reserved'):
+    """
+    Atomically reserve a free cell for a vehicle.
+
+    Returns:
+        The reserved ParkingCell, or None when no cell is free
+    """
+    with transaction.atomic():
+        cell_id = _claim(free_cells(area, gate).select_for_update(skip_locked=True), vehicle, new_status)
+        if cell_id is None:
+            return None
+        transaction.on_commit(lambda: bump_generation(ParkingCell))
+    return ParkingCell.objects.select_related('vehicle').get(pk=cell_id)
+
+
+def allocate_cell(cell_id, vehicle, new_status='reserved'):
+    """
+    Reserve a given cell for a vehicle if it is still free.
+
+    Raises:
+        ValueError: The cell is reserved or occupied
+    """
+    with transaction.atomic():
+        claimed = _claim(ParkingCell.objects.filter(pk=cell_id, status='available'), vehicle, new_status)
+        if claimed is None:
+            raise ValueError('Parking cell is not available')
+        transaction.on_commit(lambda: bump_generation(ParkingCell))
+    return ParkingCell.objects.select_related('vehicle').get(pk=cell_id)
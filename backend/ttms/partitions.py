@@ -0,0 +1,327 @@
+"""
+Monthly range partitioning and retention for the append-mostly TTMS tables.
+
+On PostgreSQL, SystemAlert, VehicleEntry and TurnaroundTimeSparkline are
+range partitioned by month on their time column (migration 0007 converts the
+existing tables in place). Each month has a partition named
+``<table>_pYYYYMM``; a ``<table>_default`` partition catches anything outside
+them. Queries bounded on the time column (today's entries, exports, recent
+sparkline points) are pruned to the matching partitions.
+
+PostgreSQL requires the partition key in every unique constraint, so the
+primary key becomes (id, <time column>); ids still come from the table's
+identity sequence. Foreign keys pointing at these tables are not enforced by
+the database (LoadingGate.current_entry).
+
+Other backends (SQLite in development and tests) keep plain tables, and
+retention archives and deletes rows in batches instead of whole partitions.
+"""
+
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection as default_connection, models, transaction
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from common.export import encode_lines
+from .models import SystemAlert, VehicleEntry, TurnaroundTimeSparkline
+
+
+# Model -> time field the table is partitioned on
+PARTITIONED_MODELS = {
+    SystemAlert: 'created_at',
+    VehicleEntry: 'gate_entry_time',
+    TurnaroundTimeSparkline: 'timestamp',
+}
+
+RETENTION_BATCH_SIZE = 5000
+
+
+def partition_settings():
+    config = getattr(settings, 'PARTITIONS', {})
+    return {
+        'MONTHS_AHEAD': config.get('MONTHS_AHEAD', 3),
+        'RETENTION_MONTHS': config.get('RETENTION_MONTHS', 0),
+        'ARCHIVE_DIR': config.get('ARCHIVE_DIR', ''),
+    }
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(table, connection=default_connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table, connection=default_connection):
+    """Monthly partitions currently attached, as {first day of month: name}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)',
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    months = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return months
+
+
+def _create_month(cursor, quote, table, month):
+    cursor.execute(
+        f'CREATE TABLE {quote(partition_name(table, month))} PARTITION OF {quote(table)} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [_bound(month), _bound(add_months(month, 1))]
+    )
+
+
+def create_partition(table, column, month, connection=default_connection):
+    """
+    Add the partition for one month.
+
+    Rows for that month already sitting in the default partition are moved
+    into the new partition in the same transaction.
+    """
+    quote = connection.ops.quote_name
+    default = f'{table}_default'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(default)}')
+        _create_month(cursor, quote, table, month)
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(default)} WHERE {quote(column)} >= %s AND {quote(column)} < %s '
+            f'RETURNING *) INSERT INTO {quote(table)} SELECT * FROM moved',
+            [_bound(month), _bound(add_months(month, 1))]
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(default)} DEFAULT')
+
+
+def ensure_partitions(table, column, months_ahead=None, connection=default_connection):
+    """Create missing partitions from the current month to MONTHS_AHEAD months ahead."""
+    if months_ahead is None:
+        months_ahead = partition_settings()['MONTHS_AHEAD']
+    existing = list_partitions(table, connection)
+    current = month_start(timezone.now())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            create_partition(table, column, month, connection)
+            created.append(partition_name(table, month))
+    return created
+
+
+def _rebuild(connection, table, column, partitioned, months_ahead=3):
+    """
+    Recreate a table as partitioned (or plain again) and copy its rows over.
+
+    Secondary indexes and outgoing foreign keys are read from the catalog and
+    recreated under their original names.
+    """
+    quote = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table]
+        )
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+            [table, primary_key]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min({quote(column)}) FROM {quote(table)}')
+        first = cursor.fetchone()[0]
+
+        # Free the names before the new table takes them
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        cursor.execute(f'ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(primary_key)} TO {quote(old + "_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(name)}')
+
+        if partitioned:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+                f'PARTITION BY RANGE ({quote(column)})'
+            )
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(primary_key)} PRIMARY KEY (id, {quote(column)})'
+            )
+            cursor.execute(f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT')
+            current = month_start(timezone.now())
+            month = min(month_start(first), current) if first else current
+            while month <= add_months(current, months_ahead):
+                _create_month(cursor, quote, table, month)
+                month = add_months(month, 1)
+        else:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY)'
+            )
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(primary_key)} PRIMARY KEY (id)')
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+        # Identity columns get a fresh sequence; serial defaults keep the old one
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        if sequence:
+            cursor.execute(
+                f'SELECT setval(%s, COALESCE((SELECT max(id) FROM {quote(table)}), 0) + 1, false)', [sequence]
+            )
+        else:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [old])
+            sequence = cursor.fetchone()[0]
+            if sequence:
+                cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id')
+        cursor.execute(f'DROP TABLE {quote(old)}')
+
+
+def convert_to_partitioned(table, column, connection=default_connection, months_ahead=None):
+    """Turn a plain PostgreSQL table into a monthly range-partitioned one (no-op if it already is)."""
+    if is_partitioned(table, connection):
+        return False
+    if months_ahead is None:
+        months_ahead = partition_settings()['MONTHS_AHEAD']
+    _rebuild(connection, table, column, partitioned=True, months_ahead=months_ahead)
+    return True
+
+
+def convert_to_plain(table, column, connection=default_connection):
+    """Reverse of convert_to_partitioned: merge every partition back into one table."""
+    if not is_partitioned(table, connection):
+        return False
+    _rebuild(connection, table, column, partitioned=False)
+    return True
+
+
+def _release_references(model, field, cutoff):
+    """Clear nullable references into rows that are about to leave the table."""
+    for relation in model._meta.related_objects:
+        if relation.on_delete is models.SET_NULL:
+            relation.related_model.objects.filter(
+                **{f'{relation.field.name}__{field}__lt': cutoff}
+            ).update(**{relation.field.name: None})
+
+
+def _archive_file(archive_dir, table, label):
+    os.makedirs(archive_dir, exist_ok=True)
+    return os.path.join(archive_dir, f'{table}-{label}.csv.gz')
+
+
+def _retain_partitions(model, field, cutoff_month, archive_dir, drop, connection):
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    results = []
+    for month, name in sorted(list_partitions(table, connection).items()):
+        if month >= cutoff_month:
+            continue
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+        action = 'detached'
+        if archive_dir:
+            path = _archive_file(archive_dir, table, f'{month:%Y%m}')
+            with gzip.open(path, 'wb') as archive, connection.cursor() as cursor:
+                cursor.copy_expert(f'COPY {quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+            action = f'archived to {path}'
+        if archive_dir or drop:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+            action += ' and dropped'
+        results.append((name, action))
+    return results
+
+
+def _retain_rows(model, field, cutoff, archive_dir, drop, batch_size):
+    """Archive and delete rows older than cutoff, for plain tables and the default partition."""
+    queryset = model.objects.filter(**{f'{field}__lt': cutoff})
+    if not queryset.exists():
+        return []
+    table = model._meta.db_table
+    action = 'kept (rows outside monthly partitions are only removed with an archive dir or drop)'
+    if archive_dir:
+        columns = [f.attname for f in model._meta.concrete_fields]
+        path = _archive_file(archive_dir, table, f'before-{cutoff:%Y%m%d}')
+        rows = queryset.order_by(field, 'pk').values_list(*columns).iterator(chunk_size=batch_size)
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as archive:
+            archive.writelines(encode_lines('csv', columns, rows))
+        action = f'archived to {path}'
+    if archive_dir or drop:
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by(field, 'pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += model.objects.filter(pk__in=ids).delete()[1].get(model._meta.label, 0)
+        action = f'{action} and deleted' if archive_dir else 'deleted'
+        action += f' ({deleted} rows)'
+    return [(f'{table} rows before {cutoff:%Y-%m-%d}', action)]
+
+
+def apply_retention(model, months=None, archive_dir=None, drop=False,
+                    batch_size=RETENTION_BATCH_SIZE, connection=default_connection):
+    """
+    Take months older than the retention window out of a partitioned table.
+
+    Partitions are detached; with archive_dir they are also written out as
+    gzipped CSV and dropped, with drop they are dropped outright. Rows older
+    than the window in the default partition, or in a plain (non-PostgreSQL)
+    table, are archived and deleted in batches.
+
+    Returns:
+        List of (partition or row range, action taken)
+    """
+    settings_ = partition_settings()
+    months = settings_['RETENTION_MONTHS'] if months is None else months
+    archive_dir = settings_['ARCHIVE_DIR'] if archive_dir is None else archive_dir
+    if months <= 0:
+        return []
+    field = PARTITIONED_MODELS[model]
+    cutoff_month = add_months(month_start(timezone.now()), -months)
+    cutoff = _bound(cutoff_month)
+
+    _release_references(model, field, cutoff)
+    results = []
+    if is_partitioned(model._meta.db_table, connection):
+        results += _retain_partitions(model, field, cutoff_month, archive_dir, drop, connection)
+    rows = _retain_rows(model, field, cutoff, archive_dir, drop, batch_size)
+    if results or (rows and (archive_dir or drop)):
+        bump_generation(model)
+    return results + rows
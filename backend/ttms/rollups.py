@@ -0,0 +1,227 @@
+"""
+Hourly and daily rollups of throughput, turnaround and stage times.
+
+refresh_rollups() re-aggregates the source rows of a time window into one
+ThroughputRollup row per hour (empty hours included) and StageRollup rows per
+hour and stage, then rebuilds the daily rows of the days it touched from the
+hourly ones. Without an explicit window it continues from the latest hourly
+bucket minus LOOKBACK_HOURS, which picks up late writes such as a turnaround
+time set when the vehicle exits; on an empty table it starts at the first
+recorded activity. Historical KPI figures and dashboards then read O(days)
+rows instead of scanning every vehicle.
+
+Buckets follow the same conventions as ttms.kpi: gate entries count by
+gate_entry_time, exits and turnaround by the gateExit finished_at, stage
+times by the stage's finished_at.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from .models import ThroughputRollup, StageRollup, VehicleEntry, VehicleStage
+
+
+THROUGHPUT_FIELDS = ['vehicles_in', 'vehicles_out', 'turnaround_sum', 'turnaround_count']
+STAGE_FIELDS = ['completed', 'time_taken_sum', 'wait_time_sum', 'standard_time_sum']
+
+
+def rollup_settings():
+    config = getattr(settings, 'ROLLUPS', {})
+    return {
+        'LOOKBACK_HOURS': config.get('LOOKBACK_HOURS', 2),
+        'KPI_FROM_ROLLUPS': config.get('KPI_FROM_ROLLUPS', True),
+    }
+
+
+def floor_hour(value):
+    return timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value):
+    return timezone.localtime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _hours(start, end):
+    """Hour bucket starts in [start, end), stepping in UTC so DST changes are safe."""
+    hour = start.astimezone(timezone.utc)
+    while hour < end:
+        yield timezone.localtime(hour)
+        hour += timedelta(hours=1)
+
+
+def _days(start, end):
+    day = start
+    while day < end:
+        yield day
+        day = floor_day(day + timedelta(days=1, hours=12))
+
+
+def first_activity():
+    """Earliest gate entry or completed gate exit, or None when there is no data."""
+    first_entry = VehicleEntry.objects.aggregate(first=Min('gate_entry_time'))['first']
+    first_exit = VehicleStage.objects.filter(
+        stage='gateExit', state='completed'
+    ).aggregate(first=Min('finished_at'))['first']
+    candidates = [value for value in (first_entry, first_exit) if value is not None]
+    return min(candidates) if candidates else None
+
+
+def latest_hour():
+    return ThroughputRollup.objects.filter(grain='hour').aggregate(latest=Max('bucket_start'))['latest']
+
+
+def _aggregate_hours(start, end):
+    """Group source rows with timestamps in [start, end) by hour."""
+    throughput = {}
+    for row in (
+        VehicleEntry.objects.filter(gate_entry_time__gte=start, gate_entry_time__lt=end)
+        .annotate(bucket=TruncHour('gate_entry_time')).values('bucket')
+        .annotate(vehicles_in=Count('id')).order_by()
+    ):
+        throughput.setdefault(row['bucket'], {})['vehicles_in'] = row['vehicles_in']
+
+    with_turnaround = Q(vehicle__turnaround_time__gt=0)
+    for row in (
+        VehicleStage.objects.filter(stage='gateExit', state='completed', finished_at__gte=start, finished_at__lt=end)
+        .annotate(bucket=TruncHour('finished_at')).values('bucket')
+        .annotate(
+            vehicles_out=Count('id'),
+            turnaround_sum=Coalesce(Sum('vehicle__turnaround_time', filter=with_turnaround), 0),
+            turnaround_count=Count('id', filter=with_turnaround),
+            turnaround_min=Min('vehicle__turnaround_time', filter=with_turnaround),
+            turnaround_max=Max('vehicle__turnaround_time', filter=with_turnaround),
+        ).order_by()
+    ):
+        throughput.setdefault(row.pop('bucket'), {}).update(row)
+
+    stages = (
+        VehicleStage.objects.filter(state='completed', finished_at__gte=start, finished_at__lt=end)
+        .annotate(bucket=TruncHour('finished_at')).values('bucket', 'stage')
+        .annotate(
+            completed=Count('id'),
+            time_taken_sum=Coalesce(Sum('time_taken'), 0),
+            wait_time_sum=Coalesce(Sum('wait_time'), 0),
+            standard_time_sum=Coalesce(Sum('standard_time'), 0),
+        ).order_by()
+    )
+    return throughput, list(stages)
+
+
+def _sum_by_day(queryset, keys, aggregates):
+    # Aliased because annotations may not reuse model field names
+    rows = queryset.annotate(bucket=TruncDay('bucket_start')).values('bucket', *keys).annotate(
+        **{f'total_{field}': aggregate for field, aggregate in aggregates.items()}
+    ).order_by()
+    return [
+        {'bucket': row['bucket'], **{key: row[key] for key in keys},
+         **{field: row[f'total_{field}'] for field in aggregates}}
+        for row in rows
+    ]
+
+
+def _rebuild_days(start, end):
+    """Recompute daily rows for days in [start, end) from the hourly rows."""
+    window = Q(bucket_start__gte=start, bucket_start__lt=end)
+    throughput = {
+        row.pop('bucket'): row
+        for row in _sum_by_day(ThroughputRollup.objects.filter(window, grain='hour'), (), {
+            **{field: Sum(field) for field in THROUGHPUT_FIELDS},
+            'turnaround_min': Min('turnaround_min'),
+            'turnaround_max': Max('turnaround_max'),
+        })
+    }
+    stages = _sum_by_day(
+        StageRollup.objects.filter(window, grain='hour'), ('stage',),
+        {field: Sum(field) for field in STAGE_FIELDS},
+    )
+
+    ThroughputRollup.objects.filter(grain='day', bucket_start__gte=start, bucket_start__lt=end).delete()
+    StageRollup.objects.filter(grain='day', bucket_start__gte=start, bucket_start__lt=end).delete()
+    ThroughputRollup.objects.bulk_create([
+        ThroughputRollup(grain='day', bucket_start=day, **throughput.get(day, {}))
+        for day in _days(start, end)
+    ], batch_size=1000)
+    StageRollup.objects.bulk_create([
+        StageRollup(grain='day', bucket_start=row.pop('bucket'), **row) for row in stages
+    ], batch_size=1000)
+
+
+def refresh_rollups(start=None, end=None):
+    """
+    Recompute hourly rollups for [start, end) and the daily rollups containing them.
+
+    Args:
+        start: Window start; rounded down to the day. Defaults to the latest
+            hourly bucket minus LOOKBACK_HOURS (or the first activity)
+        end: Window end, defaults to now; the bucket containing it is included
+
+    Returns:
+        (hours, days) rebuilt, or (0, 0) when there is nothing to roll up
+    """
+    end = end or timezone.now()
+    if start is not None:
+        start = floor_day(start)
+    else:
+        latest = latest_hour()
+        if latest is not None:
+            start = floor_hour(latest - timedelta(hours=rollup_settings()['LOOKBACK_HOURS']))
+        else:
+            first = first_activity()
+            if first is None:
+                return 0, 0
+            start = floor_day(first)
+
+    hours_end = floor_hour(end) + timedelta(hours=1)
+    days_start = floor_day(start)
+    days_end = floor_day(floor_day(end) + timedelta(days=1, hours=12))
+    throughput, stages = _aggregate_hours(start, hours_end)
+    hours = list(_hours(start, hours_end))
+
+    with transaction.atomic():
+        ThroughputRollup.objects.filter(grain='hour', bucket_start__gte=start, bucket_start__lt=hours_end).delete()
+        StageRollup.objects.filter(grain='hour', bucket_start__gte=start, bucket_start__lt=hours_end).delete()
+        ThroughputRollup.objects.bulk_create([
+            ThroughputRollup(grain='hour', bucket_start=hour, **throughput.get(hour, {}))
+            for hour in hours
+        ], batch_size=1000)
+        StageRollup.objects.bulk_create([
+            StageRollup(grain='hour', bucket_start=row.pop('bucket'), **row) for row in stages
+        ], batch_size=1000)
+        _rebuild_days(days_start, days_end)
+        for model in (ThroughputRollup, StageRollup):
+            transaction.on_commit(lambda model=model: bump_generation(model))
+    return len(hours), len(list(_days(days_start, days_end)))
+
+
+def is_current(moment):
+    """True when the hourly rollups have been refreshed at or after ``moment``."""
+    latest = latest_hour()
+    return latest is not None and latest >= floor_hour(moment)
+
+
+def period_totals(periods):
+    """
+    Sum daily rollups per period.
+
+    Args:
+        periods: Dict of name to (start, end), half-open and aligned to days
+
+    Returns:
+        Dict of name to {vehicles_in, vehicles_out, turnaround_sum, turnaround_count}
+    """
+    aggregates = {}
+    for name, (start, end) in periods.items():
+        in_period = Q(bucket_start__gte=start, bucket_start__lt=end)
+        for field in THROUGHPUT_FIELDS:
+            aggregates[f'{name}__{field}'] = Coalesce(Sum(field, filter=in_period), 0)
+    values = ThroughputRollup.objects.filter(grain='day').aggregate(**aggregates)
+    return {
+        name: {field: values[f'{name}__{field}'] for field in THROUGHPUT_FIELDS}
+        for name in periods
+    }
@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from common.fast_serializers import compile_serializer
 from .models import (
     KPIMetrics, Vehicle, VehicleStage, ParkingCell,
-    VehicleEntry, SystemAlert, TurnaroundTimeSparkline, LoadingGate
+    VehicleEntry, SystemAlert, TurnaroundTimeSparkline, LoadingGate, StageEvent,
+    ThroughputRollup, StageRollup
 )
+from .sparkline import buffer as sparkline_buffer
 
 
 class VehicleStageSerializer(serializers.ModelSerializer):
@@ -23,9 +26,13 @@ class VehicleSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'reg_no', 'rfid_no', 'tare_weight', 'weight_after_loading',
             'progress', 'turnaround_time', 'timestamp', 'stages',
+            'current_stage', 'current_state', 'completed_at',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'timestamp']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'timestamp',
+            'current_stage', 'current_state', 'completed_at'
+        ]
 
 
 class VehicleBasicSerializer(serializers.ModelSerializer):
@@ -51,7 +58,7 @@ class ParkingCellSerializer(serializers.ModelSerializer):
         model = ParkingCell
         fields = [
             'id', 'area', 'label', 'status', 'vehicle', 'vehicle_reg_no',
-            'created_at', 'updated_at'
+            'x', 'y', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -76,9 +83,10 @@ class SystemAlertSerializer(serializers.ModelSerializer):
         model = SystemAlert
         fields = [
             'id', 'level', 'message', 'vehicle', 'vehicle_reg_no',
-            'is_resolved', 'created_at', 'resolved_at'
+            'is_resolved', 'created_at', 'resolved_at', 'fingerprint',
+            'occurrences', 'last_seen_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'fingerprint', 'occurrences', 'last_seen_at']
 
 
 class LoadingGateSerializer(serializers.ModelSerializer):
@@ -90,7 +98,7 @@ class LoadingGateSerializer(serializers.ModelSerializer):
         model = LoadingGate
         fields = [
             'id', 'name', 'area', 'status', 'current_entry',
-            'current_entry_vehicle_reg_no', 'created_at', 'updated_at'
+            'current_entry_vehicle_reg_no', 'x', 'y', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -140,7 +148,6 @@ class KPIMetricsDetailSerializer(serializers.Serializer):
         }
     
     def get_turnaround(self, obj):
-        sparkline = TurnaroundTimeSparkline.objects.all().order_by('timestamp')[:20]
         return {
             'avgDay': obj.turnaround_avg_day,
             'avgCum': obj.turnaround_avg_cum,
@@ -150,7 +157,7 @@ class KPIMetricsDetailSerializer(serializers.Serializer):
                 'percentage': obj.turnaround_trend_percentage
             },
             'performanceColor': obj.turnaround_performance_color,
-            'sparkline': [{'v': s.value} for s in sparkline]
+            'sparkline': [{'v': value} for value in sparkline_buffer.values()]
         }
     
     def get_vehicles(self, obj):
@@ -176,3 +183,69 @@ class KPIMetricsDetailSerializer(serializers.Serializer):
                 'percentage': obj.dispatch_trend_percentage
             }
         }
+
+
+class StageTransitionSerializer(serializers.Serializer):
+    """A single stage transition event from an RFID reader or weighbridge"""
+    rfid_no = serializers.CharField(required=False)
+    reg_no = serializers.CharField(required=False)
+    stage = serializers.ChoiceField(choices=VehicleStage.STAGE_CHOICES)
+    state = serializers.ChoiceField(choices=VehicleStage.STATE_CHOICES)
+    timestamp = serializers.DateTimeField(required=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('rfid_no') and not attrs.get('reg_no'):
+            raise serializers.ValidationError('rfid_no or reg_no required')
+        return attrs
+
+
+class StageEventInputSerializer(StageTransitionSerializer):
+    """A stage transition event destined for the append-only event log"""
+    idempotency_key = serializers.CharField(max_length=100)
+    source = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class StageEventSerializer(serializers.ModelSerializer):
+    vehicle_reg_no = serializers.CharField(source='vehicle.reg_no', read_only=True)
+    
+    class Meta:
+        model = StageEvent
+        fields = [
+            'id', 'idempotency_key', 'vehicle', 'vehicle_reg_no', 'stage', 'state',
+            'occurred_at', 'source', 'recorded_at'
+        ]
+        read_only_fields = fields
+
+
+class ThroughputRollupSerializer(serializers.ModelSerializer):
+    turnaround_avg = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ThroughputRollup
+        fields = [
+            'grain', 'bucket_start', 'vehicles_in', 'vehicles_out', 'turnaround_sum',
+            'turnaround_count', 'turnaround_avg', 'turnaround_min', 'turnaround_max'
+        ]
+        read_only_fields = fields
+    
+    def get_turnaround_avg(self, obj):
+        if not obj.turnaround_count:
+            return None
+        return round(obj.turnaround_sum / obj.turnaround_count, 1)
+
+
+class StageRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StageRollup
+        fields = [
+            'grain', 'bucket_start', 'stage', 'completed',
+            'time_taken_sum', 'wait_time_sum', 'standard_time_sum'
+        ]
+        read_only_fields = fields
+
+
+# Read-only fast paths for hot lists; output is identical to
+# Serializer(many=True).data (see common.fast_serializers)
+serialize_vehicles = compile_serializer(VehicleSerializer)
+serialize_vehicle_entries = compile_serializer(VehicleEntrySerializer)
+serialize_loading_gates = compile_serializer(LoadingGateSerializer)
@@ -0,0 +1,50 @@
+"""
+Signal wiring for TTMS models.
+
+Receivers are connected from TtmsConfig.ready() so that derived state
+(ETag generations, KPI snapshot, caches, live event stream) follows model writes.
+"""
+
+from django.db.models.signals import post_save, post_delete
+
+from common.conditional import bump_generation_receiver
+
+from . import kpi, sparkline, stream
+from .models import (
+    KPIMetrics, Vehicle, VehicleStage, VehicleEntry,
+    TurnaroundTimeSparkline, LoadingGate, SystemAlert, ParkingCell, StageEvent
+)
+
+
+KPI_SOURCE_MODELS = (Vehicle, VehicleStage, VehicleEntry)
+
+VERSIONED_MODELS = (
+    KPIMetrics, Vehicle, VehicleStage, VehicleEntry,
+    TurnaroundTimeSparkline, LoadingGate, SystemAlert, ParkingCell, StageEvent,
+)
+
+
+def connect_signals():
+    """Connect all TTMS signal receivers."""
+    for model in VERSIONED_MODELS:
+        post_save.connect(bump_generation_receiver, sender=model, dispatch_uid=f'generation_save_{model.__name__}')
+        post_delete.connect(bump_generation_receiver, sender=model, dispatch_uid=f'generation_delete_{model.__name__}')
+
+    for model in KPI_SOURCE_MODELS:
+        post_save.connect(kpi.mark_dirty, sender=model, dispatch_uid=f'kpi_dirty_save_{model.__name__}')
+        post_delete.connect(kpi.mark_dirty, sender=model, dispatch_uid=f'kpi_dirty_delete_{model.__name__}')
+
+    post_save.connect(
+        sparkline.on_sparkline_saved, sender=TurnaroundTimeSparkline, dispatch_uid='sparkline_buffer_save'
+    )
+    post_delete.connect(
+        sparkline.on_sparkline_deleted, sender=TurnaroundTimeSparkline, dispatch_uid='sparkline_buffer_delete'
+    )
+
+    post_save.connect(stream.on_kpi_saved, sender=KPIMetrics, dispatch_uid='stream_kpi_save')
+    post_save.connect(stream.on_gate_saved, sender=LoadingGate, dispatch_uid='stream_gate_save')
+    post_delete.connect(stream.on_gate_deleted, sender=LoadingGate, dispatch_uid='stream_gate_delete')
+    post_save.connect(stream.on_alert_saved, sender=SystemAlert, dispatch_uid='stream_alert_save')
+    post_delete.connect(stream.on_alert_deleted, sender=SystemAlert, dispatch_uid='stream_alert_delete')
+    post_save.connect(stream.on_stage_saved, sender=VehicleStage, dispatch_uid='stream_stage_save')
+    post_delete.connect(stream.on_stage_deleted, sender=VehicleStage, dispatch_uid='stream_stage_delete')
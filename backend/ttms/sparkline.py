@@ -0,0 +1,116 @@
+"""
+In-process ring buffer of the most recent turnaround sparkline values.
+
+The KPI payload reads the buffer instead of querying TurnaroundTimeSparkline.
+The buffer is warmed when the server starts (TtmsConfig.warm_up) and saved
+rows are appended by a signal receiver once their transaction commits.
+
+Other workers' writes reach the buffer in one of two ways. With a cache shared
+by every process (SHARED_CACHE), each committed write bumps a version counter
+there and a worker whose local version no longer matches reloads once.
+Without one, the buffer is reloaded when it is older than
+SPARKLINE_BUFFER_TTL seconds, so points written by another process show up
+within that time.
+"""
+
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.cache import cache_is_shared
+from .models import TurnaroundTimeSparkline
+
+
+VERSION_KEY = 'ttms:sparkline:version'
+
+
+class SparklineBuffer:
+    """Fixed-size buffer of sparkline values, oldest first."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._values = deque(maxlen=size)
+        # Shared cache version the values match, and when they were loaded
+        self._version = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        return cache.get_or_set(VERSION_KEY, 0, timeout=None)
+
+    def _bump_shared_version(self):
+        try:
+            return cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, 0, timeout=None)
+            return cache.incr(VERSION_KEY)
+
+    def _load(self, version=None):
+        rows = (
+            TurnaroundTimeSparkline.objects.order_by('-timestamp', '-id')
+            .values_list('value', flat=True)[:self.size]
+        )
+        self._values = deque(reversed(list(rows)), maxlen=self.size)
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def values(self):
+        """Return buffered values, oldest first, reloading if another worker wrote."""
+        if cache_is_shared():
+            version = self._shared_version()
+            with self._lock:
+                if version != self._version:
+                    self._load(version)
+                return list(self._values)
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._load()
+            return list(self._values)
+
+    def append(self, value):
+        """Append a newly saved value and publish the change to other workers."""
+        if not cache_is_shared():
+            with self._lock:
+                if self._loaded_at is not None:
+                    self._values.append(value)
+            return
+        version = self._bump_shared_version()
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._values.append(value)
+                self._version = version
+            else:
+                # Missed a write from another worker (or never warmed).
+                self._load(version)
+
+    def invalidate(self):
+        """Force every worker, including this one, to reload on next read."""
+        if cache_is_shared():
+            self._bump_shared_version()
+        with self._lock:
+            self._version = self._loaded_at = None
+
+
+buffer = SparklineBuffer(
+    getattr(settings, 'SPARKLINE_BUFFER_SIZE', 20),
+    getattr(settings, 'SPARKLINE_BUFFER_TTL', 30),
+)
+
+
+def on_sparkline_saved(sender, instance, created, **kwargs):
+    """Signal receiver: append new sparkline points to the buffer after commit."""
+    if created:
+        value = instance.value
+        transaction.on_commit(lambda: buffer.append(value))
+    else:
+        transaction.on_commit(buffer.invalidate)
+
+
+def on_sparkline_deleted(sender, instance, **kwargs):
+    """Signal receiver: drop the buffer after a sparkline point is removed."""
+    transaction.on_commit(buffer.invalidate)
@@ -0,0 +1,127 @@
+"""
+Vehicle stage helpers.
+
+Keeps the denormalized Vehicle.current_stage / current_state / completed_at
+columns in step with the vehicle's VehicleStage rows, so active and completed
+vehicle lists are a single indexed scan on Vehicle, and applies stage
+transitions to VehicleStage rows for the event log projector (ttms/events.py).
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from common.conditional import bump_generation
+from .models import Vehicle, VehicleStage, STAGE_CHOICES
+
+
+STAGE_ORDER = [stage for stage, _ in STAGE_CHOICES]
+
+
+def derive_current_stage(stages, completed_at=None):
+    """
+    Work out the current stage of a vehicle from its stage rows.
+
+    Args:
+        stages: Iterable of (stage, state, finished_at) tuples
+        completed_at: Completion time already recorded for the vehicle
+
+    Returns:
+        Tuple of (current_stage, current_state, completed_at)
+    """
+    by_stage = {stage: (state, finished_at) for stage, state, finished_at in stages}
+    if not by_stage:
+        return '', '', None
+
+    ordered = [stage for stage in STAGE_ORDER if stage in by_stage]
+    for stage in ordered:
+        state = by_stage[stage][0]
+        if state != 'completed':
+            return stage, state, None
+
+    finished = [finished_at for _, finished_at in by_stage.values() if finished_at]
+    return ordered[-1], 'completed', max(finished) if finished else (completed_at or timezone.now())
+
+
+def sync_current_stages(vehicle_ids):
+    """
+    Recompute the current stage columns for the given vehicles.
+
+    Locks the vehicle rows, reads their stages in one query and writes back
+    only the vehicles whose values changed.
+
+    Args:
+        vehicle_ids: Iterable of Vehicle primary keys
+
+    Returns:
+        Number of vehicles updated
+    """
+    vehicle_ids = set(vehicle_ids)
+    if not vehicle_ids:
+        return 0
+
+    with transaction.atomic():
+        vehicles = list(
+            Vehicle.objects.select_for_update()
+            .filter(pk__in=vehicle_ids)
+            .order_by('pk')
+            .only('id', 'current_stage', 'current_state', 'completed_at')
+        )
+        stages = {}
+        for vehicle_id, stage, state, finished_at in VehicleStage.objects.filter(
+            vehicle_id__in=vehicle_ids
+        ).values_list('vehicle_id', 'stage', 'state', 'finished_at'):
+            stages.setdefault(vehicle_id, []).append((stage, state, finished_at))
+
+        now = timezone.now()
+        changed = []
+        for vehicle in vehicles:
+            current = derive_current_stage(stages.get(vehicle.pk, []), vehicle.completed_at)
+            if current != (vehicle.current_stage, vehicle.current_state, vehicle.completed_at):
+                vehicle.current_stage, vehicle.current_state, vehicle.completed_at = current
+                vehicle.updated_at = now
+                changed.append(vehicle)
+
+        if changed:
+            Vehicle.objects.bulk_update(
+                changed, ['current_stage', 'current_state', 'completed_at', 'updated_at']
+            )
+            transaction.on_commit(lambda: bump_generation(Vehicle))
+    return len(changed)
+
+
+def apply_stage_transition(stage, state, timestamp):
+    """
+    Apply a state change to a VehicleStage instance in memory.
+
+    Sets started_at when a stage becomes active, finished_at and time_taken
+    when it completes. A completed stage that becomes active or pending again
+    is the vehicle's next visit, so the previous visit's timing is cleared.
+    """
+    if stage.state == 'completed' and state != 'completed':
+        stage.started_at = stage.finished_at = None
+        stage.time_taken = 0
+    stage.state = state
+    if state == 'active':
+        stage.started_at = stage.started_at or timestamp
+        stage.finished_at = None
+    elif state == 'completed':
+        stage.started_at = stage.started_at or timestamp
+        stage.finished_at = timestamp
+        stage.time_taken = max(0, int((timestamp - stage.started_at).total_seconds() // 60))
+
+
+def notify_bulk_stage_write(stages):
+    """
+    Propagate a bulk stage write that bypassed model signals.
+
+    Bumps the ETag generation, marks the KPI snapshot dirty and publishes
+    vehicle-stage stream events (one refetch event for large writes), all
+    after the transaction commits.
+    """
+    from . import kpi, stream
+
+    if not stages:
+        return
+    transaction.on_commit(lambda: bump_generation(VehicleStage))
+    transaction.on_commit(kpi.mark_dirty)
+    stream.on_stages_written(stages)
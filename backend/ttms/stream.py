@@ -0,0 +1,372 @@
+"""
+Server-Sent Events push channel for TTMS.
+
+Model save/delete signals publish typed change events (kpi, gate, alert,
+vehicle-stage) after commit. Each event is encoded once and handed to every
+open stream, so connected dashboards no longer need to poll. The stream view
+is async and must be served through ASGI (core.asgi, daphne).
+
+Events are collected per transaction and published together once it
+commits, so a bulk write costs one round trip rather than one per row. On
+PostgreSQL they cross processes with NOTIFY on the ``ttms_stream`` channel:
+gunicorn workers and management command workers (alert rules, rollups,
+replays) publish, and every process holding open streams runs one LISTEN
+thread that relays the notifications into its in-process hub. Other backends
+deliver to the publishing process only, which suits a single development
+server.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .models import VehicleStage
+from .serializers import (
+    KPIMetricsDetailSerializer, LoadingGateSerializer,
+    SystemAlertSerializer, VehicleStageSerializer
+)
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ('kpi', 'gate', 'alert', 'vehicle-stage')
+
+CHANNEL = 'ttms_stream'
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_LIMIT = 7900
+
+# Bulk stage writes above this size send one refetch event instead of a record per stage
+BULK_EVENT_LIMIT = 20
+
+
+def _stream_settings():
+    config = getattr(settings, 'SSE_STREAM', {})
+    return (
+        config.get('KEEPALIVE', 15),
+        config.get('MAX_DURATION', 300),
+        config.get('QUEUE_SIZE', 100),
+    )
+
+
+def _encode(data):
+    return json.dumps(data, cls=JSONEncoder, separators=(',', ':'))
+
+
+def _offer(queue, item):
+    """Put an item on a subscriber queue, dropping the oldest one if full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+class EventHub:
+    """Fan-out of encoded SSE messages to subscriber queues."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, queue_size):
+        """Register a queue on the running event loop and return the subscription."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=queue_size))
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_type, data):
+        """Encode an event once and deliver it to every subscriber. Thread-safe."""
+        if self.subscriber_count:
+            self.deliver(event_type, _encode(data))
+
+    def deliver(self, event_type, payload):
+        """Deliver an already JSON-encoded event to every subscriber. Thread-safe."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        message = f'id: {next(self._ids)}\nevent: {event_type}\ndata: {payload}\n\n'.encode()
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, (event_type, message))
+            except RuntimeError:
+                # Loop already closed; the stream's finally block will clean up.
+                pass
+
+
+class NotifyListener:
+    """
+    LISTEN thread relaying events published by any process into a hub.
+
+    Started by the first subscriber of a process, so only processes serving
+    streams hold the extra connection. The connection is opened outside
+    Django's connection handling (and the pool), since it lives as long as
+    the process; it is reopened after errors.
+    """
+
+    def __init__(self, hub, retry=5):
+        self.hub = hub
+        self.retry = retry
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ttms-stream-listen', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Event stream LISTEN connection failed; retrying in %ss', self.retry)
+            time.sleep(self.retry)
+
+    def _listen(self):
+        database = connections['default']
+        raw = database.Database.connect(**database.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if not select.select([raw], [], [], 60)[0]:
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    # One "<type> <json>" line per event
+                    for line in raw.notifies.pop(0).payload.split('\n'):
+                        event_type, _, payload = line.partition(' ')
+                        self.hub.deliver(event_type, payload)
+        finally:
+            raw.close()
+
+
+hub = EventHub()
+listener = NotifyListener(hub)
+
+
+def _uses_notify():
+    return connections['default'].vendor == 'postgresql'
+
+
+def _notify_line(event_type, data):
+    line = f'{event_type} {_encode(data)}'
+    if len(line.encode()) > NOTIFY_LIMIT:
+        # Too large for NOTIFY; subscribers refetch the resource by id
+        line = f'{event_type} {_encode({"id": data.get("id"), "truncated": True})}'
+    return line
+
+
+def _notify(lines):
+    """Send lines in as few NOTIFY payloads as fit, in a single statement."""
+    payloads, current = [], []
+    size = 0
+    for line in lines:
+        length = len(line.encode()) + 1
+        if current and size + length > NOTIFY_LIMIT:
+            payloads.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += length
+    payloads.append('\n'.join(current))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT ' + ', '.join(['pg_notify(%s, %s)'] * len(payloads)),
+                [value for payload in payloads for value in (CHANNEL, payload)]
+            )
+    except DatabaseError:
+        # The writes are committed; lost events must not fail the request
+        logger.exception('Could not publish %s stream events', len(lines))
+
+
+class Outbox:
+    """
+    Events of one transaction, published once it commits.
+
+    A later change to the same record replaces the earlier one, and data is
+    only serialized when the events are sent. Without NOTIFY the work is
+    skipped when this process has no listeners; with it, listeners may be in
+    any process, so every change is published.
+    """
+
+    def __init__(self):
+        self.events = {}
+
+    def add(self, event_type, key, build):
+        self.events.pop((event_type, key), None)
+        self.events[(event_type, key)] = build
+
+    def __call__(self):
+        if getattr(_local, 'outbox', None) is self:
+            _local.outbox = None
+        if _uses_notify():
+            _notify([_notify_line(event_type, build()) for (event_type, _), build in self.events.items()])
+        elif hub.subscriber_count:
+            for (event_type, _), build in self.events.items():
+                hub.publish(event_type, build())
+
+
+_local = threading.local()
+
+
+def _publish_on_commit(event_type, key, build):
+    """
+    Queue an event for the outbox of the current transaction.
+
+    The outbox is dropped with its transaction on rollback. Events queued in
+    a savepoint that is rolled back while the transaction goes on to commit
+    are still sent; they describe the record as it was saved.
+    """
+    outbox = getattr(_local, 'outbox', None)
+    # Its commit hook is gone once the transaction committed or rolled back
+    if outbox is None or not any(hook[1] is outbox for hook in connection.run_on_commit):
+        outbox = _local.outbox = Outbox()
+        outbox.add(event_type, key, build)
+        # Runs at once in autocommit mode
+        transaction.on_commit(outbox)
+    else:
+        outbox.add(event_type, key, build)
+
+
+def _deleted(instance):
+    return {'id': instance.pk, 'deleted': True}
+
+
+def on_kpi_saved(sender, instance, **kwargs):
+    _publish_on_commit('kpi', instance.pk, lambda: KPIMetricsDetailSerializer(instance).data)
+
+
+def on_gate_saved(sender, instance, **kwargs):
+    _publish_on_commit('gate', instance.pk, lambda: LoadingGateSerializer(instance).data)
+
+
+def on_gate_deleted(sender, instance, **kwargs):
+    _publish_on_commit('gate', instance.pk, lambda: _deleted(instance))
+
+
+def on_alert_saved(sender, instance, **kwargs):
+    _publish_on_commit('alert', instance.pk, lambda: SystemAlertSerializer(instance).data)
+
+
+def on_alert_deleted(sender, instance, **kwargs):
+    _publish_on_commit('alert', instance.pk, lambda: _deleted(instance))
+
+
+def on_stage_saved(sender, instance, **kwargs):
+    _publish_on_commit(
+        'vehicle-stage', instance.pk,
+        lambda: {**VehicleStageSerializer(instance).data, 'vehicle': instance.vehicle_id}
+    )
+
+
+def on_stage_deleted(sender, instance, **kwargs):
+    _publish_on_commit('vehicle-stage', instance.pk, lambda: {**_deleted(instance), 'vehicle': instance.vehicle_id})
+
+
+def on_stages_written(stages):
+    """
+    Publish a bulk stage write: a record per stage for small writes, otherwise
+    one refetch event per chunk of affected vehicles (no serialization).
+    """
+    if len(stages) <= BULK_EVENT_LIMIT:
+        for stage in stages:
+            on_stage_saved(VehicleStage, stage)
+        return
+    vehicle_ids = sorted({stage.vehicle_id for stage in stages})
+    # About 8 bytes per id keeps each event well inside NOTIFY_LIMIT
+    chunk = NOTIFY_LIMIT // 10
+    for start in range(0, len(vehicle_ids), chunk):
+        ids = vehicle_ids[start:start + chunk]
+        _publish_on_commit('vehicle-stage', ('refetch', ids[0]), lambda ids=ids: {'vehicles': ids, 'refetch': True})
+
+
+def _authenticate(request):
+    """
+    Resolve the user from a Bearer header or a ?token= query parameter.
+
+    EventSource cannot send custom headers, so browsers pass the access token
+    in the query string.
+    """
+    auth = JWTAuthentication()
+    try:
+        result = auth.authenticate(request)
+        if result is not None:
+            return result[0]
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        pass
+    return None
+
+
+async def _event_iterator(event_types):
+    keepalive, max_duration, queue_size = _stream_settings()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_duration
+    if _uses_notify():
+        listener.ensure_started()
+    subscription = hub.subscribe(queue_size)
+    queue = subscription[1]
+    try:
+        yield b'retry: 3000\n\n'
+        # End the stream periodically; EventSource reconnects on its own, and
+        # this bounds the lifetime of streams whose client went away silently.
+        while loop.time() < deadline:
+            try:
+                event_type, message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if event_type in event_types:
+                yield message
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def event_stream(request):
+    """
+    GET /api/ttms/stream/?types=kpi,alert&token=<access>
+
+    Streams change events as text/event-stream. ``types`` limits the stream
+    to a comma-separated subset of kpi, gate, alert and vehicle-stage.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await sync_to_async(_authenticate)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    requested = request.GET.get('types')
+    event_types = set(requested.split(',')) & set(EVENT_TYPES) if requested else set(EVENT_TYPES)
+
+    response = StreamingHttpResponse(_event_iterator(event_types), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
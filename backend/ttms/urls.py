@@ -3,8 +3,10 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     KPIMetricsViewSet, VehicleViewSet, VehicleStageViewSet,
     ParkingCellViewSet, VehicleEntryViewSet, SystemAlertViewSet,
-    TurnaroundTimeSparklineViewSet, LoadingGateViewSet
+    TurnaroundTimeSparklineViewSet, LoadingGateViewSet, StageEventViewSet,
+    RollupViewSet
 )
+from .stream import event_stream
 
 router = DefaultRouter()
 router.register(r'kpi', KPIMetricsViewSet, basename='kpi')
@@ -15,9 +17,12 @@ router.register(r'vehicle-entries', VehicleEntryViewSet, basename='vehicle-entry
 router.register(r'alerts', SystemAlertViewSet, basename='alert')
 router.register(r'sparkline', TurnaroundTimeSparklineViewSet, basename='sparkline')
 router.register(r'loading-gates', LoadingGateViewSet, basename='loading-gate')
+router.register(r'stage-events', StageEventViewSet, basename='stage-event')
+router.register(r'rollups', RollupViewSet, basename='rollup')
 
 app_name = 'ttms'
 
 urlpatterns = [
+    path('stream/', event_stream, name='stream'),
     path('', include(router.urls)),
 ]
@@ -1,36 +1,101 @@
-from rest_framework import viewsets, status
+import time
+
+from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Q
+from common.cache import cache_response
+from common.conditional import ConditionalGetMixin
+from common.constants import CACHE_TIMEOUTS
+from common.export import ExportMixin
+from common.fast_serializers import FastListMixin
+from common.pagination import TimeSeriesPagination
+from common.utils import get_date_range_from_params
 from .models import (
     KPIMetrics, Vehicle, VehicleStage, ParkingCell,
-    VehicleEntry, SystemAlert, TurnaroundTimeSparkline, LoadingGate
+    VehicleEntry, SystemAlert, TurnaroundTimeSparkline, LoadingGate, StageEvent,
+    ThroughputRollup, StageRollup, ROLLUP_GRAIN_CHOICES
 )
 from .serializers import (
     KPIMetricsSerializer, KPIMetricsDetailSerializer,
     VehicleSerializer, VehicleCreateUpdateSerializer,
     VehicleStageSerializer, ParkingCellSerializer,
     VehicleEntrySerializer, SystemAlertSerializer,
-    TurnaroundTimeSparklineSerializer, LoadingGateSerializer
+    TurnaroundTimeSparklineSerializer, LoadingGateSerializer,
+    StageTransitionSerializer, StageEventInputSerializer, StageEventSerializer,
+    ThroughputRollupSerializer, StageRollupSerializer,
+    serialize_vehicles, serialize_vehicle_entries
 )
+from . import gates, kpi, rollups
+from .alerts import raise_alert, resolve_open_alerts
+from .analytics import stage_time_report
+from .eta import predict_active
+from .events import apply_stage_events, ingest_stage_events, save_stage
+from .occupancy import occupancy_snapshot
+from .parking import allocate_cell, reserve_cell
+
+
+STAGE_EVENTS_MAX_BATCH = 1000
+
+
+def validate_event_batch(request, serializer_class):
+    """
+    Validate a batch of reader events item by item.
+    
+    Returns:
+        (valid, positions, results, error_response); error_response is set when
+        the batch as a whole is unusable
+    """
+    events = request.data.get('events') if isinstance(request.data, dict) else request.data
+    if not isinstance(events, list) or not events:
+        return None, None, None, Response({'error': 'events list required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(events) > STAGE_EVENTS_MAX_BATCH:
+        return None, None, None, Response(
+            {'error': f'At most {STAGE_EVENTS_MAX_BATCH} events per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    results = [None] * len(events)
+    valid, positions = [], []
+    for index, event in enumerate(events):
+        serializer = serializer_class(data=event)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+            positions.append(index)
+        else:
+            results[index] = {'index': index, 'status': 'error', 'error': serializer.errors}
+    return valid, positions, results, None
 
 
-class KPIMetricsViewSet(viewsets.ModelViewSet):
+class KPIMetricsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for KPI metrics
     """
     queryset = KPIMetrics.objects.all()
     serializer_class = KPIMetricsSerializer
+    etag_models = (KPIMetrics, TurnaroundTimeSparkline)
+    
+    def get_etag_parts(self, request):
+        # Refresh the snapshot first so the ETag reflects what latest returns
+        if self.action == 'latest':
+            self.snapshot = kpi.get_latest_snapshot()
+        return super().get_etag_parts(request)
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def latest(self, request):
-        """Get the latest KPI metrics"""
-        latest_kpi = KPIMetrics.objects.order_by('-updated_at').first()
-        if latest_kpi:
-            serializer = KPIMetricsDetailSerializer(latest_kpi)
-            return Response(serializer.data)
-        return Response({'error': 'No KPI data available'}, status=status.HTTP_404_NOT_FOUND)
+        """Get the latest KPI metrics, served from the computed snapshot"""
+        # Set while computing the ETag; without a shared cache there is none
+        snapshot = getattr(self, 'snapshot', None) or kpi.get_latest_snapshot()
+        serializer = KPIMetricsDetailSerializer(snapshot)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def refresh(self, request):
+        """Force recomputation of the KPI snapshot"""
+        serializer = KPIMetricsSerializer(kpi.refresh_snapshot())
+        return Response(serializer.data)
     
     @action(detail=False, methods=['post'])
     def create_or_update(self, request):
@@ -48,7 +113,7 @@ class KPIMetricsViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(ConditionalGetMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint for vehicles
     Supports filtering by reg_no and rfid_no
@@ -58,29 +123,60 @@ class VehicleViewSet(viewsets.ModelViewSet):
     search_fields = ['reg_no', 'rfid_no']
     ordering_fields = ['reg_no', 'turnaround_time', 'progress', 'timestamp']
     ordering = ['-timestamp']
+    etag_models = (Vehicle, VehicleStage)
+    fast_serializer_class = VehicleSerializer
+    export_name = 'vehicles'
+    export_date_field = 'created_at'
+    export_ordering = ('created_at', 'id')
+    export_columns = [
+        ('id', 'id'), ('reg_no', 'reg_no'), ('rfid_no', 'rfid_no'),
+        ('tare_weight', 'tare_weight'), ('weight_after_loading', 'weight_after_loading'),
+        ('progress', 'progress'), ('turnaround_time', 'turnaround_time'),
+        ('current_stage', 'current_stage'), ('current_state', 'current_state'),
+        ('completed_at', 'completed_at'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return VehicleCreateUpdateSerializer
         return VehicleSerializer
     
+    def get_etag_models(self):
+        # ETA attributes vehicles to areas through gate entries
+        if self.action == 'eta':
+            return self.etag_models + (VehicleEntry,)
+        return super().get_etag_models()
+    
+    def get_etag_parts(self, request):
+        parts = super().get_etag_parts(request)
+        if self.action == 'eta':
+            # Predictions move with the clock
+            parts.append(int(time.time() // 60))
+        return parts
+    
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def active(self, request):
         """Get vehicles currently in progress"""
         vehicles = Vehicle.objects.filter(
-            stages__state__in=['active', 'pending']
-        ).distinct().prefetch_related('stages')
-        serializer = VehicleSerializer(vehicles, many=True)
-        return Response(serializer.data)
+            current_state__in=['active', 'pending']
+        ).prefetch_related('stages')
+        return Response(serialize_vehicles(vehicles))
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def completed(self, request):
-        """Get vehicles with completed turnaround"""
+        """Get vehicles whose every stage is completed"""
         vehicles = Vehicle.objects.filter(
-            stages__state='completed'
-        ).distinct().prefetch_related('stages')
-        serializer = VehicleSerializer(vehicles, many=True)
-        return Response(serializer.data)
+            current_state='completed'
+        ).prefetch_related('stages')
+        return Response(serialize_vehicles(vehicles))
+    
+    @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
+    def eta(self, request):
+        """Predicted exit time of every vehicle in progress"""
+        return Response(predict_active())
     
     @action(detail=True, methods=['post'])
     def update_stage(self, request, pk=None):
@@ -93,7 +189,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
             stage = VehicleStage.objects.get(vehicle=vehicle, stage=stage_name)
             serializer = VehicleStageSerializer(stage, data=stage_data, partial=True)
             if serializer.is_valid():
-                serializer.save()
+                save_stage(serializer)
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except VehicleStage.DoesNotExist:
@@ -101,9 +197,32 @@ class VehicleViewSet(viewsets.ModelViewSet):
                 {'error': f'Stage {stage_name} not found for this vehicle'},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(detail=False, methods=['post'])
+    def stage_events(self, request):
+        """
+        Apply a batch of stage transition events (RFID / weighbridge readers)
+        
+        Body: a list (or {"events": [...]}) of
+        {"rfid_no" or "reg_no", "stage", "state", "timestamp"}
+        """
+        valid, positions, results, error = validate_event_batch(request, StageTransitionSerializer)
+        if error:
+            return error
+        
+        for position, result in zip(positions, apply_stage_events(valid) if valid else []):
+            result['index'] = position
+            results[position] = result
+        
+        applied = sum(1 for result in results if result['status'] == 'applied')
+        return Response({
+            'applied': applied,
+            'failed': len(results) - applied,
+            'results': results,
+        })
 
 
-class VehicleStageViewSet(viewsets.ModelViewSet):
+class VehicleStageViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint for vehicle stages
     """
@@ -111,8 +230,46 @@ class VehicleStageViewSet(viewsets.ModelViewSet):
     serializer_class = VehicleStageSerializer
     filter_backends = [SearchFilter]
     search_fields = ['vehicle__reg_no', 'stage']
+    etag_models = (VehicleStage, Vehicle)
+    export_name = 'vehicle-stages'
+    export_date_field = 'started_at'
+    export_ordering = ('started_at', 'id')
+    export_columns = [
+        ('id', 'id'), ('vehicle', 'vehicle_id'), ('vehicle_reg_no', 'vehicle__reg_no'),
+        ('stage', 'stage'), ('state', 'state'), ('wait_time', 'wait_time'),
+        ('standard_time', 'standard_time'), ('started_at', 'started_at'),
+        ('finished_at', 'finished_at'), ('time_taken', 'time_taken'),
+    ]
+    
+    def perform_update(self, serializer):
+        # State changes are recorded in the stage event log
+        save_stage(serializer)
+    
+    def get_etag_models(self):
+        # Analytics attributes stages to areas through gate entries
+        if self.action == 'analytics':
+            return self.etag_models + (VehicleEntry,)
+        return super().get_etag_models()
+    
+    def get_etag_parts(self, request):
+        parts = super().get_etag_parts(request)
+        if self.action == 'analytics':
+            # Relative ranges (today, days=N) move with the clock
+            parts.append(int(time.time() // CACHE_TIMEOUTS['SHORT']))
+        return parts
+    
+    @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
+    def analytics(self, request):
+        """Stage time statistics per stage, area and hour for a date range"""
+        try:
+            start, end = get_date_range_from_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stage_time_report(start, end))
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def by_vehicle(self, request):
         """Get all stages for a specific vehicle"""
         vehicle_id = request.query_params.get('vehicle_id')
@@ -127,36 +284,50 @@ class VehicleStageViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ParkingCellViewSet(viewsets.ModelViewSet):
+class ParkingCellViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for parking cells
+    - Allocate a given cell or reserve the best free one (reserve)
+    - Compact occupancy snapshot for the parking map
     """
-    queryset = ParkingCell.objects.all()
+    queryset = ParkingCell.objects.select_related('vehicle')
     serializer_class = ParkingCellSerializer
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['area', 'label', 'status']
     ordering_fields = ['area', 'label', 'status']
     ordering = ['area', 'label']
+    etag_models = (ParkingCell, Vehicle)
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def by_area(self, request):
         """Get parking cells grouped by area"""
         area = request.query_params.get('area')
         if area:
-            cells = ParkingCell.objects.filter(area=area).order_by('label')
+            cells = ParkingCell.objects.select_related('vehicle').filter(area=area).order_by('label')
         else:
-            cells = ParkingCell.objects.all().order_by('area', 'label')
+            cells = ParkingCell.objects.select_related('vehicle').order_by('area', 'label')
         
         serializer = ParkingCellSerializer(cells, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def available(self, request):
         """Get available parking cells"""
-        cells = ParkingCell.objects.filter(status='available').order_by('area', 'label')
+        cells = ParkingCell.objects.select_related('vehicle').filter(status='available').order_by('area', 'label')
         serializer = ParkingCellSerializer(cells, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
+    def occupancy(self, request):
+        """Packed per-area occupancy snapshot for the parking map"""
+        return Response(occupancy_snapshot(
+            area=request.query_params.get('area') or None,
+            layout=request.query_params.get('layout') in ('1', 'true'),
+        ))
+    
     @action(detail=True, methods=['post'])
     def allocate(self, request, pk=None):
         """Allocate a parking cell to a vehicle"""
@@ -172,9 +343,7 @@ class ParkingCellViewSet(viewsets.ModelViewSet):
         try:
             from .models import Vehicle
             vehicle = Vehicle.objects.get(id=vehicle_id)
-            cell.vehicle = vehicle
-            cell.status = 'reserved'
-            cell.save()
+            cell = allocate_cell(cell.pk, vehicle)
             serializer = ParkingCellSerializer(cell)
             return Response(serializer.data)
         except Vehicle.DoesNotExist:
@@ -182,9 +351,35 @@ class ParkingCellViewSet(viewsets.ModelViewSet):
                 {'error': 'Vehicle not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+    
+    @action(detail=False, methods=['post'])
+    def reserve(self, request):
+        """Reserve the first free cell in an area, or the free cell nearest a gate"""
+        vehicle_id = request.data.get('vehicle_id')
+        if not vehicle_id:
+            return Response({'error': 'vehicle_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            vehicle = Vehicle.objects.get(id=vehicle_id)
+        except Vehicle.DoesNotExist:
+            return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        gate = None
+        gate_id = request.data.get('gate_id')
+        if gate_id:
+            try:
+                gate = LoadingGate.objects.get(id=gate_id)
+            except LoadingGate.DoesNotExist:
+                return Response({'error': 'LoadingGate not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        cell = reserve_cell(vehicle, area=request.data.get('area') or None, gate=gate)
+        if cell is None:
+            return Response({'error': 'No available parking cell'}, status=status.HTTP_409_CONFLICT)
+        return Response(ParkingCellSerializer(cell).data)
 
 
-class VehicleEntryViewSet(viewsets.ModelViewSet):
+class VehicleEntryViewSet(ConditionalGetMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint for vehicle entries
     """
@@ -194,8 +389,28 @@ class VehicleEntryViewSet(viewsets.ModelViewSet):
     search_fields = ['vehicle__reg_no', 'area', 'loading_gate']
     ordering_fields = ['gate_entry_time', 'created_at']
     ordering = ['-gate_entry_time']
+    pagination_class = TimeSeriesPagination
+    keyset_ordering = ('-gate_entry_time', '-id')
+    etag_models = (VehicleEntry, Vehicle)
+    fast_serializer_class = VehicleEntrySerializer
+    export_name = 'vehicle-entries'
+    export_date_field = 'gate_entry_time'
+    export_ordering = ('gate_entry_time', 'id')
+    export_columns = [
+        ('id', 'id'), ('vehicle', 'vehicle_id'), ('vehicle_reg_no', 'vehicle__reg_no'),
+        ('gate_entry_time', 'gate_entry_time'), ('area', 'area'), ('position', 'position'),
+        ('loading_gate', 'loading_gate'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    
+    def get_etag_parts(self, request):
+        parts = super().get_etag_parts(request)
+        if self.action == 'today':
+            from django.utils import timezone
+            parts.append(timezone.now().date().isoformat())
+        return parts
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def today(self, request):
         """Get today's vehicle entries"""
         from django.utils import timezone
@@ -208,13 +423,13 @@ class VehicleEntryViewSet(viewsets.ModelViewSet):
             gate_entry_time__gte=today,
             gate_entry_time__lt=tomorrow
         ).select_related('vehicle')
-        serializer = VehicleEntrySerializer(entries, many=True)
-        return Response(serializer.data)
+        return Response(serialize_vehicle_entries(entries))
 
 
-class SystemAlertViewSet(viewsets.ModelViewSet):
+class SystemAlertViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint for system alerts
+    - Repeats of an open alert are coalesced into it (occurrences, last_seen_at)
     """
     queryset = SystemAlert.objects.all().select_related('vehicle')
     serializer_class = SystemAlertSerializer
@@ -222,8 +437,37 @@ class SystemAlertViewSet(viewsets.ModelViewSet):
     search_fields = ['level', 'message', 'vehicle__reg_no']
     ordering_fields = ['level', 'created_at']
     ordering = ['-created_at']
+    pagination_class = TimeSeriesPagination
+    keyset_ordering = ('-created_at', '-id')
+    etag_models = (SystemAlert, Vehicle)
+    export_name = 'alerts'
+    export_date_field = 'created_at'
+    export_ordering = ('created_at', 'id')
+    export_columns = [
+        ('id', 'id'), ('level', 'level'), ('message', 'message'),
+        ('vehicle', 'vehicle_id'), ('vehicle_reg_no', 'vehicle__reg_no'),
+        ('is_resolved', 'is_resolved'), ('created_at', 'created_at'), ('resolved_at', 'resolved_at'),
+        ('occurrences', 'occurrences'), ('last_seen_at', 'last_seen_at'),
+    ]
+    
+    def create(self, request):
+        """Raise an alert; a repeat of an open alert increments its occurrences (200)"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data.get('is_resolved'):
+            self.perform_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        
+        vehicle = data.get('vehicle')
+        alert, created = raise_alert(data['level'], data['message'], vehicle_id=vehicle.pk if vehicle else None)
+        return Response(
+            SystemAlertSerializer(alert).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def active(self, request):
         """Get unresolved alerts"""
         alerts = SystemAlert.objects.filter(is_resolved=False).select_related('vehicle')
@@ -243,21 +487,17 @@ class SystemAlertViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def resolve_all(self, request):
-        """Resolve all active alerts"""
-        from django.utils import timezone
-        updated = SystemAlert.objects.filter(is_resolved=False).update(
-            is_resolved=True,
-            resolved_at=timezone.now()
-        )
-        return Response({'resolved_count': updated})
+        """Resolve all active alerts (in bounded batches)"""
+        return Response({'resolved_count': resolve_open_alerts()})
 
 
-class LoadingGateViewSet(viewsets.ModelViewSet):
+class LoadingGateViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint for loading gates used on Scheduling page
     - List gates with current status
     - Assign a gate to a vehicle entry
     - Release a gate
+    - Allocate queued entries to free gates (allocate_next, rebalance)
     """
     queryset = LoadingGate.objects.select_related('current_entry__vehicle').all()
     serializer_class = LoadingGateSerializer
@@ -265,8 +505,11 @@ class LoadingGateViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'area', 'status', 'current_entry__vehicle__reg_no']
     ordering_fields = ['name', 'area', 'status', 'updated_at']
     ordering = ['area', 'name']
+    etag_models = (LoadingGate, VehicleEntry, Vehicle)
+    fast_serializer_class = LoadingGateSerializer
 
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def status(self, request):
         """Get summarized status counts for gates"""
         data = list(
@@ -287,34 +530,155 @@ class LoadingGateViewSet(viewsets.ModelViewSet):
         except VehicleEntry.DoesNotExist:
             return Response({'error': 'VehicleEntry not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        gate.current_entry = entry
-        gate.status = 'occupied'
-        gate.save()
-        entry.loading_gate = gate.name
-        entry.save(update_fields=['loading_gate'])
+        try:
+            gate = gates.assign(gate.pk, entry)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
         return Response(LoadingGateSerializer(gate).data)
 
     @action(detail=True, methods=['post'])
     def release(self, request, pk=None):
         """Release this gate from its current assignment"""
-        gate = self.get_object()
-        gate.current_entry = None
-        gate.status = 'available'
-        gate.save()
+        gate = gates.release(self.get_object().pk)
         return Response(LoadingGateSerializer(gate).data)
 
+    @action(detail=False, methods=['post'])
+    def allocate_next(self, request):
+        """Assign the next queued entry to a free gate, optionally within one area"""
+        allocation = gates.allocate_next(area=request.data.get('area') or None)
+        if allocation is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        gate, entry = allocation
+        return Response({
+            'gate': LoadingGateSerializer(gate).data,
+            'entry': VehicleEntrySerializer(entry).data,
+        })
+
+    @action(detail=False, methods=['post'])
+    def rebalance(self, request):
+        """Release gates of vehicles done loading and fill every free gate from the queue"""
+        freed, assignments = gates.rebalance(area=request.data.get('area') or None)
+        return Response({
+            'released': [gate.name for gate in freed],
+            'assigned': [
+                {'gate': gate.name, 'entry': entry.id, 'vehicle_reg_no': entry.vehicle.reg_no}
+                for gate, entry in assignments
+            ],
+        })
 
-class TurnaroundTimeSparklineViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """Entries waiting for a gate, in allocation order"""
+        entries = gates.waiting_entries(area=request.query_params.get('area') or None).select_related('vehicle')
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            return self.get_paginated_response(VehicleEntrySerializer(page, many=True).data)
+        return Response(VehicleEntrySerializer(entries, many=True).data)
+
+
+class TurnaroundTimeSparklineViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for turnaround time sparkline data
     """
     queryset = TurnaroundTimeSparkline.objects.all().order_by('-timestamp')
     serializer_class = TurnaroundTimeSparklineSerializer
     ordering = ['-timestamp']
+    pagination_class = TimeSeriesPagination
+    keyset_ordering = ('-timestamp', '-id')
+    etag_models = (TurnaroundTimeSparkline,)
     
     @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
     def recent(self, request):
         """Get recent turnaround time data (last 20 entries)"""
         data = TurnaroundTimeSparkline.objects.all().order_by('-timestamp')[:20]
         serializer = TurnaroundTimeSparklineSerializer(data, many=True)
         return Response(serializer.data)
+
+
+
+class StageEventViewSet(ConditionalGetMixin,
+                        mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    API endpoint for the append-only stage event log
+    - List / retrieve recorded events
+    - Ingest a batch of reader events (idempotent per idempotency_key)
+    """
+    queryset = StageEvent.objects.select_related('vehicle')
+    serializer_class = StageEventSerializer
+    filter_backends = [SearchFilter, OrderingFilter]
+    search_fields = ['vehicle__reg_no', 'stage', 'source', 'idempotency_key']
+    ordering_fields = ['occurred_at', 'recorded_at']
+    ordering = ['-occurred_at', '-id']
+    pagination_class = TimeSeriesPagination
+    keyset_ordering = ('-occurred_at', '-id')
+    etag_models = (StageEvent, Vehicle)
+    
+    def create(self, request):
+        """Append a batch of events and project them onto vehicle stages"""
+        valid, positions, results, error = validate_event_batch(request, StageEventInputSerializer)
+        if error:
+            return error
+        
+        for position, result in zip(positions, ingest_stage_events(valid) if valid else []):
+            result['index'] = position
+            results[position] = result
+        
+        counts = {'recorded': 0, 'duplicate': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+        return Response(
+            {**counts, 'results': results},
+            status=status.HTTP_201_CREATED if counts['recorded'] else status.HTTP_200_OK
+        )
+
+
+class RollupViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for the hourly/daily rollups (read-only)
+    - Throughput and turnaround per bucket
+    - Completed stage counts and time sums per bucket and stage
+    
+    Query parameters: ``grain`` (hour or day, default day) and the date range
+    understood by common.utils.get_date_range_from_params.
+    """
+    queryset = ThroughputRollup.objects.all()
+    serializer_class = ThroughputRollupSerializer
+    pagination_class = None
+    etag_models = (ThroughputRollup, StageRollup)
+    
+    def get_etag_parts(self, request):
+        from django.utils import timezone
+        parts = super().get_etag_parts(request)
+        # Relative ranges (today, days=N) move with the clock
+        parts.append(rollups.floor_hour(timezone.now()).isoformat())
+        return parts
+    
+    def get_bucket_filter(self, request):
+        grain = request.query_params.get('grain', 'day')
+        if grain not in dict(ROLLUP_GRAIN_CHOICES):
+            raise ValueError('grain must be hour or day')
+        start, end = get_date_range_from_params(request.query_params)
+        floor = rollups.floor_hour if grain == 'hour' else rollups.floor_day
+        return {'grain': grain, 'bucket_start__gte': floor(start), 'bucket_start__lte': end}
+    
+    def _bucket_response(self, request, model, serializer_class, ordering):
+        try:
+            bucket_filter = self.get_bucket_filter(request)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        rows = model.objects.filter(**bucket_filter).order_by(*ordering)
+        return Response(serializer_class(rows, many=True).data)
+    
+    @cache_response('SHORT')
+    def list(self, request):
+        """Throughput and turnaround per bucket"""
+        return self._bucket_response(request, ThroughputRollup, ThroughputRollupSerializer, ['bucket_start'])
+    
+    @action(detail=False, methods=['get'])
+    @cache_response('SHORT')
+    def stages(self, request):
+        """Completed stage counts and time sums per bucket and stage"""
+        return self._bucket_response(request, StageRollup, StageRollupSerializer, ['bucket_start', 'stage'])